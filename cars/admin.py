@@ -1,14 +1,51 @@
 # AutoAggregator/cars/admin.py
 
 from django.contrib import admin
-from .models import Car, Review, CarView, CarSave, SearchQuery # <--- Import new models here
+from django.db.models import Count
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .models import Car, Review, CarView, CarViewDaily, CarSave, SearchQuery, WeeklyPick, RequestProfile # <--- Import new models here
 from django.contrib.auth.models import User # Import User for filtering if needed
 
+class UsernameFilter(admin.SimpleListFilter):
+    """
+    Sidebar filter with a username text box. A plain `list_filter = ('user',)` renders one
+    link per user, i.e. loads the whole user table on every changelist page.
+    """
+    title = 'user'
+    parameter_name = 'username'
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return () # Free-text input; no fixed choices
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(user__username=self.value())
+        return queryset
+
+    def choices(self, changelist):
+        # Everything the template needs to rebuild the other active filters as hidden inputs
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'query_parts': [
+                (key, value)
+                for key, values in changelist.get_filters_params().items() if key != self.parameter_name
+                for value in (values if isinstance(values, list) else [values])
+            ],
+        }
+
 # Register your Car model with the admin site
 @admin.register(Car)
 class CarAdmin(admin.ModelAdmin):
     # Customize how the Car model appears in the admin list view
-    list_display = ('make', 'model', 'year', 'trim', 'msrp_starting', 'overall_rating', 'release_date')
+    list_display = ('make', 'model', 'year', 'trim', 'msrp_starting', 'overall_rating', 'release_date', 'review_count')
     # Add filters to the sidebar for easy searching
     list_filter = ('make', 'year', 'body_type')
     # Add search box for specific fields
@@ -16,6 +53,14 @@ class CarAdmin(admin.ModelAdmin):
     # Default ordering for the list
     ordering = ('-year', 'make', 'model')
 
+    def get_queryset(self, request):
+        # One aggregate in the changelist query instead of a COUNT per row
+        return super().get_queryset(request).annotate(review_count=Count('reviews'))
+
+    @admin.display(description='Reviews', ordering='review_count')
+    def review_count(self, obj):
+        return obj.review_count
+
     # Optional: Organize fields into collapsible sections in the detail view
     fieldsets = (
         (None, { # General Info
@@ -41,6 +86,7 @@ class ReviewAdmin(admin.ModelAdmin):
     list_filter = ('source_name', 'sentiment_classification', 'review_date')
     search_fields = ('car__make', 'car__model', 'content', 'reviewer_name')
     raw_id_fields = ('car',) # Use a raw ID input for car field for efficiency
+    list_select_related = ('car',) # `car` column renders Car.__str__
     date_hierarchy = 'review_date' # Adds date drill-down
     ordering = ('-review_date',)
 
@@ -48,20 +94,92 @@ class ReviewAdmin(admin.ModelAdmin):
 @admin.register(CarView)
 class CarViewAdmin(admin.ModelAdmin):
     list_display = ('user', 'car', 'view_date')
-    list_filter = ('user', 'car__make', 'car__model', 'view_date')
+    list_filter = (UsernameFilter, 'car__make', 'car__model', 'view_date')
+    list_select_related = ('user', 'car')
     raw_id_fields = ('user', 'car',) # Use raw ID input for user and car
 
+@admin.register(CarViewDaily)
+class CarViewDailyAdmin(admin.ModelAdmin):
+    list_display = ('user', 'car', 'day', 'view_count', 'last_view_date')
+    list_filter = (UsernameFilter, 'day')
+    list_select_related = ('user', 'car')
+    raw_id_fields = ('user', 'car')
+    date_hierarchy = 'day'
+
 # New: Register CarSave
 @admin.register(CarSave)
 class CarSaveAdmin(admin.ModelAdmin):
     list_display = ('user', 'car', 'save_date')
-    list_filter = ('user', 'car__make', 'car__model', 'save_date')
+    list_filter = (UsernameFilter, 'car__make', 'car__model', 'save_date')
+    list_select_related = ('user', 'car')
     raw_id_fields = ('user', 'car',)
 
 # New: Register SearchQuery
 @admin.register(SearchQuery)
 class SearchQueryAdmin(admin.ModelAdmin):
     list_display = ('user', 'query_text', 'body_type_filter', 'timestamp')
-    list_filter = ('user', 'body_type_filter', 'timestamp')
+    list_filter = (UsernameFilter, 'body_type_filter', 'timestamp')
+    list_select_related = ('user',)
     search_fields = ('query_text', 'make_filter', 'model_filter')
-    raw_id_fields = ('user',) # Optional, if you want to quickly link to users
\ No newline at end of file
+    raw_id_fields = ('user',) # Optional, if you want to quickly link to users
+
+@admin.register(WeeklyPick)
+class WeeklyPickAdmin(admin.ModelAdmin):
+    list_display = ('scope', 'car', 'generated_at')
+    list_select_related = ('car',)
+    raw_id_fields = ('car',)
+    readonly_fields = ('payload', 'generated_at') # Regenerate with `manage.py refresh_weekly_picks`
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    Captured request profiles, slowest first. Each has the top functions by cumulative time
+    plus downloads for the raw .prof (snakeviz, `python -m pstats`) and collapsed stacks (flamegraphs).
+    """
+    list_display = ('path', 'route', 'method', 'status_code', 'duration_ms', 'trigger', 'user', 'created_at')
+    list_filter = ('route', 'trigger', 'status_code', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('path',)
+    ordering = ('-duration_ms',)
+    fields = ('route', 'method', 'path', 'status_code', 'duration_ms', 'trigger', 'user', 'created_at', 'downloads', 'stats')
+    readonly_fields = fields
+
+    def get_queryset(self, request):
+        # Profile blobs are large; the changelist never shows them and the detail page loads stats_text on demand.
+        return super().get_queryset(request).defer('stats_text', 'collapsed_stacks', 'pstats')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/pstats/', self.admin_site.admin_view(self.download_pstats), name='cars_requestprofile_pstats'),
+            path('<int:pk>/stacks/', self.admin_site.admin_view(self.download_stacks), name='cars_requestprofile_stacks'),
+        ] + super().get_urls()
+
+    def download_pstats(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(bytes(profile.pstats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="request-profile-{pk}.prof"'
+        return response
+
+    def download_stacks(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(profile.collapsed_stacks, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="request-profile-{pk}.folded"'
+        return response
+
+    @admin.display(description='Downloads')
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">cProfile (.prof)</a> &middot; <a href="{}">collapsed stacks (.folded)</a>',
+            reverse('admin:cars_requestprofile_pstats', args=[obj.pk]),
+            reverse('admin:cars_requestprofile_stacks', args=[obj.pk]),
+        )
+
+    @admin.display(description='Top functions (cumulative)')
+    def stats(self, obj):
+        return format_html('<pre style="white-space: pre; overflow-x: auto;">{}</pre>', obj.stats_text)
@@ -0,0 +1,195 @@
+# AutoAggregator/cars/als_utils.py
+
+import os
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from cars.columnar_utils import CurrentVersion, get_version_age, open_columns, publish_version
+from cars.interaction_snapshot_utils import top_k_indices, transpose_csr
+
+# Implicit-feedback ALS (Hu, Koren & Volinsky, "Collaborative Filtering for Implicit Feedback
+# Datasets"): every user-car pair has preference p = 1 if the user saved/viewed the car, else 0,
+# trusted with confidence c = 1 + ALPHA * score (interaction_snapshot_utils scores). Models are
+# published like interaction snapshots: <root>/m<UTC timestamp>/ plus a `current` symlink.
+DEFAULT_MODEL_DIR = os.path.join(settings.BASE_DIR, 'snapshots', 'als')
+VERSION_PREFIX = 'm'
+KEEP_VERSIONS = 3
+FACTORS = 32
+ITERATIONS = 15
+REGULARIZATION = 0.1
+ALPHA = 10.0
+
+
+def get_model_dir():
+    return getattr(settings, 'ALS_MODEL_DIR', DEFAULT_MODEL_DIR)
+
+
+def least_squares(indptr, indices, confidence, fixed, regularization):
+    """
+    One ALS half-step: the factors of every row given the other side's `fixed` factors. Row u solves
+    (YᵀY + Yᵤᵀ(Cᵤ - I)Yᵤ + λI) x = YᵤᵀCᵤp, where only the row's own interactions are touched;
+    YᵀY is shared, so each row costs O(nnz·k² + k³) instead of O(n·k²).
+    """
+    factors = fixed.shape[1]
+    gram = fixed.T @ fixed + regularization * np.eye(factors)
+    solved = np.zeros((len(indptr) - 1, factors))
+    for row in range(len(indptr) - 1):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue # No interactions: the zero vector predicts nothing
+        selected = fixed[indices[start:end]]
+        weights = confidence[start:end]
+        matrix = gram + (selected.T * (weights - 1)) @ selected
+        solved[row] = np.linalg.solve(matrix, selected.T @ weights)
+    return solved
+
+
+def train_als(arrays, factors=FACTORS, iterations=ITERATIONS, regularization=REGULARIZATION, alpha=ALPHA, seed=0):
+    """
+    (user_factors, item_factors) float32 matrices for interaction_snapshot_utils.build_csr arrays;
+    predicted preference for row u and column i is user_factors[u] @ item_factors[i].
+    """
+    indptr, indices = arrays['indptr'], arrays['indices']
+    confidence = 1.0 + alpha * arrays['data'].astype(np.float64)
+    num_users, num_items = len(arrays['user_ids']), len(arrays['car_ids'])
+    item_indptr, item_indices, item_confidence = transpose_csr(indptr, indices, confidence, num_items)
+
+    random = np.random.default_rng(seed)
+    user_factors = np.zeros((num_users, factors))
+    item_factors = random.normal(scale=0.01, size=(num_items, factors))
+    for _ in range(iterations):
+        user_factors = least_squares(indptr, indices, confidence, item_factors, regularization)
+        item_factors = least_squares(item_indptr, item_indices, item_confidence, user_factors, regularization)
+    return user_factors.astype(np.float32), item_factors.astype(np.float32)
+
+
+def top_k(scores, num_recommendations):
+    """
+    Indices of the `num_recommendations` highest finite scores, best first (see top_k_indices).
+    """
+    finite = np.flatnonzero(np.isfinite(scores))
+    return finite[top_k_indices(scores[finite], num_recommendations)]
+
+
+def write_als_model(user_factors, item_factors, user_ids, car_ids, params, root=None, keep=KEEP_VERSIONS, now=None):
+    """
+    Publishes a trained model and makes it current (see columnar_utils.publish_version).
+    Returns the new version's directory.
+    """
+    columns = {'user_factors': user_factors, 'item_factors': item_factors, 'user_ids': user_ids, 'car_ids': car_ids}
+    return publish_version(root or get_model_dir(), VERSION_PREFIX, now or timezone.now(), columns,
+                           meta={'params': params, 'users': len(user_ids), 'cars': len(car_ids)}, keep=keep)
+
+
+def car_positions(car_ids, wanted):
+    """
+    Positions in the sorted `car_ids` array of the `wanted` ids it contains.
+    """
+    wanted = np.array(sorted(wanted), dtype=np.int64)
+    positions = np.searchsorted(car_ids, wanted)
+    known = positions < len(car_ids)
+    known[known] = car_ids[positions[known]] == wanted[known]
+    return positions[known]
+
+
+class ALSModel:
+    """
+    A trained model; serving is one matrix-vector product per request. Published models are
+    opened memory-mapped (ALSModel.open), so worker processes share the factors.
+    """
+
+    def __init__(self, user_factors, item_factors, user_ids, car_ids, params=None, created_at=None):
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.user_ids = user_ids
+        self.car_ids = car_ids
+        self.params = params or {}
+        self.created_at = created_at
+
+    @classmethod
+    def open(cls, directory):
+        columns, meta = open_columns(directory)
+        return cls(columns['user_factors'], columns['item_factors'], columns['user_ids'], columns['car_ids'],
+                   params=meta['params'], created_at=datetime.fromisoformat(meta['created_at']))
+
+    def user_row(self, user_id):
+        row = np.searchsorted(self.user_ids, user_id)
+        return row if row < len(self.user_ids) and self.user_ids[row] == user_id else None
+
+    def recommend(self, user_id, seen_car_ids, num_recommendations=5):
+        """
+        Car ids with the highest predicted preference, excluding `seen_car_ids` (the user's live
+        interactions, which may be newer than the model). [] for users the model wasn't trained on.
+        """
+        row = self.user_row(user_id)
+        if row is None:
+            return []
+        scores = self.item_factors @ self.user_factors[row]
+        scores[car_positions(self.car_ids, seen_car_ids)] = -np.inf
+        return self.car_ids[top_k(scores, num_recommendations)].tolist()
+
+
+_models = CurrentVersion(ALSModel.open)
+
+
+def load_als_model(root=None):
+    """
+    The current model for this process, reopened only when a new one is published. None when
+    `train_recommender` hasn't been run.
+    """
+    return _models.get(root or get_model_dir())
+
+
+def get_model_age(root=None):
+    return get_version_age(root or get_model_dir())
+
+
+# --- Offline evaluation ---
+
+def split_holdout(scores, holdout_fraction=0.2, seed=0):
+    """
+    (train, test) split of {user_id: {car_id: score}}: for every user with at least two cars, a
+    random `holdout_fraction` of their cars (at least one) is moved to test {user_id: set(car_ids)}.
+    """
+    random = np.random.default_rng(seed)
+    train, test = {}, {}
+    for user_id in sorted(scores):
+        row = scores[user_id]
+        car_ids = sorted(row)
+        if len(car_ids) < 2:
+            train[user_id] = dict(row)
+            continue
+        held = set(random.choice(car_ids, size=max(1, int(len(car_ids) * holdout_fraction)), replace=False).tolist())
+        train[user_id] = {car_id: score for car_id, score in row.items() if car_id not in held}
+        test[user_id] = held
+    return train, test
+
+
+def precision_at_k(recommend, train, test, k):
+    """
+    Mean precision@k over the test users: the share of recommend(user_id, train_car_ids, k)
+    that are held-out cars.
+    """
+    precisions = [
+        len(set(recommend(user_id, set(train.get(user_id, ())), k)) & held) / k
+        for user_id, held in test.items()
+    ]
+    return float(np.mean(precisions)) if precisions else 0.0
+
+
+def popularity_recommender(train):
+    """
+    Baseline for precision_at_k: the cars most users interacted with, minus the user's own.
+    """
+    counts = {}
+    for row in train.values():
+        for car_id in row:
+            counts[car_id] = counts.get(car_id, 0) + 1
+    ranked = sorted(counts, key=lambda car_id: (-counts[car_id], car_id))
+
+    def recommend(user_id, seen_car_ids, k):
+        return [car_id for car_id in ranked if car_id not in seen_car_ids][:k]
+    return recommend
@@ -0,0 +1,141 @@
+# AutoAggregator/cars/async_views.py
+
+import functools
+
+from django.http import Http404, HttpResponse
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, NotFound
+from rest_framework.views import exception_handler
+
+from core.db_routers import use_read_replica
+
+from .cache_utils import acatalog_cached, not_modified_response, set_validators
+from .fast_serializers import render_json, serialize_rows
+from .models import Car, CarViewDaily
+from .recommender_utils import aget_personalized_recommendations
+from .serializers import CAR_SUMMARY_FIELDS, CarViewDailySerializer, trim_sparse_fields
+from .views import (
+    NO_WEEKLY_PICK_MESSAGE, CarViewSet, CarViewViewSet, weekly_pick_etag, body_type_param_scope,
+)
+from .weekly_pick_utils import aget_weekly_pick
+
+# Native async (ASGI) versions of the hot read endpoints, mounted under /api/async/ with the same
+# paths, query parameters and response bodies as their DRF counterparts. Each one reuses its
+# viewset's filter backends, serializers and pagination to *build* querysets (which never touches
+# the database) and runs the queries themselves through the async ORM, so under an ASGI server a
+# request waiting on the database doesn't hold a worker thread. JSON only (no ?format=/browsable API).
+
+
+def bind_viewset(viewset_class, request, action, **kwargs):
+    """
+    A DRF viewset instance bound to `request` without dispatching it: content negotiation is
+    done, authentication is not (request.user would run a sync session query).
+    """
+    view = viewset_class(action_map={'get': action, 'head': action}, args=(), kwargs=kwargs, format_kwarg=None, headers={})
+    view.request = view.initialize_request(request)
+    view.request.accepted_renderer, view.request.accepted_media_type = view.perform_content_negotiation(view.request)
+    return view
+
+
+def json_response(data, status=200):
+    return HttpResponse(render_json(data), status=status, content_type='application/json')
+
+
+def async_api_view(view_func):
+    """
+    Turns DRF exceptions (NotFound, ValidationError, ...) and Http404 raised by an async view
+    into the same JSON error responses DRF would send. GET/HEAD only.
+    """
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return json_response({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+        try:
+            return await view_func(request, *args, **kwargs)
+        except (APIException, Http404) as exc:
+            if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                exc.status_code = 403 # Session auth has no WWW-Authenticate challenge, so DRF answers 403
+            response = exception_handler(exc, {})
+            return json_response(response.data, status=response.status_code)
+    return wrapper
+
+
+async def require_user(request):
+    """
+    The authenticated user, or NotAuthenticated (what permissions.IsAuthenticated would raise).
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        raise NotAuthenticated()
+    return user
+
+
+@async_api_view
+@acatalog_cached
+async def car_list(request):
+    view = bind_viewset(CarViewSet, request, 'list')
+    queryset = view.filter_queryset(view.get_queryset())
+    plan = view.get_fast_plan()
+    with use_read_replica():
+        if plan is not None:
+            page = await view.paginator.apaginate_queryset(queryset.values(*view.get_fast_columns(plan, queryset)), view.request, view)
+            data = serialize_rows(plan, page)
+        else:
+            page = await view.paginator.apaginate_queryset(queryset, view.request, view)
+            data = view.get_serializer(page, many=True).data
+    return json_response(view.paginator.get_paginated_data(data))
+
+
+@async_api_view
+@acatalog_cached
+async def car_detail(request, pk):
+    view = bind_viewset(CarViewSet, request, 'retrieve', pk=pk)
+    queryset = view.filter_queryset(view.get_queryset())
+    try:
+        with use_read_replica():
+            car = await queryset.aget(pk=pk)
+    except (Car.DoesNotExist, ValueError, TypeError):
+        raise NotFound()
+    return json_response(view.get_serializer(car).data)
+
+
+@async_api_view
+async def weekly_recommendation(request):
+    view = bind_viewset(CarViewSet, request, 'weekly_recommendation')
+    pick = await aget_weekly_pick(body_type_param_scope(view.request))
+    if pick is None:
+        raise NotFound(NO_WEEKLY_PICK_MESSAGE)
+
+    etag = weekly_pick_etag(request, pick)
+    not_modified = not_modified_response(request, etag, pick['generated_at'])
+    if not_modified is not None:
+        return not_modified
+    return set_validators(json_response(trim_sparse_fields(view.request, pick['payload'])), etag, pick['generated_at'])
+
+
+@async_api_view
+async def personalized_recommendations(request):
+    user = await require_user(request)
+    view = bind_viewset(CarViewSet, request, 'personalized_recommendations')
+
+    recommendations = []
+    if (await user.car_view_days.aexists() or await user.car_views.aexists()
+            or await user.saved_cars.aexists() or await user.search_queries.aexists()):
+        recommendations = await aget_personalized_recommendations(user, num_recommendations=5)
+    if not recommendations:
+        # Same fallback as get_simple_content_based_recommendations() without a target car
+        top_rated = Car.objects.filter(overall_rating__isnull=False).order_by('-overall_rating')[:5]
+        recommendations = [car async for car in top_rated]
+    return json_response(view.get_serializer(recommendations, many=True).data)
+
+
+@async_api_view
+async def car_view_history(request):
+    user = await require_user(request)
+    view = bind_viewset(CarViewViewSet, request, 'history')
+    car_columns = [f'car__{field}' for field in CAR_SUMMARY_FIELDS]
+    queryset = CarViewDaily.objects.filter(user=user).select_related('car').only(
+        'user', 'day', 'view_count', 'last_view_date', *car_columns
+    )
+    page = await view.paginator.apaginate_queryset(queryset, view.request, view)
+    serializer = CarViewDailySerializer(page, many=True, context=view.get_serializer_context())
+    return json_response(view.paginator.get_paginated_data(serializer.data))
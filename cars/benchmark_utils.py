@@ -0,0 +1,219 @@
+# AutoAggregator/cars/benchmark_utils.py
+
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+from cars.models import Car, CarSave, CarView, Review, SearchQuery
+from cars.nlp_utils import ASPECT_KEYWORDS, NEGATIVE_WORDS, POSITIVE_WORDS
+
+User = get_user_model()
+
+MAKES = {
+    'Toyota': ['Camry', 'Corolla', 'RAV4', 'Highlander', 'Tacoma'],
+    'Honda': ['Civic', 'Accord', 'CR-V', 'Pilot'],
+    'Ford': ['F-150', 'Escape', 'Explorer', 'Mustang'],
+    'Tesla': ['Model 3', 'Model Y'],
+    'BMW': ['3 Series', 'X3', 'X5'],
+}
+BODY_TYPES = ['Sedan', 'SUV', 'Truck', 'Coupe', 'Hatchback']
+TRIMS = ['Base', 'LE', 'SE', 'XLE', 'Sport', 'Limited', 'Touring', 'Premium']
+SOURCES = ['Reddit', 'Edmunds', 'Car and Driver', 'MotorTrend']
+
+# Review sentence templates; {aspect} comes from nlp_utils.ASPECT_KEYWORDS so ABSA finds real matches.
+POSITIVE_TEMPLATES = [
+    'The {aspect} is {word}.', 'I love how {word} the {aspect} feels on the highway.',
+    'Honestly the {aspect} is {word} for the money.', 'Really {word} {aspect}, better than my last car.',
+]
+NEGATIVE_TEMPLATES = [
+    'The {aspect} is {word}.', 'My only complaint is the {word} {aspect}.',
+    'The {aspect} feels {word} after a few months.', 'Dealer says the {word} {aspect} is normal, I disagree.',
+]
+FILLER_SENTENCES = [
+    'Picked it up from the dealer last spring.', 'We mostly use it for commuting and the occasional road trip.',
+    'Traded in a ten year old sedan for this one.', 'Test drove three competitors before deciding.',
+    'Around fifteen thousand miles on it so far.',
+]
+
+# Share of each interaction type in generate_users
+INTERACTION_WEIGHTS = {'view': 0.6, 'save': 0.25, 'search': 0.15}
+
+
+def generate_cars(count, seed=0):
+    """
+    Creates `count` synthetic cars with every serialized column populated (prices, ratings,
+    JSON pros/cons) so benchmarks exercise the same field conversions as production data.
+    """
+    rng = random.Random(seed)
+    cars = []
+    for i in range(count):
+        make = rng.choice(list(MAKES))
+        cars.append(Car(
+            make=make,
+            model=rng.choice(MAKES[make]),
+            year=rng.randint(2015, 2025),
+            trim=f'{rng.choice(TRIMS)} {i}', # Unique per row to satisfy unique_together
+            body_type=rng.choice(BODY_TYPES),
+            engine_type=rng.choice(['I4', 'V6', 'V8', 'Electric', 'Hybrid']),
+            drivetrain=rng.choice(['FWD', 'RWD', 'AWD', '4WD']),
+            horsepower=rng.randint(120, 600),
+            torque=rng.randint(100, 650),
+            msrp_starting=Decimal(rng.randint(18000, 120000)),
+            msrp_average=Decimal(rng.randint(20000, 130000)) + Decimal('0.50'),
+            mpg_city=Decimal(rng.randint(150, 1300)) / 10,
+            mpg_highway=Decimal(rng.randint(200, 1200)) / 10,
+            overall_rating=Decimal(rng.randint(200, 500)) / 100,
+            reliability_rating=Decimal(rng.randint(200, 500)) / 100,
+            safety_rating=Decimal(rng.randint(200, 500)) / 100,
+            ai_insight_summary='Owners praise the ride quality and complain about road noise.',
+            top_pros=['Comfortable ride', 'Good fuel economy'],
+            top_cons=['Road noise'],
+            main_image_url=f'https://example.com/images/{i}.jpg',
+        ))
+    return Car.objects.bulk_create(cars)
+
+
+def generate_review_text(rng, car):
+    """
+    A few sentences of owner-review prose mixing praised and criticised aspects with filler.
+    """
+    sentences = [f'Owner of a {car.year} {car.make} {car.model} here.']
+    for _ in range(rng.randint(2, 6)):
+        roll = rng.random()
+        if roll < 0.2:
+            sentences.append(rng.choice(FILLER_SENTENCES))
+            continue
+        aspect = rng.choice(rng.choice(list(ASPECT_KEYWORDS.values())))
+        if roll < 0.65:
+            sentences.append(rng.choice(POSITIVE_TEMPLATES).format(aspect=aspect, word=rng.choice(POSITIVE_WORDS)))
+        else:
+            sentences.append(rng.choice(NEGATIVE_TEMPLATES).format(aspect=aspect, word=rng.choice(NEGATIVE_WORDS)))
+    return ' '.join(sentences)
+
+
+def generate_reviews(cars, per_car, seed=0):
+    rng = random.Random(seed)
+    reviews = []
+    for car in cars:
+        for i in range(per_car):
+            score = Decimal(rng.randint(-10000, 10000)) / 10000
+            reviews.append(Review(
+                car=car,
+                content=generate_review_text(rng, car),
+                source_name=rng.choice(SOURCES),
+                source_url=f'https://example.com/reviews/{car.pk}/{i}',
+                reviewer_name=f'reviewer{i}',
+                reviewer_id=f'{car.pk}-{i}',
+                source_upvotes=rng.randint(0, 500),
+                sentiment_compound_score=score,
+                sentiment_classification='positive' if score >= Decimal('0.05') else 'negative' if score <= Decimal('-0.05') else 'neutral',
+            ))
+    return Review.objects.bulk_create(reviews)
+
+
+def generate_users(count, cars, seed=0, max_interactions=200):
+    """
+    Creates `count` users with power-law interaction counts (a few heavy users, a long tail of
+    light ones) spread over cars with Zipf-like popularity. Each interaction is a view, a save
+    or a search. Returns the users, heaviest first.
+    """
+    rng = random.Random(seed)
+    users = User.objects.bulk_create([User(username=f'bench_user_{seed}_{i}') for i in range(count)])
+    popularity = [1 / (rank + 1) for rank in range(len(cars))]
+    kinds, kind_weights = zip(*INTERACTION_WEIGHTS.items())
+
+    views, saves, searches = [], [], []
+    sizes = {}
+    for user in users:
+        interactions = min(max_interactions, int(rng.paretovariate(1.2)))
+        sizes[user.pk] = interactions
+        viewed, saved = set(), set()
+        for _ in range(interactions):
+            car = rng.choices(cars, weights=popularity)[0]
+            kind = rng.choices(kinds, weights=kind_weights)[0]
+            if kind == 'view' and car.pk not in viewed: # (user, car, view_date) is unique and view_date is auto_now_add
+                viewed.add(car.pk)
+                views.append(CarView(user=user, car=car))
+            elif kind == 'save' and car.pk not in saved:
+                saved.add(car.pk)
+                saves.append(CarSave(user=user, car=car))
+            elif kind == 'search':
+                searches.append(SearchQuery(user=user, query_text=f'{car.make} {car.model}', make_filter=car.make))
+    CarView.objects.bulk_create(views)
+    CarSave.objects.bulk_create(saves)
+    SearchQuery.objects.bulk_create(searches)
+    return sorted(users, key=lambda user: -sizes[user.pk])
+
+
+def summarize_timings(timings):
+    """
+    min/median/mean/p95/p99/max (seconds) of a list of wall-clock timings.
+    """
+    ordered = sorted(timings)
+    return {
+        'repeat': len(ordered),
+        'min': round(ordered[0], 6),
+        'median': round(statistics.median(ordered), 6),
+        'mean': round(statistics.fmean(ordered), 6),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 6),
+        'p99': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 6),
+        'max': round(ordered[-1], 6),
+    }
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return summarize_timings(timings)
+
+
+def compare_results(baseline, current, threshold=0.15):
+    """
+    Compares two run_benchmarks result documents case by case on median time.
+    A case is a regression when it got more than `threshold` (fractional) slower, an
+    improvement when it got that much faster. Returns a list of row dicts.
+    """
+    rows = []
+    for scale, cases in current['results'].items():
+        for case, result in cases.items():
+            before = baseline.get('results', {}).get(scale, {}).get(case)
+            row = {'scale': scale, 'case': case, 'baseline': None, 'current': result.get('median'), 'ratio': None}
+            if result.get('error') or not before or before.get('error'):
+                row['status'] = 'error' if result.get('error') else 'new'
+            else:
+                row['baseline'] = before['median']
+                row['ratio'] = result['median'] / before['median'] if before['median'] else None
+                if row['ratio'] is None:
+                    row['status'] = 'ok'
+                elif row['ratio'] > 1 + threshold:
+                    row['status'] = 'regression'
+                elif row['ratio'] < 1 - threshold:
+                    row['status'] = 'improved'
+                else:
+                    row['status'] = 'ok'
+            rows.append(row)
+    return rows
+
+
+class Rollback(Exception):
+    """Raised to roll back a transaction holding synthetic benchmark rows."""
+
+
+def measure_requests(client, url, duration):
+    """
+    Issues GET requests against `url` for `duration` seconds.
+    Returns (requests_per_second, last_response_body).
+    """
+    body = client.get(url).content # Warm-up (also primes any per-process caches)
+    requests = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        body = client.get(url).content
+        requests += 1
+    return requests / (time.perf_counter() - started), body
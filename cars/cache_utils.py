@@ -0,0 +1,186 @@
+# AutoAggregator/cars/cache_utils.py
+
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, router
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from core.db_routers import use_read_replica
+
+from cars.models import Car
+
+CATALOG_VERSION_KEY = 'catalog:version'
+# How long a process trusts the cached catalog version before re-running the aggregate.
+# Saves through the ORM delete the key immediately (see cars/signals.py).
+CATALOG_VERSION_TIMEOUT = 30
+# Rendered responses are keyed by ETag (which embeds the catalog version), so a new
+# version simply stops hitting the old entries; this only bounds how long they linger.
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+RESPONSE_CACHE_PREFIX = 'catalog:response:'
+
+
+def get_catalog_version():
+    """
+    Returns {"count", "last_updated"} for the Car table, cached for CATALOG_VERSION_TIMEOUT seconds.
+    Every Car write bumps `last_updated` (auto_now), and deletes change the count.
+    Always read from the primary: a lagging replica would re-cache the version a write just invalidated.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = Car.objects.using(DEFAULT_DB_ALIAS).aggregate(count=Count('id'), last_updated=Max('last_updated'))
+        cache.set(CATALOG_VERSION_KEY, version, CATALOG_VERSION_TIMEOUT)
+    return version
+
+
+async def aget_catalog_version():
+    """
+    get_catalog_version for async views (async cache + ORM calls).
+    """
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        version = await Car.objects.using(DEFAULT_DB_ALIAS).aaggregate(count=Count('id'), last_updated=Max('last_updated'))
+        await cache.aset(CATALOG_VERSION_KEY, version, CATALOG_VERSION_TIMEOUT)
+    return version
+
+
+def read_version_matches(version):
+    """
+    Whether the database Car reads go to right now (the replica inside use_read_replica()) has
+    caught up with the primary's `version`. A body read from a lagging replica must be neither
+    cached nor served under the new version's ETag, or clients would be pinned to stale data.
+    """
+    alias = router.db_for_read(Car)
+    if alias == DEFAULT_DB_ALIAS:
+        return True
+    return Car.objects.using(alias).aggregate(count=Count('id'), last_updated=Max('last_updated')) == version
+
+
+async def aread_version_matches(version):
+    alias = router.db_for_read(Car)
+    if alias == DEFAULT_DB_ALIAS:
+        return True
+    return await Car.objects.using(alias).aaggregate(count=Count('id'), last_updated=Max('last_updated')) == version
+
+
+def invalidate_catalog_version():
+    cache.delete(CATALOG_VERSION_KEY)
+
+
+def make_catalog_etag(version, request, media_type=None):
+    """
+    Strong ETag for a catalog response: same catalog version + same URL + same media type
+    always renders the same bytes. `media_type` defaults to the DRF request's negotiated one.
+    """
+    last_updated = version['last_updated'].isoformat() if version['last_updated'] else ''
+    media_type = media_type or request.accepted_media_type
+    raw = '|'.join([str(version['count']), last_updated, request.get_full_path(), media_type])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = quote_etag(etag)
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, no_cache=True) # Clients may store it but must revalidate (cheap 304)
+    return response
+
+
+def not_modified_response(request, etag, last_modified):
+    """
+    Returns a 304 (with validators) if the request's If-None-Match / If-Modified-Since
+    already match, else None.
+    """
+    response = get_conditional_response(
+        request, etag=quote_etag(etag), last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    return set_validators(response, etag, last_modified) if response is not None else None
+
+
+def catalog_cached(view_method):
+    """
+    Decorator for read-only catalog actions on a DRF viewset.
+
+    Adds ETag / Last-Modified derived from the catalog version, answers matching
+    If-None-Match / If-Modified-Since with 304 before the view runs, and serves repeat
+    requests from a server-side cache of the rendered JSON. Only JSON GET/HEAD responses
+    with status 200 are cached, and only when the database the body is read from (see
+    read_version_matches) is at the catalog version; everything else goes straight to the view.
+    Disabled entirely with settings.CATALOG_HTTP_CACHE = False.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if not getattr(settings, 'CATALOG_HTTP_CACHE', True):
+            return view_method(self, request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD') or request.accepted_renderer.format != 'json':
+            return view_method(self, request, *args, **kwargs)
+
+        version = get_catalog_version()
+        etag = make_catalog_etag(version, request)
+        last_modified = version['last_updated']
+
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        cache_key = RESPONSE_CACHE_PREFIX + etag
+        cached = cache.get(cache_key)
+        if cached is not None:
+            content, content_type = cached
+            return set_validators(HttpResponse(content, content_type=content_type), etag, last_modified)
+
+        if not read_version_matches(version):
+            return view_method(self, request, *args, **kwargs) # Lagging replica: no validators, not cached
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+
+        response = self.finalize_response(request, response, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        cache.set(cache_key, (response.content, response['Content-Type']), RESPONSE_CACHE_TIMEOUT)
+        return set_validators(response, etag, last_modified)
+    return wrapper
+
+
+def acatalog_cached(view_func):
+    """
+    catalog_cached for async function views returning JSON HttpResponses (cars/async_views.py):
+    same validators, 304s and rendered-response cache, through the async cache/ORM APIs.
+    """
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if not getattr(settings, 'CATALOG_HTTP_CACHE', True) or request.method not in ('GET', 'HEAD'):
+            return await view_func(request, *args, **kwargs)
+
+        version = await aget_catalog_version()
+        etag = make_catalog_etag(version, request, media_type='application/json')
+        last_modified = version['last_updated']
+
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        cache_key = RESPONSE_CACHE_PREFIX + etag
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            content, content_type = cached
+            return set_validators(HttpResponse(content, content_type=content_type), etag, last_modified)
+
+        with use_read_replica(): # The async catalog views read through the replica
+            replica_current = await aread_version_matches(version)
+        if not replica_current:
+            return await view_func(request, *args, **kwargs) # Lagging replica: no validators, not cached
+
+        response = await view_func(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        await cache.aset(cache_key, (response.content, response['Content-Type']), RESPONSE_CACHE_TIMEOUT)
+        return set_validators(response, etag, last_modified)
+    return wrapper
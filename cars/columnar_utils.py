@@ -0,0 +1,171 @@
+# AutoAggregator/cars/columnar_utils.py
+
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+
+import numpy as np
+from django.utils import timezone
+
+# Column directories: one uncompressed .npy file per column plus a META_FILE, so every column can
+# be opened with numpy.load(mmap_mode='r') and shared through the page cache without a copy.
+META_FILE = '_meta.json'
+# String columns are stored Arrow-style as UTF-8 bytes plus int64 offsets (two .npy files)
+STRING_DATA_SUFFIX = '.data'
+STRING_OFFSETS_SUFFIX = '.offsets'
+
+
+def encode_strings(values):
+    """
+    (uint8 data, int64 offsets) for a sequence of str/None; None becomes an empty string.
+    """
+    encoded = [(value or '').encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+class StringColumn:
+    """
+    Read-only view of an encoded string column; values are decoded only when accessed.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return bytes(self.data[self.offsets[index]:self.offsets[index + 1]]).decode('utf-8')
+
+    def tolist(self):
+        return [self[i] for i in range(len(self))]
+
+
+def write_columns(directory, columns, meta=None):
+    """
+    Writes {name: numpy array | list of str} as a column directory. Files go to a temporary sibling
+    directory that is renamed into place, so readers never see a half-written directory.
+    """
+    temp_directory = f'{directory}.tmp'
+    shutil.rmtree(temp_directory, ignore_errors=True)
+    os.makedirs(temp_directory)
+
+    string_columns = []
+    for name, values in columns.items():
+        if isinstance(values, np.ndarray):
+            np.save(os.path.join(temp_directory, f'{name}.npy'), values, allow_pickle=False)
+        else:
+            data, offsets = encode_strings(values)
+            np.save(os.path.join(temp_directory, f'{name}{STRING_DATA_SUFFIX}.npy'), data, allow_pickle=False)
+            np.save(os.path.join(temp_directory, f'{name}{STRING_OFFSETS_SUFFIX}.npy'), offsets, allow_pickle=False)
+            string_columns.append(name)
+
+    with open(os.path.join(temp_directory, META_FILE), 'w') as meta_file:
+        json.dump({**(meta or {}), 'columns': list(columns), 'string_columns': string_columns}, meta_file)
+    os.replace(temp_directory, directory)
+
+
+def read_meta(directory):
+    with open(os.path.join(directory, META_FILE)) as meta_file:
+        return json.load(meta_file)
+
+
+def open_columns(directory, names=None, mmap_mode='r'):
+    """
+    ({name: memory-mapped array or StringColumn}, meta) for a directory written by write_columns.
+    `names` limits which columns are opened.
+    """
+    meta = read_meta(directory)
+    columns = {}
+    for name in names or meta['columns']:
+        if name in meta['string_columns']:
+            columns[name] = StringColumn(
+                np.load(os.path.join(directory, f'{name}{STRING_DATA_SUFFIX}.npy'), mmap_mode=mmap_mode),
+                np.load(os.path.join(directory, f'{name}{STRING_OFFSETS_SUFFIX}.npy'), mmap_mode=mmap_mode),
+            )
+        else:
+            columns[name] = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+    return columns, meta
+
+
+# --- Versioned directories: <root>/<prefix><timestamp>/ plus a <root>/current symlink ---
+
+CURRENT_LINK = 'current'
+VERSION_FORMAT = '%Y%m%dT%H%M%S%f' # Sorts chronologically
+
+
+def publish_version(root, prefix, created_at, columns, meta=None, keep=3):
+    """
+    Writes `columns` as <root>/<prefix><created_at>/, points <root>/current at it with an atomic
+    symlink swap (readers see the old or the new version, never a mix) and deletes all but the
+    `keep` newest versions; processes still mapping a deleted one keep reading it until they
+    reopen. `created_at` is stored in the meta. Returns the new version's directory.
+    """
+    os.makedirs(root, exist_ok=True)
+    version = f'{prefix}{created_at:{VERSION_FORMAT}}'
+    directory = os.path.join(root, version)
+    write_columns(directory, columns, meta={**(meta or {}), 'created_at': created_at.isoformat()})
+
+    temp_link = os.path.join(root, f'{CURRENT_LINK}.tmp')
+    if os.path.lexists(temp_link):
+        os.remove(temp_link)
+    os.symlink(version, temp_link) # Relative, so the whole root can be moved
+    os.replace(temp_link, os.path.join(root, CURRENT_LINK))
+
+    versions = sorted(name for name in os.listdir(root) if name.startswith(prefix) and not name.endswith('.tmp'))
+    for name in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, name))
+    return directory
+
+
+def current_version_dir(root):
+    """
+    The directory <root>/current points at, or None before anything was published.
+    """
+    try:
+        return os.path.join(root, os.readlink(os.path.join(root, CURRENT_LINK)))
+    except OSError:
+        return None
+
+
+def get_version_age(root):
+    """
+    Seconds since the current version under `root` was published, or None without one.
+    """
+    directory = current_version_dir(root)
+    if directory is None:
+        return None
+    try:
+        created_at = datetime.fromisoformat(read_meta(directory)['created_at'])
+    except (OSError, ValueError, KeyError):
+        return None
+    return (timezone.now() - created_at).total_seconds()
+
+
+class CurrentVersion:
+    """
+    Per-process cache of `loader(directory)` for the current version under each root; it is
+    reloaded only when the symlink moves (one readlink per get()).
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.loaded = {} # root -> (directory, object)
+        self.lock = threading.Lock()
+
+    def get(self, root):
+        directory = current_version_dir(root)
+        if directory is None:
+            return None
+        entry = self.loaded.get(root)
+        if entry is None or entry[0] != directory:
+            with self.lock:
+                entry = self.loaded.get(root)
+                if entry is None or entry[0] != directory:
+                    entry = self.loaded[root] = (directory, self.loader(directory))
+        return entry[1]
@@ -0,0 +1,189 @@
+# AutoAggregator/cars/command_utils.py
+
+import json
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from cars.profiling_utils import Profiler
+
+# Seconds between periodic progress lines
+DEFAULT_PROGRESS_INTERVAL = 5.0
+
+
+def add_progress_arguments(parser):
+    """
+    Shared options for commands that report through ProgressReporter.
+    """
+    parser.add_argument('--progress-interval', type=float, default=DEFAULT_PROGRESS_INTERVAL,
+                        help='Seconds between progress lines (0 = only the final summary).')
+    parser.add_argument('--summary-json', metavar='PATH',
+                        help='Write a JSON summary (counts, throughput, per-stage timings) to PATH when done.')
+
+
+def recycle_connections():
+    """
+    What Django does between web requests, for long-running commands: closes connections that are
+    past CONN_MAX_AGE or broken (they reconnect on next use; pooled ones go back to the pool).
+    Connections inside a transaction are left alone. Only call it where no cursor is being
+    streamed (e.g. a queryset.iterator() in progress): closing its connection kills the cursor.
+    """
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close_if_unusable_or_obsolete()
+
+
+def format_duration(seconds):
+    return str(timedelta(seconds=int(seconds)))
+
+
+class ProfiledCommand(BaseCommand):
+    """
+    BaseCommand plus --profile PATH (cProfile stats, readable with `python -m pstats` or snakeviz)
+    and --profile-stacks PATH (sampled collapsed stacks for flamegraph.pl/speedscope).
+    All cars management commands derive from it.
+    """
+
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        # Added here rather than in add_arguments so subclasses don't have to call super().
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        parser.add_argument('--profile', metavar='PATH', help='Profile the command with cProfile and write pstats to PATH.')
+        parser.add_argument('--profile-stacks', metavar='PATH',
+                            help='Also sample call stacks and write them to PATH in collapsed (flamegraph) format.')
+        return parser
+
+    def execute(self, *args, **options):
+        if not options.get('profile') and not options.get('profile_stacks'):
+            return super().execute(*args, **options)
+        profiler = Profiler(sample_stacks=bool(options.get('profile_stacks')))
+        try:
+            with profiler:
+                return super().execute(*args, **options)
+        finally:
+            self.write_profile(profiler, options)
+
+    def write_profile(self, profiler, options):
+        if options.get('profile'):
+            profiler.dump(options['profile'])
+            self.stdout.write(f"cProfile stats written to {options['profile']} (python -m pstats {options['profile']})")
+        if options.get('profile_stacks'):
+            with open(options['profile_stacks'], 'w') as stacks_file:
+                stacks_file.write(profiler.collapsed_stacks())
+            self.stdout.write(f"Collapsed stacks written to {options['profile_stacks']} (flamegraph.pl / speedscope)")
+        if options.get('verbosity', 1) >= 2:
+            self.stdout.write(profiler.stats_text(limit=20))
+
+
+class ProgressReporter:
+    """
+    Progress and throughput instrumentation for long-running management commands.
+
+    Commands wrap work in named stages (`with progress.stage('score'):`), call
+    `advance()` once per unit of work, and send per-row messages through `row()`,
+    which only prints at --verbosity 2+. At the default verbosity the output is a
+    progress line (done/total, rows/s, ETA) every `interval` seconds plus a final
+    per-stage breakdown, instead of one line per row.
+
+    Commands whose `advance()` calls never happen mid-cursor can pass `recycle_connections=True`
+    to also recycle stale database connections with each progress line.
+    """
+
+    def __init__(self, command, options, total=None, unit='rows', recycle_connections=False):
+        self.stdout = command.stdout
+        self.style = command.style
+        self.verbosity = options.get('verbosity', 1)
+        self.interval = options.get('progress_interval', DEFAULT_PROGRESS_INTERVAL)
+        self.summary_path = options.get('summary_json')
+        self.command_name = command.__module__.rsplit('.', 1)[-1]
+        self.total = total
+        self.unit = unit
+        self.recycle_connections = recycle_connections
+        self.done = 0
+        self.counters = {}
+        self.stages = {}
+        self.started = time.perf_counter()
+        self.last_report = self.started
+
+    # --- Recording ---
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def advance(self, amount=1):
+        self.done += amount
+        now = time.perf_counter()
+        if self.interval and now - self.last_report >= self.interval:
+            self.last_report = now
+            if self.recycle_connections:
+                recycle_connections()
+            if self.verbosity >= 1:
+                self.stdout.write(self.progress_line(now))
+
+    def row(self, message, style=None):
+        """
+        Per-row detail; printed only at --verbosity 2 or higher.
+        """
+        if self.verbosity >= 2:
+            self.stdout.write(style(message) if style else message)
+
+    # --- Reporting ---
+
+    def rate(self, now=None):
+        elapsed = (now or time.perf_counter()) - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def progress_line(self, now=None):
+        rate = self.rate(now)
+        if self.total:
+            remaining = max(self.total - self.done, 0)
+            eta = format_duration(remaining / rate) if rate > 0 else '?'
+            position = f'{self.done:,}/{self.total:,} {self.unit} ({self.done / self.total:.0%})'
+            return f'[{self.command_name}] {position}, {rate:,.1f} {self.unit}/s, ETA {eta}'
+        return f'[{self.command_name}] {self.done:,} {self.unit}, {rate:,.1f} {self.unit}/s'
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            'command': self.command_name,
+            'unit': self.unit,
+            'processed': self.done,
+            'total': self.total,
+            'elapsed_seconds': round(elapsed, 3),
+            'rate_per_second': round(self.done / elapsed, 3) if elapsed > 0 else None,
+            'counters': dict(self.counters),
+            'stages': {
+                name: {'seconds': round(seconds, 3), 'share': round(seconds / elapsed, 3) if elapsed > 0 else None}
+                for name, seconds in sorted(self.stages.items(), key=lambda item: -item[1])
+            },
+        }
+
+    def finish(self):
+        """
+        Prints the final throughput and stage breakdown, and writes --summary-json if requested.
+        Returns the summary dict.
+        """
+        summary = self.summary()
+        if self.verbosity >= 1:
+            self.stdout.write(self.style.SUCCESS(
+                f"[{self.command_name}] {summary['processed']:,} {self.unit} in "
+                f"{format_duration(summary['elapsed_seconds'])} ({summary['rate_per_second'] or 0:,.1f} {self.unit}/s)"
+            ))
+            for name, stage in summary['stages'].items():
+                self.stdout.write(f"  {name:<14} {stage['seconds']:>9.2f}s  {stage['share'] or 0:>6.1%}")
+        if self.summary_path:
+            with open(self.summary_path, 'w') as summary_file:
+                json.dump(summary, summary_file, indent=2)
+            if self.verbosity >= 1:
+                self.stdout.write(f'Summary written to {self.summary_path}')
+        return summary
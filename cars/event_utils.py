@@ -0,0 +1,123 @@
+# AutoAggregator/cars/event_utils.py
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+
+from cars.models import CarView, SearchQuery
+from cars.trending_utils import VIEW_SIGNAL, record_trending_events
+
+logger = logging.getLogger(__name__)
+
+# Flush once this many events are buffered...
+DEFAULT_EVENT_BUFFER_SIZE = 200
+# ...or once the oldest buffered event is this many seconds old. 0 writes every batch immediately.
+DEFAULT_EVENT_BUFFER_SECONDS = 5.0
+
+
+class EventBuffer:
+    """
+    Process-wide buffer of interaction rows (CarView / SearchQuery instances).
+
+    Requests only append to the buffer; rows are written with one bulk_create per model
+    when the buffer reaches `max_size` or its oldest row reaches `max_age` seconds (a
+    timer thread enforces the age bound when traffic stops). Interaction events are
+    analytics, so a failed flush is logged and dropped rather than retried.
+    """
+
+    def __init__(self, max_size=None, max_age=None):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.rows = []
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def get_limits(self):
+        max_size = self.max_size if self.max_size is not None else getattr(settings, 'EVENT_BUFFER_SIZE', DEFAULT_EVENT_BUFFER_SIZE)
+        max_age = self.max_age if self.max_age is not None else getattr(settings, 'EVENT_BUFFER_SECONDS', DEFAULT_EVENT_BUFFER_SECONDS)
+        return max_size, max_age
+
+    def add(self, rows):
+        if not rows:
+            return
+        max_size, max_age = self.get_limits()
+        with self.lock:
+            self.rows.extend(rows)
+            full = len(self.rows) >= max_size or max_age <= 0
+            if not full and self.timer is None:
+                self.timer = threading.Timer(max_age, self.flush_from_timer)
+                self.timer.daemon = True
+                self.timer.start()
+        if full:
+            self.flush()
+
+    def take(self):
+        with self.lock:
+            rows, self.rows = self.rows, []
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        return rows
+
+    def flush(self):
+        """
+        Writes everything buffered so far. Returns the number of rows handed to the database.
+        """
+        rows = self.take()
+        if not rows:
+            return 0
+        started = time.perf_counter()
+        for model in (CarView, SearchQuery):
+            batch = [row for row in rows if isinstance(row, model)]
+            if not batch:
+                continue
+            try:
+                # CarView is unique on (user, car, view_date): repeated clicks within a flush collapse into one row.
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+            except DatabaseError:
+                logger.exception("Dropped %d buffered %s events", len(batch), model.__name__)
+                continue
+            if model is CarView:
+                record_trending_events(Counter((row.car_id, VIEW_SIGNAL) for row in batch))
+        logger.debug("Flushed %d interaction events in %.1f ms", len(rows), (time.perf_counter() - started) * 1000)
+        return len(rows)
+
+    def flush_from_timer(self):
+        # Runs outside the request cycle, so manage this thread's connection explicitly.
+        close_old_connections()
+        try:
+            self.flush()
+        finally:
+            close_old_connections()
+
+
+event_buffer = EventBuffer()
+atexit.register(event_buffer.flush)
+
+
+def build_event_rows(events, user):
+    """
+    Turns validated event dicts into unsaved model instances.
+    View events need a logged-in user (CarView.user is required) and are skipped otherwise.
+    """
+    rows = []
+    user = user if user.is_authenticated else None
+    for event in events:
+        if event['type'] == 'view':
+            if user is not None:
+                rows.append(CarView(user=user, car_id=event['car']))
+        else:
+            rows.append(SearchQuery(
+                user=user,
+                query_text=event['query_text'],
+                make_filter=event.get('make_filter') or None,
+                model_filter=event.get('model_filter') or None,
+                year_filter=event.get('year_filter'),
+                body_type_filter=event.get('body_type_filter') or None,
+            ))
+    return rows
@@ -0,0 +1,292 @@
+# AutoAggregator/cars/facet_utils.py
+
+import logging
+import threading
+import time
+
+import numpy as np
+from django.db import DatabaseError
+from django.db.models import Count, Max
+
+from cars.models import Car
+
+logger = logging.getLogger(__name__)
+
+# Columns held as (codes, vocabulary, posting lists). Matching is case-insensitive.
+CATEGORICAL_COLUMNS = ('make', 'model', 'trim', 'body_type', 'drivetrain', 'engine_type')
+# Columns held as float64 arrays (NaN = NULL).
+NUMERIC_COLUMNS = ('year', 'msrp_starting', 'overall_rating', 'horsepower', 'mpg_city', 'mpg_highway')
+
+FACET_FIELDS = ('make', 'body_type', 'drivetrain', 'year', 'price_bucket')
+SORTABLE_FIELDS = ('make', 'model', 'year', 'msrp_starting', 'overall_rating', 'horsepower')
+DEFAULT_ORDERING = ('-year', 'make', 'model') # Mirrors Car.Meta.ordering
+
+# Upper edges of the msrp_starting buckets; anything above the last edge is "100k_plus".
+PRICE_BUCKET_EDGES = (20000, 30000, 40000, 50000, 75000, 100000)
+PRICE_BUCKET_LABELS = ('under_20k', '20k_30k', '30k_40k', '40k_50k', '50k_75k', '75k_100k', '100k_plus')
+
+# How often (seconds) a process re-checks the catalog fingerprint to pick up writes made elsewhere
+# (other workers, import_cars / analyze_reviews). Local Car saves invalidate immediately via signals.
+CATALOG_INDEX_CHECK_SECONDS = 30
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 200
+
+
+class FacetQueryError(ValueError):
+    """Raised for malformed filter/sort parameters (surfaced to clients as HTTP 400)."""
+
+
+class CatalogIndex:
+    """
+    Immutable, in-memory columnar snapshot of the Car catalog.
+
+    Numeric columns are NumPy arrays; categorical columns are integer codes plus a
+    posting list (array of row positions) per distinct lowercased value. A query turns
+    each filter into a boolean mask, ANDs them, and derives facet counts with bincount,
+    so filter + facet + sort never touches the database.
+    """
+
+    def __init__(self, rows, fingerprint=None, payload_fields=None):
+        self.fingerprint = fingerprint
+        self.built_at = time.time()
+        self.size = len(rows)
+        # What queries return per car; the indexed columns may be wider than the payload.
+        self.payloads = rows if payload_fields is None else [
+            {field: row[field] for field in payload_fields} for row in rows
+        ]
+        self.ids = np.array([row['id'] for row in rows], dtype=np.int64)
+        self.positions = {car_id: position for position, car_id in enumerate(self.ids.tolist())}
+
+        self.numeric = {}
+        for column in NUMERIC_COLUMNS:
+            self.numeric[column] = np.array(
+                [np.nan if row.get(column) is None else float(row[column]) for row in rows],
+                dtype=np.float64,
+            )
+
+        self.codes = {}
+        self.vocabulary = {}
+        self.postings = {}
+        self.labels = {}
+        for column in CATEGORICAL_COLUMNS:
+            self._index_categorical(column, [row.get(column) for row in rows])
+
+        prices = self.numeric['msrp_starting']
+        buckets = np.digitize(np.nan_to_num(prices, nan=0.0), PRICE_BUCKET_EDGES, right=False).astype(np.int32)
+        buckets[np.isnan(prices)] = -1
+        self.codes['price_bucket'] = buckets
+        self.vocabulary['price_bucket'] = list(PRICE_BUCKET_LABELS)
+
+    def _index_categorical(self, column, values):
+        # Vocabulary is kept sorted so a value's code doubles as its sort rank.
+        vocabulary = sorted({value.lower() for value in values if value})
+        lookup = {value: code for code, value in enumerate(vocabulary)}
+        codes = np.fromiter(
+            (lookup[value.lower()] if value else -1 for value in values), dtype=np.int32, count=len(values)
+        )
+        # Display label per code: the original casing of its first occurrence.
+        labels = [None] * len(vocabulary)
+        for code, value in zip(codes.tolist(), values):
+            if code >= 0 and labels[code] is None:
+                labels[code] = value
+        self.labels[column] = labels
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        boundaries = np.searchsorted(sorted_codes, np.arange(len(vocabulary) + 1))
+        self.codes[column] = codes
+        self.vocabulary[column] = vocabulary
+        self.postings[column] = {
+            value: order[boundaries[code]:boundaries[code + 1]] for code, value in enumerate(vocabulary)
+        }
+
+    # --- Filtering ---
+
+    def _mask_from_postings(self, postings_list):
+        mask = np.zeros(self.size, dtype=bool)
+        for postings in postings_list:
+            mask[postings] = True
+        return mask
+
+    def _categorical_mask(self, column, lookup, values):
+        postings = self.postings[column]
+        wanted = [value.lower() for value in values]
+        if lookup == 'exact':
+            return self._mask_from_postings(postings[value] for value in wanted if value in postings)
+        # icontains: scan the (small) vocabulary rather than every row.
+        return self._mask_from_postings(
+            postings[value] for value in self.vocabulary[column] if any(term in value for term in wanted)
+        )
+
+    def _numeric_mask(self, column, lookup, value):
+        data = self.numeric[column]
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise FacetQueryError(f"Invalid numeric value for '{column}': {value!r}")
+        with np.errstate(invalid='ignore'): # NaN (NULL) compares False, like SQL
+            if lookup == 'exact':
+                return data == value
+            if lookup == 'gte':
+                return data >= value
+            return data <= value
+
+    def _filter_masks(self, params):
+        """
+        Returns {facet_group: mask} for every recognised filter parameter.
+        Comma-separated values are OR-ed within a parameter; groups are AND-ed together.
+        """
+        masks = {}
+        for key, raw_value in params.items():
+            if raw_value in (None, ''):
+                continue
+            column, _, lookup = key.partition('__')
+            lookup = lookup or 'exact'
+
+            if column in CATEGORICAL_COLUMNS and lookup in ('exact', 'icontains'):
+                mask = self._categorical_mask(column, lookup, str(raw_value).split(','))
+            elif column in NUMERIC_COLUMNS and lookup == 'exact':
+                values = str(raw_value).split(',')
+                mask = np.logical_or.reduce([self._numeric_mask(column, 'exact', v) for v in values])
+            elif column in NUMERIC_COLUMNS and lookup in ('gte', 'lte'):
+                mask = self._numeric_mask(column, lookup, raw_value)
+            elif column == 'price_bucket' and lookup == 'exact':
+                labels = str(raw_value).split(',')
+                unknown = [label for label in labels if label not in PRICE_BUCKET_LABELS]
+                if unknown:
+                    raise FacetQueryError(f"Unknown price_bucket: {', '.join(unknown)}")
+                mask = np.isin(self.codes['price_bucket'], [PRICE_BUCKET_LABELS.index(l) for l in labels])
+            else:
+                continue # Not an index filter (e.g. ordering/limit) - ignore like django-filter does
+
+            masks[column] = masks[column] & mask if column in masks else mask
+        return masks
+
+    def _combine(self, masks, exclude=None):
+        combined = np.ones(self.size, dtype=bool)
+        for group, mask in masks.items():
+            if group != exclude:
+                combined &= mask
+        return combined
+
+    # --- Facets ---
+
+    def _facet_counts(self, field, mask):
+        if field == 'year':
+            years, counts = np.unique(self.numeric['year'][mask & ~np.isnan(self.numeric['year'])], return_counts=True)
+            return {str(int(year)): int(count) for year, count in zip(years, counts)}
+
+        codes = self.codes[field][mask]
+        codes = codes[codes >= 0]
+        counts = np.bincount(codes, minlength=len(self.vocabulary[field]))
+        if field == 'price_bucket':
+            return {label: int(count) for label, count in zip(self.vocabulary[field], counts) if count}
+
+        labels = self.labels[field]
+        return {labels[code]: int(counts[code]) for code in np.flatnonzero(counts)}
+
+    # --- Sorting ---
+
+    def _sort_key(self, field, descending, rows):
+        if field in NUMERIC_COLUMNS:
+            values = self.numeric[field][rows]
+            values = -values if descending else values
+            return np.where(np.isnan(values), np.inf, values) # NULLs last either way
+        codes = self.codes[field][rows].astype(np.int64)
+        ranks = (len(self.vocabulary[field]) - 1 - codes) if descending else codes
+        return np.where(codes < 0, len(self.vocabulary[field]), ranks)
+
+    def _sort(self, rows, ordering):
+        keys = [self.ids[rows]] # Final tie-breaker: id ascending
+        for term in reversed(ordering):
+            field = term.lstrip('-')
+            if field not in SORTABLE_FIELDS:
+                raise FacetQueryError(f"Cannot order by '{field}'. Allowed: {', '.join(SORTABLE_FIELDS)}")
+            keys.append(self._sort_key(field, term.startswith('-'), rows))
+        return rows[np.lexsort(keys)]
+
+    # --- Public API ---
+
+    def query(self, params, ordering=None, offset=0, limit=DEFAULT_PAGE_SIZE, facets=FACET_FIELDS):
+        """
+        Runs a combined filter + facet-count + sort query.
+
+        Facet counts are disjunctive: the counts for a field apply every filter except
+        that field's own, so the UI can show alternatives to the current selection.
+        Returns {"count", "facets", "results"} with `results` as serialized car payloads.
+        """
+        masks = self._filter_masks(params)
+        matched = np.flatnonzero(self._combine(masks))
+        ordered = self._sort(matched, ordering or DEFAULT_ORDERING)
+        page = ordered[offset:offset + limit]
+
+        return {
+            'count': int(matched.size),
+            'facets': {field: self._facet_counts(field, self._combine(masks, exclude=field)) for field in facets},
+            'results': [self.payloads[position] for position in page.tolist()],
+        }
+
+
+# --- Process-wide singleton ---
+
+_index = None
+_index_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_catalog_fingerprint():
+    """
+    Cheap (single aggregate query) identifier of the catalog's current state.
+    """
+    stats = Car.objects.aggregate(count=Count('id'), last_updated=Max('last_updated'))
+    return (stats['count'], stats['last_updated'])
+
+
+def build_catalog_index():
+    from cars.serializers import CAR_LIST_FIELDS, CarSerializer # Serializers import models; keep this module import-light
+
+    fingerprint = get_catalog_fingerprint()
+    rows = CarSerializer(Car.objects.all(), many=True).data
+    return CatalogIndex([dict(row) for row in rows], fingerprint=fingerprint, payload_fields=CAR_LIST_FIELDS)
+
+
+def get_catalog_index():
+    """
+    Returns the current CatalogIndex, (re)building it if it was invalidated or if the
+    catalog fingerprint changed since the last periodic check.
+    """
+    global _index, _index_checked_at
+
+    index = _index
+    now = time.monotonic()
+    if index is not None and now - _index_checked_at < CATALOG_INDEX_CHECK_SECONDS:
+        return index
+
+    with _index_lock:
+        if _index is not None and now - _index_checked_at < CATALOG_INDEX_CHECK_SECONDS:
+            return _index # Another thread refreshed it while we waited
+        if _index is None or _index.fingerprint != get_catalog_fingerprint():
+            started = time.perf_counter()
+            _index = build_catalog_index()
+            logger.info("Built catalog index: %d cars in %.1f ms", _index.size, (time.perf_counter() - started) * 1000)
+        _index_checked_at = time.monotonic()
+        return _index
+
+
+def invalidate_catalog_index():
+    """
+    Marks the index stale so the next query rebuilds it. Called from Car save/delete signals.
+    """
+    global _index_checked_at
+    _index_checked_at = 0.0 # Forces a fingerprint check (and rebuild) on next access
+
+
+def warm_catalog_index():
+    """
+    Builds the index at process startup so the first search request doesn't pay for it.
+    Failures (e.g. database not migrated yet) are logged and left to the lazy path.
+    """
+    try:
+        get_catalog_index()
+    except DatabaseError as e:
+        logger.warning("Catalog index warm-up skipped: %s", e)
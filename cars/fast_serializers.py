@@ -0,0 +1,226 @@
+# AutoAggregator/cars/fast_serializers.py
+
+import decimal
+import json
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from core.middleware import timed_render
+
+try:
+    import orjson
+except ImportError: # Optional speed-up; the stdlib encoder produces the same bytes
+    orjson = None
+
+# Field types whose DRF to_representation is the identity for values() output
+# (str/int/bool/JSON straight from the DB driver, or an FK id for PrimaryKeyRelatedField).
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.JSONField, serializers.PrimaryKeyRelatedField,
+)
+
+_plan_cache = {}
+
+
+def _decimal_converter(field):
+    if field.normalize_output or field.localize or field.decimal_places is None:
+        return None
+    if not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING):
+        return None
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return f'{value.quantize(exponent, rounding=rounding, context=context):f}'
+    return convert
+
+
+def _datetime_converter(field):
+    if getattr(field, 'format', api_settings.DATETIME_FORMAT) != ISO_8601:
+        return None
+    field_timezone = getattr(field, 'timezone', None)
+
+    def convert(value):
+        tz = field_timezone or (timezone.get_current_timezone() if settings.USE_TZ else None)
+        if tz is None or not timezone.is_aware(value):
+            return field.to_representation(value) # Rare (USE_TZ off); let DRF handle it
+        text = value.astimezone(tz).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def _date_converter(field):
+    if getattr(field, 'format', api_settings.DATE_FORMAT) != ISO_8601:
+        return None
+    return lambda value: value.isoformat()
+
+
+def _converter_for(field):
+    """
+    Returns (supported, converter) for a serializer field; converter None means identity.
+    """
+    if isinstance(field, serializers.DecimalField):
+        converter = _decimal_converter(field)
+        return converter is not None, converter
+    if isinstance(field, serializers.DateTimeField):
+        converter = _datetime_converter(field)
+        return converter is not None, converter
+    if isinstance(field, serializers.DateField):
+        converter = _date_converter(field)
+        return converter is not None, converter
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is not None:
+        return False, None
+    if isinstance(field, serializers.JSONField) and field.binary:
+        return False, None
+    return isinstance(field, PASSTHROUGH_FIELDS), None
+
+
+def compile_plan(serializer):
+    """
+    Turns a ModelSerializer instance (after sparse-field trimming) into a list of
+    (output_name, column, converter) tuples, or None if any field needs real DRF logic
+    (method fields, nested serializers, custom formats, ...).
+    Plans are cached per serializer class + field set, so this runs once per shape.
+    """
+    key = (type(serializer), tuple(serializer.fields))
+    if key in _plan_cache:
+        return _plan_cache[key]
+
+    model = serializer.Meta.model
+    columns = {field.name for field in model._meta.concrete_fields}
+    plan = []
+    for name, field in serializer.fields.items():
+        supported, converter = _converter_for(field)
+        if not supported or field.write_only or field.source not in columns:
+            plan = None
+            break
+        plan.append((name, field.source, converter))
+
+    _plan_cache[key] = plan
+    return plan
+
+
+def serialize_rows(plan, rows):
+    """
+    Maps values() dicts to the same dicts DRF would build (None stays None, like Serializer.to_representation).
+    """
+    output = []
+    append = output.append
+    for row in rows:
+        item = {}
+        for name, column, converter in plan:
+            value = row[column]
+            if value is not None and converter is not None:
+                value = converter(value)
+            item[name] = value
+        append(item)
+    return output
+
+
+def orjson_renders_exactly(data):
+    """
+    True if orjson would encode `data` byte for byte like the stdlib encoder: no floats
+    (orjson formats them differently and turns NaN into null) and no ints beyond 64 bits.
+    Floats and big ints can only come from JSONField values; everything else is str/int/None.
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        if kind is dict:
+            stack.extend(value.values())
+        elif kind is list or kind is tuple:
+            stack.extend(value)
+        elif kind is float:
+            return False
+        elif kind is int and not -(1 << 63) <= value < (1 << 64):
+            return False
+    return True
+
+
+def render_json(data):
+    """
+    Renders exactly what rest_framework.renderers.JSONRenderer would (compact, UTF-8,
+    U+2028/2029 escaped), using orjson when installed and the data has nothing it
+    would encode differently.
+    """
+    if orjson is not None and orjson_renders_exactly(data):
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastReadMixin:
+    """
+    Optimized list/retrieve for read-heavy viewsets.
+
+    Instead of instantiating model objects and running every serializer field, rows are
+    fetched as values() dicts, converted with per-field functions compiled once from the
+    view's serializer, and rendered straight to JSON bytes. The output is byte-identical
+    to the regular DRF path, which is still used whenever the request can't take the
+    fast path (non-JSON renderer, indented output, unsupported serializer fields, or
+    settings.FAST_READ_PATH = False).
+    """
+
+    def get_fast_plan(self):
+        if not getattr(settings, 'FAST_READ_PATH', True):
+            return None
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        if type(renderer) is not JSONRenderer or renderer.get_indent(self.request.accepted_media_type, {}) is not None:
+            return None
+        if not renderer.compact or renderer.ensure_ascii or renderer.strict is not True:
+            return None
+        return compile_plan(self.get_serializer())
+
+    def get_fast_columns(self, plan, queryset):
+        columns = {column for _, column, _ in plan}
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        columns.update(term.lstrip('-') for term in ordering if isinstance(term, str)) # Needed for cursors
+        columns.add('pk')
+        return columns
+
+    def list(self, request, *args, **kwargs):
+        plan = self.get_fast_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values(*self.get_fast_columns(plan, queryset))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            rows = list(rows) # Fetch before the render timing starts
+        with timed_render(request):
+            if page is not None:
+                content = render_json(self.paginator.get_paginated_data(serialize_rows(plan, page)))
+            else:
+                content = render_json(serialize_rows(plan, rows))
+        return HttpResponse(content, content_type='application/json')
+
+    def retrieve(self, request, *args, **kwargs):
+        plan = self.get_fast_plan()
+        if plan is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            row = queryset.values(*self.get_fast_columns(plan, queryset)).get(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (queryset.model.DoesNotExist, ValueError, TypeError, decimal.InvalidOperation):
+            raise Http404
+        self.check_object_permissions(request, row)
+        with timed_render(request):
+            content = render_json(serialize_rows(plan, [row])[0])
+        return HttpResponse(content, content_type='application/json')
@@ -0,0 +1,114 @@
+# AutoAggregator/cars/filters.py
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FilteredRelation, FloatField, Func, Q, Value
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter, SearchFilter
+
+from cars.search_utils import get_search_config
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Drop-in replacement for DRF's SearchFilter backed by PostgreSQL full-text search.
+
+    Views opt in by declaring `search_vector_field`; `?search=` terms are then matched
+    against that GIN-indexed tsvector column and results are ordered by SearchRank
+    (an explicit `?ordering=` still wins, since OrderingFilter runs afterwards).
+    Views without a vector field, or non-PostgreSQL databases, fall back to the
+    regular `search_fields` icontains behaviour.
+    """
+    rank_annotation = 'search_rank'
+
+    def filter_queryset(self, request, queryset, view):
+        vector_field = getattr(view, 'search_vector_field', None)
+        search_terms = self.get_search_terms(request)
+
+        if not search_terms:
+            return queryset
+        if not vector_field or connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        query = SearchQuery(' '.join(search_terms), search_type='websearch', config=get_search_config())
+        return queryset.filter(**{vector_field: query}).annotate(
+            **{self.rank_annotation: SearchRank(F(vector_field), query)}
+        ).order_by(f'-{self.rank_annotation}', '-pk')
+
+
+class AspectScoreFilter(BaseFilterBackend):
+    """
+    Filters cars by review sentiment per aspect (CarAspectScore, written by analyze_reviews).
+
+    `?aspect=infotainment,reliability` (or repeated `?aspect=`) keeps cars whose reviews mention
+    every listed aspect; `?aspect_min=` / `?aspect_max=` bound each aspect's average compound
+    score (-1..1) and `?aspect_mentions_min=` its mention count. Each aspect is one join on
+    CarAspectScore's (aspect, avg_compound, car) index. The mean score of the listed aspects is
+    annotated as `aspect_score`, so `?ordering=-aspect_score` ranks by it.
+    """
+    aspect_param = 'aspect'
+    score_annotation = 'aspect_score'
+    # One JOIN per aspect, so at most every aspect once: len(cars.nlp_utils.ASPECT_KEYWORDS). Not
+    # imported from there, which would load the VADER lexicon into the web process.
+    max_aspects = 12
+    # query param -> (CarAspectScore field, lookup, type)
+    bound_params = {
+        'aspect_min': ('avg_compound', 'gte', float),
+        'aspect_max': ('avg_compound', 'lte', float),
+        'aspect_mentions_min': ('mention_count', 'gte', int),
+    }
+
+    def get_aspects(self, request):
+        aspects = []
+        for value in request.query_params.getlist(self.aspect_param):
+            for aspect in value.split(','):
+                aspect = aspect.strip().lower()
+                if aspect and aspect not in aspects:
+                    aspects.append(aspect)
+        if len(aspects) > self.max_aspects:
+            raise ValidationError({self.aspect_param: f'At most {self.max_aspects} aspects.'})
+        return aspects
+
+    def get_bounds(self, request):
+        bounds = {}
+        for param, (field, lookup, cast) in self.bound_params.items():
+            value = request.query_params.get(param, '').strip()
+            if not value:
+                continue
+            try:
+                bounds[f'{field}__{lookup}'] = cast(value)
+            except ValueError:
+                raise ValidationError({param: f'Expected a {cast.__name__}.'})
+        return bounds
+
+    def filter_queryset(self, request, queryset, view):
+        aspects = self.get_aspects(request)
+        if not aspects:
+            return queryset
+        bounds = self.get_bounds(request)
+
+        scores = []
+        for index, aspect in enumerate(aspects):
+            alias = f'aspect_score_{index}'
+            queryset = queryset.annotate(**{
+                alias: FilteredRelation('aspect_scores', condition=Q(aspect_scores__aspect=aspect)),
+            }).filter(**{f'{alias}__avg_compound__isnull': False}, **{f'{alias}__{lookup}': value for lookup, value in bounds.items()})
+            scores.append(F(f'{alias}__avg_compound'))
+        if len(scores) == 1:
+            score = scores[0]
+        else: # One flat (a + b + ...) rather than nested binary additions
+            score = Func(*scores, template='(%(expressions)s)', arg_joiner=' + ', output_field=FloatField()) / Value(float(len(scores)))
+        return queryset.annotate(**{self.score_annotation: score})
+
+
+class AspectOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter that ignores `?ordering=aspect_score` unless AspectScoreFilter annotated it,
+    i.e. unless the request also filters by `?aspect=`.
+    """
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        valid_fields = super().remove_invalid_fields(queryset, fields, view, request)
+        if AspectScoreFilter.score_annotation in queryset.query.annotations:
+            return valid_fields
+        return [term for term in valid_fields if term.lstrip('-') != AspectScoreFilter.score_annotation]
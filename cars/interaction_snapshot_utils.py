@@ -0,0 +1,191 @@
+# AutoAggregator/cars/interaction_snapshot_utils.py
+
+import os
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from cars.columnar_utils import CurrentVersion, get_version_age, open_columns, publish_version
+from cars.interaction_weight_utils import iter_interaction_weights
+from cars.recommender_utils import NEIGHBORHOOD_SIZE
+
+# Layout: <root>/v<UTC timestamp>/ holds one snapshot (columnar_utils .npy columns) and
+# <root>/current is a symlink to the newest one, replaced atomically by each build.
+DEFAULT_SNAPSHOT_DIR = os.path.join(settings.BASE_DIR, 'snapshots', 'interactions')
+VERSION_PREFIX = 'v'
+KEEP_VERSIONS = 3
+
+
+def get_snapshot_dir():
+    return getattr(settings, 'INTERACTION_SNAPSHOT_DIR', DEFAULT_SNAPSHOT_DIR)
+
+
+def collect_interaction_scores(user_ids=None):
+    """
+    {user_id: {car_id: score}} for every user (or just `user_ids`), with the recency-decayed
+    weights of recommender_utils.get_user_car_interactions, from one streamed SQL aggregation.
+    """
+    scores = defaultdict(dict)
+    for user_id, car_id, weight in iter_interaction_weights(user_ids):
+        scores[user_id][car_id] = weight
+    return scores
+
+
+acollect_interaction_scores = sync_to_async(collect_interaction_scores)
+
+
+def transpose_csr(indptr, indices, data, num_columns):
+    """
+    (indptr, indices, data) of the transposed CSR matrix, i.e. the same matrix in CSC order.
+    """
+    order = np.argsort(indices, kind='stable')
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    transposed_indptr = np.zeros(num_columns + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=num_columns), out=transposed_indptr[1:])
+    return transposed_indptr, rows[order].astype(np.int32), data[order]
+
+
+def row_positions(indptr, rows):
+    """
+    Positions in indices/data of every entry of the given CSR rows, row by row.
+    """
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+
+def top_k_indices(values, k):
+    """
+    Indices of the `k` largest values, largest first, ties going to the lower index. argpartition
+    finds them in O(n) and only those k get sorted.
+    """
+    if k <= 0 or not len(values):
+        return np.zeros(0, dtype=np.int64)
+    if len(values) > k:
+        threshold = np.partition(values, len(values) - k)[len(values) - k] # k-th largest
+        above = np.flatnonzero(values > threshold)
+        tied = np.flatnonzero(values == threshold)[:k - len(above)]
+        selected = np.sort(np.concatenate([above, tied]))
+    else:
+        selected = np.arange(len(values))
+    return selected[np.argsort(-values[selected], kind='stable')]
+
+
+def build_csr(scores):
+    """
+    CSR arrays for {user_id: {car_id: score}}: row i is user_ids[i], its cars are
+    car_ids[indices[indptr[i]:indptr[i + 1]]] with scores data[indptr[i]:indptr[i + 1]]. The
+    inverted index car_users[car_indptr[j]:car_indptr[j + 1]] lists the rows that have car j.
+    """
+    user_ids = np.array(sorted(user_id for user_id, row in scores.items() if row), dtype=np.int64)
+    car_ids = np.array(sorted({car_id for row in scores.values() for car_id in row}), dtype=np.int64)
+    car_index = {car_id: index for index, car_id in enumerate(car_ids.tolist())}
+
+    indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+    indices, data = [], []
+    for row_number, user_id in enumerate(user_ids.tolist()):
+        row = sorted((car_index[car_id], score) for car_id, score in scores[user_id].items())
+        indices.extend(index for index, _ in row)
+        data.extend(score for _, score in row)
+        indptr[row_number + 1] = len(indices)
+    indices = np.array(indices, dtype=np.int32)
+    data = np.array(data, dtype=np.float32)
+    car_indptr, car_users, _ = transpose_csr(indptr, indices, data, len(car_ids))
+    return {
+        'indptr': indptr,
+        'indices': indices,
+        'data': data,
+        'user_ids': user_ids,
+        'car_ids': car_ids,
+        'car_indptr': car_indptr,
+        'car_users': car_users,
+    }
+
+
+def write_interaction_snapshot(arrays, root=None, keep=KEEP_VERSIONS, now=None):
+    """
+    Publishes a new snapshot version and makes it current (see columnar_utils.publish_version).
+    Returns the new version's directory.
+    """
+    return publish_version(root or get_snapshot_dir(), VERSION_PREFIX, now or timezone.now(), arrays, meta={
+        'users': len(arrays['user_ids']),
+        'cars': len(arrays['car_ids']),
+        'interactions': len(arrays['data']),
+    }, keep=keep)
+
+
+class InteractionSnapshot:
+    """
+    A memory-mapped snapshot version. The arrays are read-only views of the page cache, so every
+    worker process on the host shares one copy and opening costs no deserialization.
+    """
+
+    def __init__(self, directory):
+        columns, meta = open_columns(directory)
+        self.directory = directory
+        self.created_at = datetime.fromisoformat(meta['created_at'])
+        self.indptr = columns['indptr']
+        self.indices = columns['indices']
+        self.data = columns['data']
+        self.user_ids = columns['user_ids']
+        self.car_ids = columns['car_ids']
+        if 'car_indptr' in columns:
+            self.car_indptr, self.car_users = columns['car_indptr'], columns['car_users']
+        else: # Snapshot built before the inverted index was added
+            self.car_indptr, self.car_users, _ = transpose_csr(self.indptr, self.indices, self.data, len(self.car_ids))
+
+    def recommend(self, user_id, interacted_car_ids, num_recommendations=5, neighborhood_size=NEIGHBORHOOD_SIZE):
+        """
+        Car ids ranked like recommender_utils.rank_neighborhood_cars: the `neighborhood_size` users
+        most Jaccard-similar to `interacted_car_ids` (the target's live interactions), then
+        sum(similarity * score) per car the target hasn't interacted with. Only users found through
+        the car -> users index are considered and only the neighbours' rows are scored, so the cost
+        depends on the target's cars and the neighbourhood, not on the snapshot size.
+        """
+        if not interacted_car_ids or not len(self.user_ids):
+            return []
+        targets = np.array(sorted(interacted_car_ids), dtype=np.int64)
+        positions = np.searchsorted(self.car_ids, targets)
+        known = positions < len(self.car_ids)
+        known[known] = self.car_ids[positions[known]] == targets[known]
+        target_cars = positions[known]
+
+        # Candidates share at least one car; each appears once per shared car
+        candidates, common = np.unique(self.car_users[row_positions(self.car_indptr, target_cars)], return_counts=True)
+        keep = self.user_ids[candidates] != user_id
+        candidates, common = candidates[keep], common[keep]
+        row_lengths = self.indptr[candidates + 1] - self.indptr[candidates]
+        similarity = common / (len(targets) + row_lengths - common)
+        best = top_k_indices(similarity, neighborhood_size) # Candidates are in user id order, so ties go to the lower id
+        neighbors, similarity = candidates[best], similarity[best]
+
+        entries = row_positions(self.indptr, neighbors)
+        cars = self.indices[entries]
+        weights = self.data[entries] * np.repeat(similarity, self.indptr[neighbors + 1] - self.indptr[neighbors])
+        new = ~np.isin(cars, target_cars) # Only recommend new cars
+        scored_cars, inverse = np.unique(cars[new], return_inverse=True)
+        car_scores = np.bincount(inverse, weights=weights[new], minlength=len(scored_cars))
+        ranked = top_k_indices(car_scores, num_recommendations) # scored_cars ascend, so ties go to the lower id
+        return self.car_ids[scored_cars[ranked[car_scores[ranked] > 0]]].tolist()
+
+
+_snapshots = CurrentVersion(InteractionSnapshot)
+
+
+def load_interaction_snapshot(root=None):
+    """
+    The current snapshot for this process, reopened only when `current` points at a new version
+    (one readlink per call). None when no snapshot has been built.
+    """
+    return _snapshots.get(root or get_snapshot_dir())
+
+
+def get_snapshot_age(root=None):
+    """
+    Seconds since the current snapshot was built, or None without one (for the metrics gauge).
+    """
+    return get_version_age(root or get_snapshot_dir())
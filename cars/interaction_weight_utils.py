@@ -0,0 +1,120 @@
+# AutoAggregator/cars/interaction_weight_utils.py
+
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, FloatField, Func, Subquery, Value
+from django.db.models.functions import Coalesce, Power
+from django.utils import timezone
+
+from cars.models import CarSave, CarView, CarViewDaily, JobWatermark
+from cars.rollup_utils import CAR_VIEW_WATERMARK
+
+# Interaction weights: every save counts SAVE_WEIGHT and every view VIEW_WEIGHT, halved every
+# HALF_LIFE_DAYS days since the save/view (settings RECOMMENDER_SAVE_WEIGHT, RECOMMENDER_VIEW_WEIGHT,
+# RECOMMENDER_HALF_LIFE_DAYS; a half-life of 0 disables the decay). Everything is summed in one
+# SQL query: UNION ALL of saves, daily view rollups and not-yet-compacted raw views, GROUP BY car.
+SAVE_WEIGHT = 5.0
+VIEW_WEIGHT = 1.0
+HALF_LIFE_DAYS = 30.0
+# Views older than this many half-lives (weight < 0.4%) are not read at all. Saves have no horizon:
+# however old, a save keeps its car in the user's "already seen" set (see rank_neighborhood_cars).
+DECAY_HORIZON_HALF_LIVES = 8
+CURSOR_CHUNK_SIZE = 5000
+
+
+def get_interaction_weights():
+    """
+    (save weight, view weight, half-life in days) from the settings.
+    """
+    return (
+        float(getattr(settings, 'RECOMMENDER_SAVE_WEIGHT', SAVE_WEIGHT)),
+        float(getattr(settings, 'RECOMMENDER_VIEW_WEIGHT', VIEW_WEIGHT)),
+        float(getattr(settings, 'RECOMMENDER_HALF_LIFE_DAYS', HALF_LIFE_DAYS)),
+    )
+
+
+class EpochSeconds(Func):
+    """
+    Seconds since 1970-01-01 UTC of a datetime expression, as a float.
+    """
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)::double precision'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)', **extra_context)
+
+
+def decayed(weight, date_field, now, half_life_days):
+    """
+    Expression for `weight` (a number or expression) halved every `half_life_days` since `date_field`.
+    """
+    weight = weight if hasattr(weight, 'resolve_expression') else Value(weight, output_field=FloatField())
+    if not half_life_days:
+        return weight
+    age_in_half_lives = (Value(now.timestamp()) - EpochSeconds(F(date_field))) / Value(half_life_days * 86400.0)
+    return weight * Power(Value(0.5), age_in_half_lives, output_field=FloatField())
+
+
+def interaction_weight_queryset(now=None, user_ids=None, user=None):
+    """
+    UNION ALL queryset of (user_id, car_id, weight) rows, one per save, daily rollup row and raw
+    view after the rollup watermark, for every user or just `user` / `user_ids`.
+    """
+    now = now or timezone.now()
+    save_weight, view_weight, half_life_days = get_interaction_weights()
+    watermark = Coalesce(Subquery(JobWatermark.objects.filter(name=CAR_VIEW_WATERMARK).values('last_id')[:1]), 0)
+    querysets = [
+        CarSave.objects.annotate(weight=decayed(save_weight, 'save_date', now, half_life_days)),
+        CarViewDaily.objects.annotate(weight=decayed(view_weight * F('view_count'), 'last_view_date', now, half_life_days)),
+        CarView.objects.filter(pk__gt=watermark, user__isnull=False)
+        .annotate(weight=decayed(view_weight, 'view_date', now, half_life_days)),
+    ]
+    if half_life_days:
+        horizon = now - timedelta(days=half_life_days * DECAY_HORIZON_HALF_LIVES)
+        querysets = [querysets[0], querysets[1].filter(day__gte=horizon.date()), querysets[2].filter(view_date__gte=horizon)]
+    if user is not None:
+        querysets = [queryset.filter(user=user) for queryset in querysets]
+    if user_ids is not None:
+        querysets = [queryset.filter(user_id__in=user_ids) for queryset in querysets]
+    querysets = [queryset.order_by().values_list('user_id', 'car_id', 'weight') for queryset in querysets] # No Meta.ordering inside a UNION
+    return querysets[0].union(*querysets[1:], all=True)
+
+
+def grouped_weights_sql(queryset, group_by):
+    """
+    (alias, sql, params) summing the weights of an interaction_weight_queryset() per `group_by` columns.
+    """
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    columns = ', '.join(group_by)
+    return queryset.db, (f'SELECT {columns}, SUM(weight) AS weight FROM ({sql}) interactions '
+                         f'GROUP BY {columns} ORDER BY {columns}'), params
+
+
+def get_user_car_weights(user, now=None):
+    """
+    (car_id, weight) pairs for every car the user saved or viewed, heaviest first, computed by
+    one SQL aggregation (no Car rows are loaded).
+    """
+    alias, sql, params = grouped_weights_sql(interaction_weight_queryset(now, user=user), ['car_id'])
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, params)
+        pairs = cursor.fetchall()
+    return sorted(pairs, key=lambda pair: (-pair[1], pair[0]))
+
+
+aget_user_car_weights = sync_to_async(get_user_car_weights)
+
+
+def iter_interaction_weights(user_ids=None, now=None):
+    """
+    Yields (user_id, car_id, weight) ordered by user and car, for every user or just `user_ids`.
+    Streams through a server-side cursor on PostgreSQL.
+    """
+    alias, sql, params = grouped_weights_sql(interaction_weight_queryset(now, user_ids=user_ids), ['user_id', 'car_id'])
+    with connections[alias].chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(CURSOR_CHUNK_SIZE):
+            yield from rows
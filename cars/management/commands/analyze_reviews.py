@@ -2,16 +2,21 @@
 
 import os # <--- ADD THIS LINE HERE
 
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
 from django.db import transaction
 from django.db.models import Avg
-from cars.models import Car, Review
-from cars.nlp_utils import get_sentiment, classify_sentiment, perform_aspect_sentiment_analysis
+from cars.models import Car, CarAspectScore, Review
+from cars.command_utils import ProfiledCommand, ProgressReporter, add_progress_arguments
+from cars.nlp_utils import analyze_reviews_batch, classify_sentiment, score_aspects, summarize_aspect_scores
+from cars.weekly_pick_utils import refresh_weekly_picks
 from django.utils import timezone 
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Analyzes review data from the Review model and updates Car models with AI insights.'
 
+    def add_arguments(self, parser):
+        add_progress_arguments(parser)
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting review analysis and car insights update...'))
 
@@ -24,40 +29,51 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('No cars with associated reviews found. Please add reviews in the Django admin or import them.'))
             return
 
+        # Per-car/per-review lines only at --verbosity 2; otherwise periodic progress lines.
+        progress = ProgressReporter(self, options, total=cars_with_reviews.count(), unit='cars', recycle_connections=True)
+
         for car in cars_with_reviews:
-            self.stdout.write(self.style.SUCCESS(f'--- Analyzing reviews for: {car.year} {car.make} {car.model} {car.trim or ""} ---'))
+            progress.row(self.style.SUCCESS(f'--- Analyzing reviews for: {car.year} {car.make} {car.model} {car.trim or ""} ---'))
 
             try:
                 with transaction.atomic():
-                    reviews_for_car = car.reviews.all()
+                    with progress.stage('fetch'):
+                        reviews_for_car = list(car.reviews.all())
 
-                    if not reviews_for_car.exists():
+                    if not reviews_for_car:
                         self.stdout.write(self.style.WARNING(f'No reviews found for {car}, skipping AI analysis.'))
                         continue
 
-                    self.stdout.write(f"DEBUG: Processing car: {car.make} {car.model} {car.year} {car.trim or ''}")
-
-                    review_contents = [review.content for review in reviews_for_car]
+                    # One tokenization per review feeds both the review scores and the ABSA sentences
+                    with progress.stage('score'):
+                        analyses = analyze_reviews_batch([review.content for review in reviews_for_car])
                     all_compound_scores = []
+                    sentence_scores = []
 
-                    for review_obj in reviews_for_car:
-                        scores = get_sentiment(review_obj.content)
-                        compound_score = scores['compound']
+                    for review_obj, (scores, sentences) in zip(reviews_for_car, analyses):
+                        with progress.stage('score'):
+                            compound_score = scores['compound']
 
-                        all_compound_scores.append(compound_score)
+                            all_compound_scores.append(compound_score)
+                            sentence_scores.extend(sentences)
 
-                        review_obj.sentiment_compound_score = round(compound_score, 4)
-                        review_obj.sentiment_classification = classify_sentiment(compound_score)
-                        review_obj.save()
+                            review_obj.sentiment_compound_score = round(compound_score, 4)
+                            review_obj.sentiment_classification = classify_sentiment(compound_score)
+                        with progress.stage('db_write'):
+                            # Only sentiment columns changed: the search-vector signal skips its UPDATE
+                            review_obj.save(update_fields=['sentiment_compound_score', 'sentiment_classification'])
+                        progress.count('reviews')
 
-                        self.stdout.write(f"DEBUG: Analyzed review (ID: {review_obj.reviewer_id or 'N/A'}, Upvotes: {review_obj.source_upvotes or 'N/A'}) for '{review_obj.content[:50]}...'")
+                        progress.row(f"Analyzed review (ID: {review_obj.reviewer_id or 'N/A'}, Upvotes: {review_obj.source_upvotes or 'N/A'}) for '{review_obj.content[:50]}...'")
 
                     if all_compound_scores:
                         avg_compound = sum(all_compound_scores) / len(all_compound_scores)
                         overall_rating = round(((avg_compound + 1) / 2) * 5, 2)
 
                         # --- Use new ABSA function here ---
-                        top_pros_absa, top_cons_absa = perform_aspect_sentiment_analysis(review_contents)
+                        with progress.stage('absa'):
+                            aspect_scores = score_aspects(sentence_scores)
+                            top_pros_absa, top_cons_absa = summarize_aspect_scores(aspect_scores)
 
                         # Refine AI Insight Summary to use ABSA insights
                         ai_summary_parts = []
@@ -87,10 +103,18 @@ class Command(BaseCommand):
                         car.ai_insight_summary = ai_summary
                         car.top_pros = top_pros_absa
                         car.top_cons = top_cons_absa
-                        car.save()
-
-                        self.stdout.write(self.style.SUCCESS(f'Updated AI insights for: {car} (Rating: {overall_rating})'))
-                        self.stdout.write(f'  ABSA Pros: {car.top_pros}, ABSA Cons: {car.top_cons}')
+                        with progress.stage('db_write'):
+                            # Every mentioned aspect, not just the top five, for the catalog's ?aspect= filters
+                            CarAspectScore.objects.filter(car=car).delete()
+                            CarAspectScore.objects.bulk_create([
+                                CarAspectScore(car=car, aspect=aspect, mention_count=mention_count,
+                                               avg_compound=round(avg_compound, 4), top_descriptor=descriptor)
+                                for aspect, (mention_count, avg_compound, _, descriptor) in aspect_scores.items()
+                            ])
+                            car.save()
+
+                        progress.row(self.style.SUCCESS(f'Updated AI insights for: {car} (Rating: {overall_rating})'))
+                        progress.row(f'  ABSA Pros: {car.top_pros}, ABSA Cons: {car.top_cons}')
                         processed_cars_count += 1
                     else:
                         self.stdout.write(self.style.WARNING(f'Could not calculate sentiment for {car} (no valid review scores).'))
@@ -98,7 +122,18 @@ class Command(BaseCommand):
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f'Error processing {car}: {e}'))
                 errors_count += 1
+            finally:
+                progress.advance()
+
+        # Ratings just changed, so the weekly picks are recomputed here rather than on each request.
+        with progress.stage('weekly_picks'):
+            picks = refresh_weekly_picks()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {len(picks)} weekly picks.'))
 
         self.stdout.write(self.style.SUCCESS('--- Review analysis process finished ---'))
         self.stdout.write(self.style.SUCCESS(f'Total Cars Processed: {processed_cars_count}'))
-        self.stdout.write(self.style.WARNING(f'Total Errors: {errors_count}'))
\ No newline at end of file
+        self.stdout.write(self.style.WARNING(f'Total Errors: {errors_count}'))
+
+        progress.count('cars_updated', processed_cars_count)
+        progress.count('errors', errors_count)
+        progress.finish()
@@ -0,0 +1,63 @@
+# AutoAggregator/cars/management/commands/benchmark_api.py
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from cars.models import Car, Review
+from cars.command_utils import ProfiledCommand
+from cars.benchmark_utils import Rollback, generate_cars, generate_reviews, measure_requests
+
+ENDPOINTS = {
+    'car-list': '/api/cars/?page_size=100',
+    'car-detail': '/api/cars/{car_id}/',
+    'review-list': '/api/reviews/?page_size=100',
+    'review-detail': '/api/reviews/{review_id}/',
+}
+
+class Command(ProfiledCommand):
+    help = 'Measures requests/sec of the car/review read endpoints with the fast read path off and on.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cars', type=int, default=500, help='Synthetic cars to create.')
+        parser.add_argument('--reviews-per-car', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=3.0, help='Seconds spent on each endpoint per mode.')
+        parser.add_argument('--use-existing-data', action='store_true',
+                            help='Benchmark against the current database contents instead of synthetic rows.')
+
+    def handle(self, *args, **options):
+        if options['use_existing_data']:
+            self.run(options, seeded=None)
+            return
+        # Synthetic rows live only inside this transaction and are rolled back afterwards.
+        try:
+            with transaction.atomic():
+                cars = generate_cars(options['cars'])
+                reviews = generate_reviews(cars, options['reviews_per_car'])
+                self.run(options, seeded=(cars, reviews))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options, seeded):
+        car = seeded[0][0] if seeded else Car.objects.first()
+        review = seeded[1][0] if seeded and seeded[1] else Review.objects.first()
+        if car is None or review is None:
+            raise CommandError('Need at least one car and one review to benchmark.')
+
+        client = Client(HTTP_HOST='localhost')
+        # Measure serialization itself, not the catalog response cache.
+        with override_settings(CATALOG_HTTP_CACHE=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'localhost']):
+            self.compare(client, car, review, options['duration'])
+
+    def compare(self, client, car, review, duration):
+        for name, template in ENDPOINTS.items():
+            url = template.format(car_id=car.pk, review_id=review.pk)
+            with override_settings(FAST_READ_PATH=False):
+                before, slow_body = measure_requests(client, url, duration)
+            with override_settings(FAST_READ_PATH=True):
+                after, fast_body = measure_requests(client, url, duration)
+
+            identical = 'identical output' if slow_body == fast_body else 'OUTPUT DIFFERS'
+            line = f'{name:<14} {before:8.1f} req/s -> {after:8.1f} req/s  ({after / before:.2f}x, {identical})'
+            self.stdout.write(self.style.SUCCESS(line) if slow_body == fast_body else self.style.ERROR(line))
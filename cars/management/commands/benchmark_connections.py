@@ -0,0 +1,100 @@
+# AutoAggregator/cars/management/commands/benchmark_connections.py
+
+import copy
+import json
+import time
+from importlib.util import find_spec
+
+from django.core.management.base import CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+from cars.benchmark_utils import summarize_timings
+from cars.command_utils import ProfiledCommand
+
+# Connection settings per mode; each request runs the same steps Django does between requests
+# (close_if_unusable_or_obsolete) followed by one query, so only the connection handling differs.
+MODES = {
+    'per_request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': False},
+    'persistent_health_checks': {'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'pool': {'min_size': 1, 'max_size': 2}},
+}
+
+
+class Command(ProfiledCommand):
+    help = ('Measures per-request database overhead with a new connection per request, persistent '
+            'connections (with and without health checks) and a psycopg 3 pool.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Alias whose settings are benchmarked.')
+        parser.add_argument('--repeat', type=int, default=200, help='Simulated requests per mode.')
+        parser.add_argument('--query', default='SELECT 1', help='SQL each simulated request runs.')
+        parser.add_argument('--output', metavar='PATH', help='Write the JSON results to PATH.')
+
+    def handle(self, *args, **options):
+        if options['database'] not in connections.settings:
+            raise CommandError(f'Unknown database alias "{options["database"]}".')
+        base_settings = connections.settings[options['database']]
+
+        results = {}
+        for mode, overrides in MODES.items():
+            if 'pool' in overrides and not self.pool_available(base_settings):
+                self.stdout.write(self.style.WARNING(f'{mode:<26} skipped (needs PostgreSQL and psycopg[pool])'))
+                continue
+            results[mode] = self.run_mode(base_settings, mode, overrides, options)
+            self.stdout.write(
+                f'{mode:<26} median {results[mode]["median"] * 1000:8.3f} ms   p95 {results[mode]["p95"] * 1000:8.3f} ms'
+            )
+
+        baseline = results['per_request']['median']
+        for mode, result in results.items():
+            result['saved_per_request'] = round(baseline - result['median'], 6)
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            f'{mode} saves {result["saved_per_request"] * 1000:.3f} ms/request'
+            for mode, result in results.items() if mode != 'per_request'
+        )))
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump({'database': options['database'], 'vendor': base_settings['ENGINE'],
+                           'query': options['query'], 'results': results}, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+    def pool_available(self, base_settings):
+        return base_settings['ENGINE'] == 'django.db.backends.postgresql' and find_spec('psycopg_pool') is not None
+
+    def connect(self, base_settings, mode, overrides):
+        """
+        A private DatabaseWrapper with the mode's settings, so the shared connections are untouched.
+        """
+        settings_dict = copy.deepcopy(base_settings)
+        settings_dict['OPTIONS'].pop('pool', None)
+        settings_dict['CONN_MAX_AGE'] = overrides['CONN_MAX_AGE']
+        settings_dict['CONN_HEALTH_CHECKS'] = overrides['CONN_HEALTH_CHECKS']
+        if 'pool' in overrides:
+            settings_dict['OPTIONS']['pool'] = overrides['pool']
+        backend = load_backend(settings_dict['ENGINE'])
+        return backend.DatabaseWrapper(settings_dict, alias=f'benchmark-{mode}')
+
+    def run_mode(self, base_settings, mode, overrides, options):
+        connection = self.connect(base_settings, mode, overrides)
+
+        def request():
+            connection.close_if_unusable_or_obsolete() # request_started/request_finished
+            with connection.cursor() as cursor:
+                cursor.execute(options['query'])
+                cursor.fetchall()
+
+        try:
+            request() # Warm-up: the first connection is paid once in every mode
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                request()
+                timings.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+            if 'pool' in overrides:
+                connection.close_pool()
+        return summarize_timings(timings)
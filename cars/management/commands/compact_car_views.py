@@ -0,0 +1,37 @@
+# AutoAggregator/cars/management/commands/compact_car_views.py
+
+from cars.command_utils import ProfiledCommand
+from cars.rollup_utils import compact_car_views_batch, get_retention_days, prune_car_views_batch
+
+class Command(ProfiledCommand):
+    help = ('Rolls raw CarView rows up into daily (user, car, day) counts and prunes rolled-up rows '
+            'older than CAR_VIEW_RETENTION_DAYS. Safe to run often (e.g. every few minutes from cron).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows rolled up / deleted per transaction.')
+        parser.add_argument('--no-prune', action='store_true', help='Only roll up; keep all raw rows.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        compacted_count = 0
+        while True:
+            compacted = compact_car_views_batch(batch_size)
+            if not compacted:
+                break
+            compacted_count += compacted
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  Rolled up {compacted_count} views so far')
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {compacted_count} car views into daily counts.'))
+
+        if options['no_prune']:
+            return
+        pruned_count = 0
+        while True:
+            pruned = prune_car_views_batch(batch_size)
+            if not pruned:
+                break
+            pruned_count += pruned
+        self.stdout.write(self.style.SUCCESS(
+            f'Pruned {pruned_count} raw car views older than {get_retention_days()} days.'
+        ))
@@ -0,0 +1,75 @@
+# AutoAggregator/cars/management/commands/export_reviews.py
+
+from collections import defaultdict
+from itertools import islice
+
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from cars.command_utils import ProfiledCommand, ProgressReporter, add_progress_arguments
+from cars.review_export_utils import (
+    EXPORT_SAFETY_LAG, NPY, PARQUET, default_format, export_queryset, get_export_dir, get_export_watermark, pa,
+    partition_key, remove_parts_after, run_part_name, set_export_watermark, to_columns, write_part,
+)
+
+# Rows fetched from the server-side cursor per round trip
+CURSOR_CHUNK_SIZE = 2000
+
+
+class Command(ProfiledCommand):
+    help = ('Exports reviews with their car and sentiment columns to a columnar snapshot for offline analytics, '
+            'partitioned by car_id/year (Parquet when pyarrow is installed, otherwise memory-mappable .npy '
+            'columns). Incremental: each run appends the reviews retrieved since the previous one. '
+            'Run it after analyze_reviews so new reviews are exported with their sentiment.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help=f'Export root (default: REVIEW_EXPORT_DIR, {get_export_dir()}).')
+        parser.add_argument('--format', choices=[PARQUET, NPY], help=f'Default: {default_format()}.')
+        parser.add_argument('--batch-size', type=int, default=50000,
+                            help='Reviews held in memory before they are written out as part files.')
+        parser.add_argument('--with-content', action='store_true', help='Include the review text column.')
+        parser.add_argument('--full', action='store_true',
+                            help='Delete the existing export and re-export every review (e.g. after a re-analysis).')
+        add_progress_arguments(parser)
+
+    def handle(self, *args, **options):
+        root = options['output_dir'] or get_export_dir()
+        fmt = options['format'] or default_format()
+        if fmt == PARQUET and pa is None:
+            raise CommandError('Parquet export needs pyarrow (pip install pyarrow); use --format npy.')
+
+        since = None if options['full'] else get_export_watermark()
+        cutoff = timezone.now() - EXPORT_SAFETY_LAG
+        removed = remove_parts_after(root, since)
+        if removed and not options['full']:
+            self.stdout.write(self.style.WARNING(f'Removed {removed} part(s) left by an interrupted run.'))
+
+        queryset = export_queryset(since, cutoff, with_content=options['with_content'])
+        progress = ProgressReporter(self, options, total=queryset.count(), unit='reviews')
+        rows = queryset.iterator(chunk_size=CURSOR_CHUNK_SIZE) # Server-side cursor on PostgreSQL
+
+        batch_number = 0
+        while True:
+            with progress.stage('fetch'):
+                batch = list(islice(rows, options['batch_size']))
+            if not batch:
+                break
+            with progress.stage('write'):
+                partitions = defaultdict(list)
+                for row in batch:
+                    partitions[partition_key(row)].append(row)
+                for (car_id, year), partition_rows in partitions.items():
+                    path = write_part(root, car_id, year, run_part_name(cutoff, batch_number),
+                                      to_columns(partition_rows, with_content=options['with_content']), fmt)
+                    progress.count('parts')
+                    progress.row(f'  {len(partition_rows):>7} reviews -> {path}')
+            batch_number += 1
+            progress.advance(len(batch))
+
+        # Only now do the new parts count as exported; an interrupted run's parts are removed next time
+        set_export_watermark(cutoff)
+        progress.finish()
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {progress.done} reviews retrieved up to {cutoff:%Y-%m-%d %H:%M:%S} '
+            f'into {progress.counters.get("parts", 0)} {fmt} part(s) under {root}.'
+        ))
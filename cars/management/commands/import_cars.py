@@ -2,9 +2,10 @@
 
 import requests
 import os
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
 from django.db import transaction
 from cars.models import Car
+from cars.command_utils import ProfiledCommand, ProgressReporter, add_progress_arguments
 from datetime import date
 
 CAR_API_KEY = "e0a5df54-5827-4c44-ae05-bdc57b1db2f3" # Your actual key
@@ -13,9 +14,12 @@ CAR_API_BASE_URL = "https://carapi.app/api/v1"
 TARGET_YEAR = 2024 # Or 2023, ensure this matches your mock data years
 TARGET_MAKES = ["Toyota", "Honda", "Ford", "Tesla", "Subaru", "Mazda"]
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Imports car data from an external API (or mock data) and updates with basic AI insights.'
 
+    def add_arguments(self, parser):
+        add_progress_arguments(parser)
+
     def handle(self, *args, **options):
         if not CAR_API_KEY or CAR_API_KEY == "YOUR_CAR_API_KEY_HERE":
             raise CommandError("CAR_API_KEY is not set. Please get one from carapi.app and replace 'YOUR_CAR_API_KEY_HERE' in import_cars.py")
@@ -49,8 +53,11 @@ class Command(BaseCommand):
         ]
         # --- END MOCK API DATA ---
 
+        # Per-car lines only at --verbosity 2; otherwise periodic progress lines.
+        progress = ProgressReporter(self, options, total=len(mock_data_for_import), unit='cars', recycle_connections=True)
+
         for make_name in TARGET_MAKES:
-            self.stdout.write(self.style.SUCCESS(f'--- Importing {make_name} cars for year {TARGET_YEAR} ---'))
+            progress.row(self.style.SUCCESS(f'--- Importing {make_name} cars for year {TARGET_YEAR} ---'))
             try:
                 # --- COMMENT OUT / REMOVE THIS SECTION FOR NOW ---
                 # response = requests.get(
@@ -64,17 +71,18 @@ class Command(BaseCommand):
 
                 # --- ASSIGN MOCK DATA HERE ---
                 # Filter mock_data_for_import based on current make_name and TARGET_YEAR
-                api_data = [item for item in mock_data_for_import if item['make_name'] == make_name and item['model_year'] == TARGET_YEAR]
+                with progress.stage('fetch'):
+                    api_data = [item for item in mock_data_for_import if item['make_name'] == make_name and item['model_year'] == TARGET_YEAR]
 
                 if not api_data:
                     self.stdout.write(self.style.WARNING(f'No mock data found for {make_name} {TARGET_YEAR}'))
                     continue
 
                 for item in api_data:
-                    self.stdout.write(f"DEBUG: Processing car from API: {item.get('make_name')} {item.get('model_name')} {item.get('model_year')} {item.get('model_trim', '')}")
+                    progress.row(f"Processing car from API: {item.get('make_name')} {item.get('model_name')} {item.get('model_year')} {item.get('model_trim', '')}")
 
                     try:
-                        with transaction.atomic():
+                        with progress.stage('db_write'), transaction.atomic():
                             car, created = Car.objects.update_or_create(
                                 make=item.get('make_name'),
                                 model=item.get('model_name'),
@@ -100,14 +108,15 @@ class Command(BaseCommand):
 
                             if created:
                                 imported_count += 1
-                                self.stdout.write(self.style.SUCCESS(f'Successfully imported: {car}'))
+                                progress.row(self.style.SUCCESS(f'Successfully imported: {car}'))
                             else:
                                 updated_count += 1
-                                self.stdout.write(self.style.SUCCESS(f'Successfully updated: {car}'))
+                                progress.row(self.style.SUCCESS(f'Successfully updated: {car}'))
 
                     except Exception as e:
                         skipped_count += 1
                         self.stdout.write(self.style.ERROR(f'Error processing {item.get("make_name")} {item.get("model_name")} {item.get("model_year")}: {e}'))
+                    progress.advance()
 
             except Exception as e: # Catch any errors from processing make_name or mock data filtering
                 self.stdout.write(self.style.ERROR(f"An unexpected error occurred during import for make {make_name} in year {TARGET_YEAR}: {e}"))
@@ -116,4 +125,9 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('--- Car import process finished ---'))
         self.stdout.write(self.style.SUCCESS(f'Total Imported: {imported_count}'))
         self.stdout.write(self.style.SUCCESS(f'Total Updated: {updated_count}'))
-        self.stdout.write(self.style.WARNING(f'Total Skipped (Errors): {skipped_count}'))
\ No newline at end of file
+        self.stdout.write(self.style.WARNING(f'Total Skipped (Errors): {skipped_count}'))
+
+        progress.count('imported', imported_count)
+        progress.count('updated', updated_count)
+        progress.count('skipped', skipped_count)
+        progress.finish()
@@ -3,9 +3,11 @@
 import requests
 import os
 import time
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
 from django.db import transaction
 from cars.models import Car, Review
+from cars.command_utils import ProfiledCommand, ProgressReporter, add_progress_arguments
+from cars.trending_utils import REVIEW_SIGNAL, record_trending_event
 from datetime import date
 from django.utils import timezone
 from requests.exceptions import RequestException, HTTPError
@@ -25,7 +27,7 @@ REDDIT_REQUEST_INTERVAL = 3 # seconds to wait between individual Reddit API call
 # --- END Reddit API Configuration ---
 
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = 'Ingests review data from Reddit API for analysis.'
 
     def add_arguments(self, parser):
@@ -36,6 +38,7 @@ class Command(BaseCommand):
         parser.add_argument('--max-pages', type=int, default=1, help='Max number of pages (API calls) to fetch for each car. Each page returns "limit" items.')
         parser.add_argument('--subreddit', type=str, default='cars', help='Specify Reddit subreddit to search (e.g., cars, whatcarshouldibuy)')
         parser.add_argument('--fetch-comments', action='store_true', default=False, help='Fetch comments for each post (increases API calls).')
+        add_progress_arguments(parser)
 
     def get_reddit_access_token(self):
         # ... (unchanged) ...
@@ -73,30 +76,32 @@ class Command(BaseCommand):
         # The 'article' is the post ID (e.g., "1iq5cz7").
         api_url = f"{REDDIT_API_BASE_URL}/r/{subreddit}/comments/{post_id}.json"
         
-        self.stdout.write(f"DEBUG: Fetching comments for post {post_id} in r/{subreddit} (limit {limit})...")
-        self.stdout.write(f"DEBUG: Attempting comments URL: {api_url}") # <--- ADDED DEBUG PRINT FOR URL
+        self.progress.row(f"Fetching comments for post {post_id} in r/{subreddit} (limit {limit})...")
+        self.progress.row(f"Attempting comments URL: {api_url}")
         try:
-            response = requests.get(api_url, 
-                                    headers=headers, 
-                                    params={'limit': limit, 'sort': 'top'},
-                                    timeout=30)
-            response.raise_for_status()
+            with self.progress.stage('fetch'):
+                response = requests.get(api_url, 
+                                        headers=headers, 
+                                        params={'limit': limit, 'sort': 'top'},
+                                        timeout=30)
+                response.raise_for_status()
             
-            comments_tree = response.json()
-            if len(comments_tree) > 1 and comments_tree[1] and comments_tree[1].get('data', {}).get('children'):
-                for comment in comments_tree[1]['data']['children']:
-                    comment_data = comment.get('data', {})
-                    if comment_data.get('body') and comment_data['body'].strip() != '[deleted]' and comment_data['body'].strip() != '[removed]' and len(comment_data['body'].strip()) > 50:
-                        comments_data.append({
-                            'text': comment_data['body'].strip(),
-                            'review_id': comment_data.get('id'),
-                            'score': comment_data.get('score'),
-                            'source': f'Reddit (r/{subreddit} - comment)',
-                            'source_url': f"https://www.reddit.com{comment_data.get('permalink')}",
-                            'author': f"u/{comment_data.get('author')}" if comment_data.get('author') else 'Anonymous',
-                            'date': date.fromtimestamp(comment_data.get('created_utc')) if comment_data.get('created_utc') else None # Use post_data here? No, comment_data
-                        })
-            self.stdout.write(self.style.SUCCESS(f"Fetched {len(comments_data)} comments for post {post_id}."))
+            with self.progress.stage('parse'):
+                comments_tree = response.json()
+                if len(comments_tree) > 1 and comments_tree[1] and comments_tree[1].get('data', {}).get('children'):
+                    for comment in comments_tree[1]['data']['children']:
+                        comment_data = comment.get('data', {})
+                        if comment_data.get('body') and comment_data['body'].strip() != '[deleted]' and comment_data['body'].strip() != '[removed]' and len(comment_data['body'].strip()) > 50:
+                            comments_data.append({
+                                'text': comment_data['body'].strip(),
+                                'review_id': comment_data.get('id'),
+                                'score': comment_data.get('score'),
+                                'source': f'Reddit (r/{subreddit} - comment)',
+                                'source_url': f"https://www.reddit.com{comment_data.get('permalink')}",
+                                'author': f"u/{comment_data.get('author')}" if comment_data.get('author') else 'Anonymous',
+                                'date': date.fromtimestamp(comment_data.get('created_utc')) if comment_data.get('created_utc') else None # Use post_data here? No, comment_data
+                            })
+            self.progress.row(self.style.SUCCESS(f"Fetched {len(comments_data)} comments for post {post_id}."))
             return comments_data
         except HTTPError as e:
             self.stdout.write(self.style.ERROR(f"HTTP Error fetching comments for post {post_id}: {e.response.status_code} - {e.response.text}"))
@@ -121,7 +126,7 @@ class Command(BaseCommand):
         all_reviews_data = []
         after = None # For pagination
 
-        self.stdout.write(self.style.MIGRATE_HEADING(f"Fetching '{query}' posts from r/{subreddit} (up to {max_pages} pages)..."))
+        self.progress.row(self.style.MIGRATE_HEADING(f"Fetching '{query}' posts from r/{subreddit} (up to {max_pages} pages)..."))
 
         for page_num in range(max_pages):
             params = {
@@ -134,9 +139,11 @@ class Command(BaseCommand):
                 params['after'] = after
 
             try:
-                response = requests.get(f"{REDDIT_API_BASE_URL}/r/{subreddit}/search.json", headers=headers, params=params, timeout=30)
-                response.raise_for_status()
-                data = response.json()
+                with self.progress.stage('fetch'):
+                    response = requests.get(f"{REDDIT_API_BASE_URL}/r/{subreddit}/search.json", headers=headers, params=params, timeout=30)
+                    response.raise_for_status()
+                with self.progress.stage('parse'):
+                    data = response.json()
                 
                 posts = data.get('data', {}).get('children', [])
                 if not posts:
@@ -144,25 +151,27 @@ class Command(BaseCommand):
                     break
 
                 for post in posts:
-                    post_data = post.get('data', {})
-                    review_content = post_data.get('selftext') or post_data.get('title')
-                    
-                    if review_content and len(review_content.strip()) > 50:
-                        review_content = review_content.replace('[deleted]', '').replace('[removed]', '').strip()
-                        reviews_data_item = {
-                            'text': review_content,
-                            'review_id': post_data.get('id'), # Post ID
-                            'score': post_data.get('score'),
-                            'source': f'Reddit (r/{subreddit} - post)',
-                            'source_url': f"https://www.reddit.com{post_data.get('permalink')}",
-                            'author': f"u/{post_data.get('author')}" if post_data.get('author') else 'Anonymous',
-                            'date': date.fromtimestamp(post_data.get('created_utc')) if post_data.get('created_utc') else None
-                        }
-                        all_reviews_data.append(reviews_data_item)
+                    with self.progress.stage('parse'):
+                        post_data = post.get('data', {})
+                        review_content = post_data.get('selftext') or post_data.get('title')
+                        
+                        if review_content and len(review_content.strip()) > 50:
+                            review_content = review_content.replace('[deleted]', '').replace('[removed]', '').strip()
+                            reviews_data_item = {
+                                'text': review_content,
+                                'review_id': post_data.get('id'), # Post ID
+                                'score': post_data.get('score'),
+                                'source': f'Reddit (r/{subreddit} - post)',
+                                'source_url': f"https://www.reddit.com{post_data.get('permalink')}",
+                                'author': f"u/{post_data.get('author')}" if post_data.get('author') else 'Anonymous',
+                                'date': date.fromtimestamp(post_data.get('created_utc')) if post_data.get('created_utc') else None
+                            }
+                            all_reviews_data.append(reviews_data_item)
                     
                     if fetch_comments and post_data.get('num_comments', 0) > 0:
-                        self.stdout.write(f"DEBUG: Found {post_data.get('num_comments', 0)} comments for post {post_data.get('id')}. Fetching...")
-                        time.sleep(REDDIT_REQUEST_INTERVAL) # <--- ADDED SLEEP HERE BEFORE FETCHING COMMENTS
+                        self.progress.row(f"Found {post_data.get('num_comments', 0)} comments for post {post_data.get('id')}. Fetching...")
+                        with self.progress.stage('rate_limit_wait'):
+                            time.sleep(REDDIT_REQUEST_INTERVAL) # <--- ADDED SLEEP HERE BEFORE FETCHING COMMENTS
                         comments_for_post = self.fetch_comments_for_post(access_token, subreddit, post_data.get('id'), limit=50)
                         all_reviews_data.extend(comments_for_post)
 
@@ -172,8 +181,9 @@ class Command(BaseCommand):
                     break
 
                 if page_num < max_pages - 1 and after:
-                    self.stdout.write(f"Sleeping for {REDDIT_REQUEST_INTERVAL} seconds to respect API rate limits between pages...")
-                    time.sleep(REDDIT_REQUEST_INTERVAL)
+                    self.progress.row(f"Sleeping for {REDDIT_REQUEST_INTERVAL} seconds to respect API rate limits between pages...")
+                    with self.progress.stage('rate_limit_wait'):
+                        time.sleep(REDDIT_REQUEST_INTERVAL)
 
             except HTTPError as e:
                 self.stdout.write(self.style.ERROR(f"HTTP Error fetching posts for query '{query}' (Page {page_num + 1}): {e.response.status_code} - {e.response.text}"))
@@ -185,7 +195,7 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.ERROR(f"Unexpected Error fetching posts for query '{query}' (Page {page_num + 1}): {e}"))
                 return []
             
-            self.stdout.write(self.style.SUCCESS(f"Finished fetching posts and comments for '{query}'. Total fetched: {len(all_reviews_data)}."))
+            self.progress.row(self.style.SUCCESS(f"Finished fetching posts and comments for '{query}'. Total fetched: {len(all_reviews_data)}."))
             return all_reviews_data
 
 
@@ -225,6 +235,9 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f"Aborting ingestion due to Reddit authentication error: {e}"))
             return
 
+        # Per-review lines only at --verbosity 2; otherwise periodic progress lines.
+        self.progress = ProgressReporter(self, options, total=cars_queryset.count(), unit='cars', recycle_connections=True)
+
         for car in cars_queryset:
             search_query = f"{car.year} {car.make} {car.model}"
             
@@ -237,11 +250,12 @@ class Command(BaseCommand):
                     self.stdout.write(self.style.WARNING(f'No reviews found on Reddit for "{search_query}" in r/{subreddit}.'))
                     continue
 
+                new_for_car = 0
                 for review_item in reviews_from_source:
                     try:
                         review_date_obj = review_item.get('date')
                         
-                        with transaction.atomic():
+                        with self.progress.stage('db_write'), transaction.atomic():
                             review_obj, created = Review.objects.update_or_create(
                                 car=car,
                                 source_name=review_item.get('source'),
@@ -258,10 +272,11 @@ class Command(BaseCommand):
 
                             if created:
                                 ingested_count += 1
-                                self.stdout.write(self.style.SUCCESS(f'Successfully ingested NEW review for {car} from {review_obj.source_name} (ID: {review_obj.reviewer_id}, Upvotes: {review_obj.source_upvotes})'))
+                                new_for_car += 1
+                                self.progress.row(self.style.SUCCESS(f'Successfully ingested NEW review for {car} from {review_obj.source_name} (ID: {review_obj.reviewer_id}, Upvotes: {review_obj.source_upvotes})'))
                             else:
                                 updated_count += 1
-                                self.stdout.write(self.style.WARNING(f'Review for {car} from {review_obj.source_name} (ID: {review_obj.reviewer_id}) already exists, UPDATED. Upvotes: {review_obj.source_upvotes}'))
+                                self.progress.row(self.style.WARNING(f'Review for {car} from {review_obj.source_name} (ID: {review_obj.reviewer_id}) already exists, UPDATED. Upvotes: {review_obj.source_upvotes}'))
                                 
                     except Car.DoesNotExist:
                         self.stdout.write(self.style.ERROR(f"Error: Car {car.make} {car.model} {car.year} not found for review. Skipping review ingestion."))
@@ -270,14 +285,24 @@ class Command(BaseCommand):
                         self.stdout.write(self.style.ERROR(f'An unexpected error occurred ingesting review for {car} (ID: {review_item.get("review_id", "N/A")}): {e}'))
                         skipped_count += 1
 
+                if new_for_car:
+                    record_trending_event(car.id, REVIEW_SIGNAL, new_for_car) # New reviews count towards the car's trending score
+
             except RequestException as e:
                 self.stdout.write(self.style.ERROR(f"API request failed for {search_query} from Reddit: {e}"))
                 skipped_count += 1
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f'An unexpected error occurred during Reddit fetch or processing for "{search_query}": {e}'))
                 skipped_count += 1
+            finally:
+                self.progress.advance()
 
         self.stdout.write(self.style.SUCCESS('--- Review ingestion process finished ---'))
         self.stdout.write(self.style.SUCCESS(f'Total Reviews Newly Ingested: {ingested_count}'))
         self.stdout.write(self.style.SUCCESS(f'Total Reviews Updated: {updated_count}'))
-        self.stdout.write(self.style.WARNING(f'Total Skipped/Errors: {skipped_count}'))
\ No newline at end of file
+        self.stdout.write(self.style.WARNING(f'Total Skipped/Errors: {skipped_count}'))
+
+        self.progress.count('reviews_ingested', ingested_count)
+        self.progress.count('reviews_updated', updated_count)
+        self.progress.count('skipped', skipped_count)
+        self.progress.finish()
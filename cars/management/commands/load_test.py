@@ -0,0 +1,113 @@
+# AutoAggregator/cars/management/commands/load_test.py
+
+import json
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import CommandError
+
+from cars.benchmark_utils import summarize_timings
+from cars.command_utils import ProfiledCommand
+
+# Paths requested round-robin, relative to each target's base URL. The last two need --session-cookie.
+DEFAULT_PATHS = [
+    'cars/?page_size=20',
+    'cars/?ordering=-overall_rating&page_size=20',
+    'cars/weekly_recommendation/',
+    'cars/personalized_recommendations/',
+    'car-views/history/',
+]
+DEFAULT_TARGETS = ['wsgi=http://127.0.0.1:8000/api/', 'asgi=http://127.0.0.1:8001/api/async/']
+
+
+class Command(ProfiledCommand):
+    help = ('Sends concurrent GETs to one or more running servers (e.g. gunicorn serving core.wsgi and '
+            'uvicorn serving core.asgi) and reports throughput and p50/p99 latency per target.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', metavar='NAME=BASE_URL',
+                            help=f'Server to test; repeat to compare. Default: {" ".join(DEFAULT_TARGETS)}.')
+        parser.add_argument('--path', action='append', metavar='PATH',
+                            help='Path relative to each base URL; repeat for several (default: the catalog and '
+                                 'recommendation endpoints).')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per target.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at once.')
+        parser.add_argument('--session-cookie', help='sessionid cookie value for the authenticated endpoints.')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds.')
+        parser.add_argument('--output', metavar='PATH', help='Write the JSON results to PATH.')
+
+    def handle(self, *args, **options):
+        targets = []
+        for spec in options['target'] or DEFAULT_TARGETS:
+            name, sep, base_url = spec.partition('=')
+            if not sep or not base_url.startswith(('http://', 'https://')):
+                raise CommandError(f'Invalid --target "{spec}"; expected NAME=http://host:port/prefix/.')
+            targets.append((name, base_url if base_url.endswith('/') else base_url + '/'))
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive.')
+
+        paths = options['path'] or DEFAULT_PATHS
+        headers = {'Accept': 'application/json'}
+        if options['session_cookie']:
+            headers['Cookie'] = f'sessionid={options["session_cookie"]}'
+
+        results = {}
+        for name, base_url in targets:
+            urls = [base_url + paths[i % len(paths)].lstrip('/') for i in range(options['requests'])]
+            self.send(urls[:options['concurrency']], headers, options) # Warm-up: connections, caches, lazy imports
+            results[name] = self.run_target(urls, headers, options)
+            self.report(name, results[name])
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump({'paths': paths, 'concurrency': options['concurrency'], 'results': results}, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+    def fetch(self, url, headers, timeout):
+        """
+        (seconds, status) of one GET; status is None when the request never got a response.
+        """
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, OSError):
+            status = None
+        return time.perf_counter() - started, status
+
+    def send(self, urls, headers, options):
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            return list(executor.map(lambda url: self.fetch(url, headers, options['timeout']), urls))
+
+    def run_target(self, urls, headers, options):
+        started = time.perf_counter()
+        samples = self.send(urls, headers, options)
+        elapsed = time.perf_counter() - started
+
+        statuses = dict(Counter(str(status) for _, status in samples))
+        timings = [seconds for seconds, status in samples if status is not None and status < 400]
+        result = {
+            'requests': len(urls),
+            'elapsed': round(elapsed, 3),
+            'throughput': round(len(urls) / elapsed, 1),
+            'statuses': statuses,
+            'errors': len(urls) - len(timings),
+        }
+        if timings:
+            result['latency'] = summarize_timings(timings)
+        return result
+
+    def report(self, name, result):
+        latency = result.get('latency')
+        if latency is None:
+            self.stdout.write(self.style.ERROR(f'{name:<8} every request failed: {result["statuses"]}'))
+            return
+        line = (f'{name:<8} {result["throughput"]:8.1f} req/s   p50 {latency["median"] * 1000:8.2f} ms   '
+                f'p99 {latency["p99"] * 1000:8.2f} ms   ({result["requests"]} requests, {result["errors"]} errors)')
+        self.stdout.write(self.style.WARNING(line) if result['errors'] else self.style.SUCCESS(line))
@@ -0,0 +1,41 @@
+# AutoAggregator/cars/management/commands/rebuild_search_vectors.py
+
+from django.core.management.base import CommandError
+from django.db import connection
+from cars.models import Car, Review
+from cars.command_utils import ProfiledCommand
+from cars.search_utils import update_search_vectors
+
+SEARCHABLE_MODELS = {'car': Car, 'review': Review}
+
+class Command(ProfiledCommand):
+    help = 'Backfills the full-text search vectors on Car and Review in primary-key batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(SEARCHABLE_MODELS), help='Only rebuild one model (default: all).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows updated per UPDATE statement.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Full-text search vectors require PostgreSQL.')
+
+        batch_size = options['batch_size']
+        models = [SEARCHABLE_MODELS[options['model']]] if options['model'] else SEARCHABLE_MODELS.values()
+
+        for model in models:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'Rebuilding search vectors for {model.__name__}...'))
+            updated_count = 0
+            pks = model.objects.order_by('pk').values_list('pk', flat=True)
+
+            # Walk the table in pk order so each batch is a small, index-driven UPDATE.
+            last_pk = 0
+            while True:
+                batch = list(pks.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                updated_count += update_search_vectors(model, batch)
+                last_pk = batch[-1]
+                if options['verbosity'] >= 2:
+                    self.stdout.write(f'  {model.__name__}: {updated_count} rows updated (last pk {last_pk})')
+
+            self.stdout.write(self.style.SUCCESS(f'Total {model.__name__} rows updated: {updated_count}'))
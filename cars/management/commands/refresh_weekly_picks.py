@@ -0,0 +1,16 @@
+# AutoAggregator/cars/management/commands/refresh_weekly_picks.py
+
+from cars.command_utils import ProfiledCommand
+from cars.weekly_pick_utils import refresh_weekly_picks
+
+class Command(ProfiledCommand):
+    help = 'Recomputes the weekly recommendation (overall and per body type). Schedule weekly, e.g. via cron.'
+
+    def handle(self, *args, **options):
+        picks = refresh_weekly_picks()
+        if not picks:
+            self.stdout.write(self.style.WARNING('No rated cars found; no weekly picks stored.'))
+            return
+        for scope, car in picks.items():
+            self.stdout.write(f'  {scope}: {car.year} {car.make} {car.model} {car.trim or ""}'.rstrip())
+        self.stdout.write(self.style.SUCCESS(f'Stored {len(picks)} weekly picks.'))
@@ -0,0 +1,175 @@
+# AutoAggregator/cars/management/commands/run_benchmarks.py
+
+import json
+import platform
+import subprocess
+from io import StringIO
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from cars.benchmark_utils import (
+    Rollback, compare_results, generate_cars, generate_reviews, generate_users, time_call,
+)
+from cars.cache_utils import invalidate_catalog_version
+from cars.command_utils import ProfiledCommand
+from cars.nlp_utils import analyze_reviews_batch, get_sentiment, perform_aspect_sentiment_analysis
+from cars.recommender_utils import get_personalized_recommendations
+
+# Dataset sizes per scale; "smoke" is small enough for CI.
+SCALES = {
+    'smoke': {'cars': 5, 'reviews_per_car': 2, 'users': 4},
+    'small': {'cars': 50, 'reviews_per_car': 5, 'users': 20},
+    'medium': {'cars': 250, 'reviews_per_car': 10, 'users': 60},
+    'large': {'cars': 1000, 'reviews_per_car': 20, 'users': 150},
+}
+DEFAULT_SCALES = 'small,medium'
+
+# Cars whose reviews feed one ABSA call
+ABSA_CARS = 10
+
+
+class Command(ProfiledCommand):
+    help = ('Times the NLP, recommender, analyze_reviews and API hot paths on deterministic synthetic data '
+            'at several scales, writes JSON results and optionally flags regressions against a baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default=DEFAULT_SCALES,
+                            help=f'Comma-separated scales to run ({", ".join(SCALES)}). Default: {DEFAULT_SCALES}.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case (the command case runs once).')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic data generators.')
+        parser.add_argument('--only', help='Run only cases whose name contains this string (e.g. "nlp.").')
+        parser.add_argument('--output', metavar='PATH', help='Write the JSON results to PATH.')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare this run against an earlier --output file.')
+        parser.add_argument('--threshold', type=float, default=0.15,
+                            help='Fractional median slowdown that counts as a regression (default 0.15).')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error if --baseline comparison finds regressions.')
+
+    def handle(self, *args, **options):
+        scales = [name.strip() for name in options['scales'].split(',') if name.strip()]
+        unknown = [name for name in scales if name not in SCALES]
+        if unknown:
+            raise CommandError(f'Unknown scale(s): {", ".join(unknown)}. Choose from {", ".join(SCALES)}.')
+
+        results = {'meta': self.environment(options, scales), 'results': {}}
+        for scale in scales:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'--- Scale "{scale}": {SCALES[scale]} ---'))
+            results['results'][scale] = self.run_scale(SCALES[scale], options)
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(results, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = self.report_comparison(compare_results(baseline, results, options['threshold']))
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{regressions} benchmark regression(s) beyond {options["threshold"]:.0%}.')
+
+    def environment(self, options, scales):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                    timeout=5).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'git_commit': commit,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'seed': options['seed'],
+            'repeat': options['repeat'],
+            'scales': {name: SCALES[name] for name in scales},
+        }
+
+    def run_scale(self, scale, options):
+        # Synthetic rows live only inside this transaction and are rolled back afterwards.
+        try:
+            with transaction.atomic():
+                cars = generate_cars(scale['cars'], seed=options['seed'])
+                reviews = generate_reviews(cars, scale['reviews_per_car'], seed=options['seed'])
+                users = generate_users(scale['users'], cars, seed=options['seed'])
+                # Measure the code paths themselves, not the catalog response cache.
+                with override_settings(CATALOG_HTTP_CACHE=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'localhost']):
+                    results = self.run_cases(cars, reviews, users, options)
+                raise Rollback
+        except Rollback:
+            pass
+        invalidate_catalog_version() # Don't let the rolled-back rows linger in the cached catalog version
+        return results
+
+    def cases(self, cars, reviews, users):
+        """
+        (name, callable, items, repeat override) for every benchmarked code path.
+        """
+        texts = [review.content for review in reviews]
+        absa_texts = [review.content for review in reviews if review.car_id in {car.pk for car in cars[:ABSA_CARS]}]
+        heavy_user = users[0]
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(heavy_user)
+        car = cars[0]
+
+        def get(url):
+            def request():
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'GET {url} returned {response.status_code}')
+            return request
+
+        return [
+            ('nlp.get_sentiment', lambda: [get_sentiment(text) for text in texts], len(texts), None),
+            ('nlp.perform_aspect_sentiment_analysis', lambda: perform_aspect_sentiment_analysis(absa_texts), len(absa_texts), None),
+            ('nlp.analyze_reviews_batch', lambda: analyze_reviews_batch(texts), len(texts), None),
+            ('recommender.get_personalized_recommendations', lambda: get_personalized_recommendations(heavy_user), len(users), None),
+            ('command.analyze_reviews', lambda: call_command('analyze_reviews', verbosity=0, stdout=StringIO()), len(cars), 1),
+            ('api.car_list', get('/api/cars/?page_size=100'), 1, None),
+            ('api.car_list_filtered', get(f'/api/cars/?make={car.make}&ordering=-overall_rating'), 1, None),
+            ('api.car_detail', get(f'/api/cars/{car.pk}/'), 1, None),
+            ('api.review_list', get('/api/reviews/?page_size=100'), 1, None),
+            ('api.personalized_recommendations', get('/api/cars/personalized_recommendations/'), 1, None),
+            ('api.dashboard', get('/api/me/dashboard/'), 1, None),
+        ]
+
+    def run_cases(self, cars, reviews, users, options):
+        results = {}
+        for name, func, items, repeat in self.cases(cars, reviews, users):
+            if options['only'] and options['only'] not in name:
+                continue
+            try:
+                func() # Warm-up: imports, lazy NLTK/VADER loading, query plan caches
+                result = time_call(func, repeat or options['repeat'])
+            except Exception as e: # Keep going; a broken case shouldn't hide the others
+                results[name] = {'error': f'{type(e).__name__}: {" ".join(str(e).split())[:200]}', 'items': items}
+                self.stdout.write(self.style.ERROR(f'{name:<48} ERROR {results[name]["error"]}'))
+                continue
+            result['items'] = items
+            results[name] = result
+            self.stdout.write(
+                f'{name:<48} median {result["median"] * 1000:10.2f} ms   p95 {result["p95"] * 1000:10.2f} ms   '
+                f'({result["repeat"]} runs, {items} items)'
+            )
+        return results
+
+    def report_comparison(self, rows):
+        self.stdout.write(self.style.MIGRATE_HEADING('--- Comparison against baseline (median) ---'))
+        styles = {'regression': self.style.ERROR, 'improved': self.style.SUCCESS, 'error': self.style.ERROR}
+        for row in rows:
+            if row['ratio'] is not None:
+                change = f'{row["baseline"] * 1000:10.2f} ms -> {row["current"] * 1000:10.2f} ms ({row["ratio"]:.2f}x)'
+            else:
+                change = ''
+            line = f'{row["scale"]:<7} {row["case"]:<48} {row["status"].upper():<10} {change}'
+            self.stdout.write(styles.get(row['status'], str)(line))
+        regressions = sum(1 for row in rows if row['status'] == 'regression')
+        summary = f'{regressions} regression(s), {sum(1 for row in rows if row["status"] == "improved")} improvement(s).'
+        self.stdout.write(self.style.ERROR(summary) if regressions else self.style.SUCCESS(summary))
+        return regressions
@@ -0,0 +1,35 @@
+# AutoAggregator/cars/management/commands/snapshot_interactions.py
+
+from cars.command_utils import ProfiledCommand, ProgressReporter, add_progress_arguments
+from cars.interaction_snapshot_utils import (
+    KEEP_VERSIONS, build_csr, collect_interaction_scores, get_snapshot_dir, write_interaction_snapshot,
+)
+
+
+class Command(ProfiledCommand):
+    help = ('Writes the user-car interaction scores (saves and recent views) as a memory-mapped CSR snapshot '
+            'that every recommender worker on this host shares, and swaps it in atomically. Schedule it on '
+            'each web host (e.g. every 15 minutes, after compact_car_views).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help=f'Snapshot root (default: INTERACTION_SNAPSHOT_DIR, {get_snapshot_dir()}).')
+        parser.add_argument('--keep', type=int, default=KEEP_VERSIONS, help='Snapshot versions kept on disk.')
+        add_progress_arguments(parser)
+
+    def handle(self, *args, **options):
+        progress = ProgressReporter(self, options, unit='users')
+
+        with progress.stage('fetch'):
+            scores = collect_interaction_scores()
+        with progress.stage('build'):
+            arrays = build_csr(scores)
+        with progress.stage('write'):
+            directory = write_interaction_snapshot(arrays, root=options['output_dir'], keep=max(options['keep'], 1))
+
+        progress.count('interactions', len(arrays['data']))
+        progress.advance(len(arrays['user_ids']))
+        progress.finish()
+        self.stdout.write(self.style.SUCCESS(
+            f'Snapshot of {len(arrays["user_ids"])} users x {len(arrays["car_ids"])} cars '
+            f'({len(arrays["data"])} interactions) is now current: {directory}'
+        ))
@@ -0,0 +1,76 @@
+# AutoAggregator/cars/management/commands/train_recommender.py
+
+from cars.als_utils import (
+    ALPHA, FACTORS, ITERATIONS, KEEP_VERSIONS, REGULARIZATION, ALSModel, get_model_dir, popularity_recommender,
+    precision_at_k, split_holdout, train_als, write_als_model,
+)
+from cars.command_utils import ProfiledCommand, ProgressReporter, add_progress_arguments
+from cars.interaction_snapshot_utils import build_csr, collect_interaction_scores
+
+
+class Command(ProfiledCommand):
+    help = ('Trains the implicit-feedback ALS recommender on saves and recent views and publishes the user/car '
+            'factor matrices, which personalized recommendations are then served from. With --evaluate it first '
+            'reports precision@K on held-out interactions (against a most-popular baseline). Schedule it nightly '
+            'on each web host.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help=f'Model root (default: ALS_MODEL_DIR, {get_model_dir()}).')
+        parser.add_argument('--factors', type=int, default=FACTORS, help='Latent factors per user and car.')
+        parser.add_argument('--iterations', type=int, default=ITERATIONS, help='ALS sweeps.')
+        parser.add_argument('--regularization', type=float, default=REGULARIZATION, help='L2 penalty (lambda).')
+        parser.add_argument('--alpha', type=float, default=ALPHA,
+                            help='Confidence per interaction point (confidence = 1 + alpha * score).')
+        parser.add_argument('--evaluate', action='store_true',
+                            help='Report precision@K on a held-out split before training on everything.')
+        parser.add_argument('--evaluate-only', action='store_true', help='Evaluate without publishing a model.')
+        parser.add_argument('--k', type=int, default=5, help='K for precision@K.')
+        parser.add_argument('--holdout', type=float, default=0.2, help="Share of each user's cars held out.")
+        parser.add_argument('--keep', type=int, default=KEEP_VERSIONS, help='Model versions kept on disk.')
+        add_progress_arguments(parser)
+
+    def handle(self, *args, **options):
+        params = {name: options[name] for name in ('factors', 'iterations', 'regularization', 'alpha')}
+        progress = ProgressReporter(self, options, unit='users')
+
+        with progress.stage('fetch'):
+            scores = collect_interaction_scores()
+
+        if options['evaluate'] or options['evaluate_only']:
+            self.evaluate(scores, params, options, progress)
+            if options['evaluate_only']:
+                progress.finish()
+                return
+
+        with progress.stage('build'):
+            arrays = build_csr(scores)
+        with progress.stage('train'):
+            user_factors, item_factors = train_als(arrays, **params)
+        with progress.stage('write'):
+            directory = write_als_model(user_factors, item_factors, arrays['user_ids'], arrays['car_ids'], params,
+                                        root=options['output_dir'], keep=max(options['keep'], 1))
+
+        progress.count('interactions', len(arrays['data']))
+        progress.advance(len(arrays['user_ids']))
+        progress.finish()
+        self.stdout.write(self.style.SUCCESS(
+            f'ALS model for {len(arrays["user_ids"])} users x {len(arrays["car_ids"])} cars '
+            f'({len(arrays["data"])} interactions) is now current: {directory}'
+        ))
+
+    def evaluate(self, scores, params, options, progress):
+        k = options['k']
+        with progress.stage('evaluate'):
+            train, test = split_holdout(scores, holdout_fraction=options['holdout'])
+            arrays = build_csr(train)
+            model = ALSModel(*train_als(arrays, **params), arrays['user_ids'], arrays['car_ids'], params=params)
+            als_precision = precision_at_k(model.recommend, train, test, k)
+            baseline_precision = precision_at_k(popularity_recommender(train), train, test, k)
+
+        if not test:
+            self.stdout.write(self.style.WARNING('No user has two or more interactions; nothing to evaluate.'))
+            return
+        self.stdout.write(
+            f'precision@{k} on {len(test)} users ({sum(len(held) for held in test.values())} held-out interactions): '
+            f'ALS {als_precision:.4f}, most-popular baseline {baseline_precision:.4f}'
+        )
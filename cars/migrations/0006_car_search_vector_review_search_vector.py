@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:44
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0005_remove_review_source_rating_review_source_upvotes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='car_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='review_search_vector_gin'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0006_car_search_vector_review_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carsave',
+            index=models.Index(fields=['user', '-save_date', '-id'], name='carsave_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carview',
+            index=models.Index(fields=['user', '-view_date', '-id'], name='carview_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-retrieval_date', '-id'], name='review_retrieval_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchquery',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='searchquery_user_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyPick',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=100, unique=True)),
+                ('payload', models.JSONField()),
+                ('generated_at', models.DateTimeField()),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_picks', to='cars.car')),
+            ],
+        ),
+    ]
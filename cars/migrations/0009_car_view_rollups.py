@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0008_weeklypick'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CarViewDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('view_count', models.PositiveIntegerField(default=0)),
+                ('last_view_date', models.DateTimeField()),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cars.car')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='car_view_days', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Car view daily rollups',
+                'ordering': ['-day', '-last_view_date'],
+                'indexes': [models.Index(fields=['user', '-day', '-last_view_date', '-id'], name='carviewdaily_user_keyset_idx')],
+                'unique_together': {('user', 'car', 'day')},
+            },
+        ),
+    ]
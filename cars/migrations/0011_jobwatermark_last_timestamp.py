@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0010_requestprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobwatermark',
+            name='last_timestamp',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0011_jobwatermark_last_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarTrendBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('hour', models.DateTimeField(db_index=True)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('saves', models.PositiveIntegerField(default=0)),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trend_buckets', to='cars.car')),
+            ],
+            options={
+                'unique_together': {('car', 'slot')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0012_cartrendbucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarAspectScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('aspect', models.CharField(max_length=50)),
+                ('mention_count', models.PositiveIntegerField(default=0)),
+                ('avg_compound', models.FloatField()),
+                ('top_descriptor', models.CharField(blank=True, max_length=50)),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aspect_scores', to='cars.car')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['aspect', 'avg_compound', 'car'], name='caraspectscore_score_idx'), models.Index(fields=['aspect', 'mention_count', 'car'], name='caraspectscore_mentions_idx')],
+                'unique_together': {('car', 'aspect')},
+            },
+        ),
+    ]
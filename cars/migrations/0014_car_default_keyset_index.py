@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0013_caraspectscore'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['-year', 'make', 'model', 'id'], name='car_default_keyset_idx'),
+        ),
+    ]
@@ -2,12 +2,23 @@
 
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
 # Get the active User model (recommended by Django)
 User = get_user_model() 
 
+class SearchableManager(models.Manager):
+    """
+    Default manager for models with a `search_vector` column.
+    The tsvector is only needed inside SQL (filtering/ranking), so it is deferred
+    to keep it out of every SELECT that loads rows into Python.
+    """
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
 class Car(models.Model):
     # Basic Car Identification
     make = models.CharField(max_length=100)
@@ -45,9 +56,18 @@ class Car(models.Model):
     # Image URLs
     main_image_url = models.URLField(max_length=500, blank=True, null=True)
 
+    # Full-text search document, kept in sync by cars.signals (see cars/search_utils.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = SearchableManager()
+
     class Meta:
         unique_together = ('make', 'model', 'year', 'trim')
         ordering = ['-year', 'make', 'model']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='car_search_vector_gin'),
+            models.Index(fields=['-year', 'make', 'model', 'id'], name='car_default_keyset_idx'), # Default list order
+        ]
 
     def __str__(self):
         return f"{self.year} {self.make} {self.model} {self.trim or ''}".strip()
@@ -81,8 +101,17 @@ class Review(models.Model):
     # Unique ID from the source system (e.g., Reddit post ID)
     reviewer_id = models.CharField(max_length=255, blank=True, null=True, db_index=True) # db_index for faster lookups.
 
+    # Full-text search document, kept in sync by cars.signals (see cars/search_utils.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = SearchableManager()
+
     class Meta:
         ordering = ['-retrieval_date']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='review_search_vector_gin'),
+            models.Index(fields=['-retrieval_date', '-id'], name='review_retrieval_keyset_idx'), # Default list order
+        ]
         # IMPORTANT: Add unique_together for robust duplicate prevention
         # This ensures same car + source + unique ID is not duplicated
         unique_together = ('car', 'source_name', 'reviewer_id')
@@ -100,10 +129,48 @@ class CarView(models.Model):
     class Meta:
         unique_together = ('user', 'car', 'view_date')
         ordering = ['-view_date']
+        indexes = [
+            models.Index(fields=['user', '-view_date', '-id'], name='carview_user_keyset_idx'), # Per-user history pages
+        ]
 
     def __str__(self):
         return f"{self.user.username} viewed {self.car.make} {self.car.model} on {self.view_date.strftime('%Y-%m-%d %H:%M')}"
 
+class CarViewDaily(models.Model):
+    """
+    Daily rollup of CarView: one row per (user, car, day) with the number of views.
+    Maintained by `compact_car_views`, which also prunes raw CarView rows past the retention window.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='car_view_days')
+    car = models.ForeignKey(Car, on_delete=models.CASCADE)
+    day = models.DateField()
+    view_count = models.PositiveIntegerField(default=0)
+    last_view_date = models.DateTimeField() # Latest view of the car that day
+
+    class Meta:
+        unique_together = ('user', 'car', 'day')
+        ordering = ['-day', '-last_view_date']
+        verbose_name_plural = "Car view daily rollups"
+        indexes = [
+            models.Index(fields=['user', '-day', '-last_view_date', '-id'], name='carviewdaily_user_keyset_idx'),
+        ]
+
+    def __str__(self):
+        return f"User #{self.user_id} viewed car #{self.car_id} {self.view_count}x on {self.day}"
+
+class JobWatermark(models.Model):
+    """
+    Progress marker for incremental batch jobs (e.g. the last CarView id rolled up, or the
+    retrieval_date up to which reviews have been exported).
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_id}"
+
 class CarSave(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_cars')
     car = models.ForeignKey(Car, on_delete=models.CASCADE)
@@ -112,6 +179,9 @@ class CarSave(models.Model):
     class Meta:
         unique_together = ('user', 'car')
         ordering = ['-save_date']
+        indexes = [
+            models.Index(fields=['user', '-save_date', '-id'], name='carsave_user_keyset_idx'), # Per-user history pages
+        ]
 
     def __str__(self):
         return f"{self.user.username} saved {self.car.make} {self.car.model} on {self.save_date.strftime('%Y-%m-%d')}"
@@ -128,7 +198,89 @@ class SearchQuery(models.Model):
     class Meta:
         ordering = ['-timestamp']
         verbose_name_plural = "Search Queries"
+        indexes = [
+            models.Index(fields=['user', '-timestamp', '-id'], name='searchquery_user_keyset_idx'), # Per-user history pages
+        ]
 
     def __str__(self):
         user_str = self.user.username if self.user else "Anonymous"
-        return f"'{self.query_text}' by {user_str} on {self.timestamp.strftime('%Y-%m-%d')}"
\ No newline at end of file
+        return f"'{self.query_text}' by {user_str} on {self.timestamp.strftime('%Y-%m-%d')}"
+
+class WeeklyPick(models.Model):
+    """
+    Precomputed weekly recommendation for one scope: 'overall' or 'body_type:<lowercased body type>'.
+    Written by `refresh_weekly_picks` / `analyze_reviews`; the API serves `payload` as-is.
+    """
+    scope = models.CharField(max_length=100, unique=True)
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='weekly_picks')
+    payload = models.JSONField() # The car exactly as the API returns it
+    generated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Weekly pick ({self.scope}): car #{self.car_id}"
+
+class CarTrendBucket(models.Model):
+    """
+    One hour of a car's trending counters (see cars/trending_utils.py). The rows form a ring
+    buffer: `slot` is the hour's index modulo the trending window, so each car has at most one
+    row per hour of the window and a slot is reset when a later hour reuses it.
+    """
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='trend_buckets')
+    slot = models.PositiveSmallIntegerField()
+    hour = models.DateTimeField(db_index=True) # Start of the hour the counters belong to
+    views = models.PositiveIntegerField(default=0)
+    saves = models.PositiveIntegerField(default=0)
+    reviews = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('car', 'slot')
+
+    def __str__(self):
+        return f"Car #{self.car_id} @ {self.hour:%Y-%m-%d %H}:00: {self.views} views, {self.saves} saves, {self.reviews} reviews"
+
+class CarAspectScore(models.Model):
+    """
+    Review sentiment about one aspect of a car (a cars.nlp_utils.ASPECT_KEYWORDS key), written by
+    analyze_reviews. Unlike Car.top_pros/top_cons it covers every aspect the reviews mention and
+    is indexed, so the catalog can be filtered and ordered by aspect (cars.filters.AspectScoreFilter).
+    """
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='aspect_scores')
+    aspect = models.CharField(max_length=50)
+    mention_count = models.PositiveIntegerField(default=0) # Non-neutral review sentences about the aspect
+    avg_compound = models.FloatField() # Mean VADER compound of those sentences, -1..1
+    top_descriptor = models.CharField(max_length=50, blank=True) # Strongest matching descriptor, e.g. "Intuitive"
+
+    class Meta:
+        unique_together = ('car', 'aspect')
+        indexes = [
+            # Lead with aspect and include car, so an aspect filter is an index range scan yielding car ids
+            models.Index(fields=['aspect', 'avg_compound', 'car'], name='caraspectscore_score_idx'),
+            models.Index(fields=['aspect', 'mention_count', 'car'], name='caraspectscore_mentions_idx'),
+        ]
+
+    def __str__(self):
+        return f"Car #{self.car_id} {self.aspect}: {self.avg_compound:+.2f} ({self.mention_count} mentions)"
+
+class RequestProfile(models.Model):
+    """
+    cProfile capture of one sampled web request (see core.middleware.RequestProfilingMiddleware).
+    """
+    TRIGGER_CHOICES = [('sample', 'Random sample'), ('header', 'X-Profile header')]
+
+    route = models.CharField(max_length=200, db_index=True) # URL name, e.g. car-personalized-recommendations
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField(db_index=True)
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    stats_text = models.TextField() # Top functions by cumulative time
+    collapsed_stacks = models.TextField(blank=True) # flamegraph.pl / speedscope input
+    pstats = models.BinaryField() # Marshalled cProfile stats, i.e. the contents of a .prof file
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-duration_ms']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -4,8 +4,11 @@ import nltk
 import os
 import sys
 import re
+import string
+from functools import lru_cache
 
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from nltk.tokenize.punkt import PunktTokenizer
 
 analyzer = SentimentIntensityAnalyzer()
 
@@ -74,69 +77,253 @@ def classify_sentiment(compound_score, threshold=0.05): # Use this for overall c
     else:
         return "Neutral"
 
-def perform_aspect_sentiment_analysis(reviews_list):
-    aspect_data = {} # Stores { "aspect": {"compound_scores": [...], "descriptive_words": set()} }
-
-    for review_text in reviews_list:
-        sentences = nltk.sent_tokenize(review_text)
-        for sentence in sentences:
-            sentence_lower = sentence.lower()
-            sentence_scores = get_sentiment(sentence)
-            compound_score = sentence_scores['compound']
-
-            if classify_sentiment(compound_score, threshold=0.001) == "Neutral":
-                continue 
-
-            found_aspects = []
-            for aspect, keywords in ASPECT_KEYWORDS.items():
-                if any(re.search(r'\b' + re.escape(kw) + r'\b', sentence_lower) for kw in keywords):
-                    found_aspects.append(aspect)
-            
-            if found_aspects:
-                for aspect in found_aspects:
-                    if aspect not in aspect_data:
-                        aspect_data[aspect] = {'compound_scores': [], 'descriptive_words': set()}
-                    
-                    aspect_data[aspect]['compound_scores'].append(compound_score)
-                    
-                    # Collect descriptive words based on sentence sentiment alignment and plausibility
-                    if compound_score > 0: # If sentence is positive
-                        for pw in POSITIVE_WORDS:
-                            if pw.lower() in sentence_lower and pw.lower() in PLAUSIBLE_DESCRIPTORS.get(aspect, set()): # Check plausibility
-                                aspect_data[aspect]['descriptive_words'].add(pw.capitalize())
-                                # break # Don't break yet, collect all plausible words
-                    else: # If sentence is negative
-                        for nw in NEGATIVE_WORDS:
-                            if nw.lower() in sentence_lower and nw.lower() in PLAUSIBLE_DESCRIPTORS.get(aspect, set()): # Check plausibility
-                                aspect_data[aspect]['descriptive_words'].add(nw.capitalize())
-                                # break # Don't break yet, collect all plausible words
-    
-    final_pros = []
-    final_cons = []
+# --- Batched scoring: one tokenization per review, shared by the document and its sentences ---
+
+# VADER's SentiText strips one PUNC_LIST entry from the start or end of a whitespace token when what
+# remains is a punctuation-free word of 2+ characters; that only depends on the token itself, so it
+# is decided once per distinct token instead of rebuilding a PUNC_LIST x words dict per text.
+PUNCTUATION = string.punctuation # What VaderConstants.REGEX_REMOVE_PUNCTUATION removes
+PUNC_LIST = frozenset(analyzer.constants.PUNC_LIST)
+NEGATION_WORDS = frozenset(analyzer.constants.NEGATE)
+BOOSTER_WORDS = analyzer.constants.BOOSTER_DICT
+SENTENCE_NEUTRAL_THRESHOLD = 0.001 # Sentences closer to 0 than this carry no aspect sentiment
+
+# score_vader_tokens re-implements SentimentIntensityAnalyzer's (private) token loop as of these nltk
+# releases. Any other version scores with polarity_scores instead, so an nltk upgrade can't silently
+# change sentiment; check BatchSentimentTests against the new release before adding it here.
+VADER_MIRRORED_NLTK_RELEASES = ('3.10',)
+MIRRORS_VADER = '.'.join(nltk.__version__.split('.')[:2]) in VADER_MIRRORED_NLTK_RELEASES
+
+
+@lru_cache(maxsize=1)
+def get_sentence_tokenizer():
+    return PunktTokenizer('english') # What nltk.sent_tokenize uses
+
+
+def is_vader_word(text):
+    return len(text) > 1 and not any(char in PUNCTUATION for char in text)
+
+
+@lru_cache(maxsize=100000)
+def vader_token(raw):
+    """
+    The token VADER scores for a whitespace-separated `raw` token, or None for 1-character tokens.
+    """
+    if len(raw) <= 1:
+        return None
+    word = raw.lstrip(PUNCTUATION)
+    if word != raw and raw[:len(raw) - len(word)] in PUNC_LIST and is_vader_word(word):
+        return word
+    word = raw.rstrip(PUNCTUATION)
+    if word != raw and raw[len(word):] in PUNC_LIST and is_vader_word(word):
+        return word
+    return raw
+
+
+def vader_tokens(text):
+    return [token for token in map(vader_token, text.split()) if token is not None]
+
+
+def score_vader_tokens(tokens, text):
+    """
+    analyzer.polarity_scores(text) for `tokens` = vader_tokens(text), with the lexicon, booster
+    and negation lookups done once per token up front instead of per neighbouring word.
+    """
+    if not MIRRORS_VADER:
+        return analyzer.polarity_scores(text)
+    lexicon = analyzer.lexicon
+    constants = analyzer.constants
+    lowered = [token.lower() for token in tokens]
+    valences = [lexicon.get(token) for token in lowered]
+    negations = [token in NEGATION_WORDS or "n't" in token for token in lowered]
+    upper = [token.isupper() for token in tokens]
+    is_cap_diff = 0 < sum(upper) < len(tokens)
+    last = len(tokens) - 1
+
+    first_index = {} # VADER scores every repeat of a token at its first position
+    for index, token in enumerate(tokens):
+        first_index.setdefault(token, index)
+
+    sentiments = []
+    for token in tokens:
+        i = first_index[token]
+        valence = valences[i]
+        if valence is None or lowered[i] in BOOSTER_WORDS or (i < last and lowered[i] == 'kind' and lowered[i + 1] == 'of'):
+            sentiments.append(0)
+            continue
+
+        if upper[i] and is_cap_diff:
+            valence = valence + constants.C_INCR if valence > 0 else valence - constants.C_INCR
+        for start_i in range(3):
+            previous = i - (start_i + 1)
+            if i <= start_i or valences[previous] is not None:
+                continue
+            scalar = 0.0
+            if lowered[previous] in BOOSTER_WORDS: # VaderConstants.scalar_inc_dec
+                scalar = BOOSTER_WORDS[lowered[previous]]
+                if valence < 0:
+                    scalar *= -1
+                if upper[previous] and is_cap_diff:
+                    scalar = scalar + constants.C_INCR if valence > 0 else scalar - constants.C_INCR
+            if start_i == 1 and scalar != 0:
+                scalar = scalar * 0.95
+            if start_i == 2 and scalar != 0:
+                scalar = scalar * 0.9
+            valence = valence + scalar
+
+            # SentimentIntensityAnalyzer._never_check
+            if start_i == 0:
+                if negations[i - 1]:
+                    valence = valence * constants.N_SCALAR
+            elif start_i == 1:
+                if tokens[i - 2] == 'never' and tokens[i - 1] in ('so', 'this'):
+                    valence = valence * 1.5
+                elif negations[i - 2]:
+                    valence = valence * constants.N_SCALAR
+            else:
+                if (tokens[i - 3] == 'never' and tokens[i - 2] in ('so', 'this')) or tokens[i - 1] in ('so', 'this'):
+                    valence = valence * 1.25
+                elif negations[i - 3]:
+                    valence = valence * constants.N_SCALAR
+                valence = analyzer._idioms_check(valence, tokens, i)
+
+        # SentimentIntensityAnalyzer._least_check
+        if i > 0 and valences[i - 1] is None and lowered[i - 1] == 'least':
+            if i == 1 or lowered[i - 2] not in ('at', 'very'):
+                valence = valence * constants.N_SCALAR
+        sentiments.append(valence)
+
+    if 'but' in lowered: # SentimentIntensityAnalyzer._but_check
+        but_index = lowered.index('but')
+        sentiments = [sentiment * 0.5 if index < but_index else sentiment * 1.5 if index > but_index else sentiment
+                      for index, sentiment in enumerate(sentiments)]
+    return analyzer.score_valence(sentiments, text)
+
 
-    for aspect, data in aspect_data.items():
-        if not data['compound_scores']:
+def split_sentences(text):
+    """
+    (sentences, whitespace_separated): nltk.sent_tokenize(text), and whether only whitespace sits
+    between and around the sentences, so the text's tokens are exactly its sentences' tokens.
+    """
+    sentences = []
+    whitespace_separated = True
+    end = 0
+    for start, stop in get_sentence_tokenizer().span_tokenize(text):
+        gap = text[end:start]
+        if gap.strip() or (sentences and not gap):
+            whitespace_separated = False
+        sentences.append(text[start:stop])
+        end = stop
+    return sentences, whitespace_separated and not text[end:].strip()
+
+
+def analyze_reviews_batch(texts):
+    """
+    Scores a list of reviews in one pass: every review is sentence-split and tokenized once, and
+    both the review and each of its sentences are scored from those tokens. Returns one
+    (get_sentiment(text), [(sentence.lower(), sentence compound)]) pair per review; the sentence
+    lists are what summarize_aspect_sentiment takes.
+    """
+    results = []
+    for text in texts:
+        if not text or not isinstance(text, str):
+            results.append((get_sentiment(text), []))
+            continue
+        sentences, whitespace_separated = split_sentences(text)
+        sentence_tokens = [vader_tokens(sentence) for sentence in sentences]
+        if whitespace_separated:
+            tokens = [token for chunk in sentence_tokens for token in chunk]
+        else:
+            tokens = vader_tokens(text)
+        # The review is scored as a whole (not averaged from sentences): VADER's "but", caps and
+        # punctuation rules look across sentence boundaries.
+        results.append((
+            score_vader_tokens(tokens, text),
+            [(sentence.lower(), score_vader_tokens(chunk, sentence)['compound']) for sentence, chunk in zip(sentences, sentence_tokens)],
+        ))
+    return results
+
+
+# One alternation per aspect: matches wherever any single keyword regex would
+ASPECT_PATTERNS = {
+    aspect: re.compile(r'\b(?:' + '|'.join(re.escape(kw) for kw in keywords) + r')\b')
+    for aspect, keywords in ASPECT_KEYWORDS.items()
+}
+# Descriptors each aspect can collect, in strength order
+ASPECT_POSITIVE_DESCRIPTORS = {aspect: [pw.lower() for pw in POSITIVE_WORDS if pw.lower() in words] for aspect, words in PLAUSIBLE_DESCRIPTORS.items()}
+ASPECT_NEGATIVE_DESCRIPTORS = {aspect: [nw.lower() for nw in NEGATIVE_WORDS if nw.lower() in words] for aspect, words in PLAUSIBLE_DESCRIPTORS.items()}
+
+
+def collect_aspect_data(sentence_scores):
+    """
+    { "aspect": {"compound_scores": [...], "descriptive_words": set()} } from (sentence.lower(), compound)
+    pairs, aspects in order of first mention.
+    """
+    aspect_data = {}
+    for sentence_lower, compound_score in sentence_scores:
+        if classify_sentiment(compound_score, threshold=SENTENCE_NEUTRAL_THRESHOLD) == "Neutral":
             continue
 
+        for aspect, pattern in ASPECT_PATTERNS.items():
+            if not pattern.search(sentence_lower):
+                continue
+            if aspect not in aspect_data:
+                aspect_data[aspect] = {'compound_scores': [], 'descriptive_words': set()}
+            aspect_data[aspect]['compound_scores'].append(compound_score)
+
+            # Collect descriptive words based on sentence sentiment alignment and plausibility
+            descriptors = ASPECT_POSITIVE_DESCRIPTORS if compound_score > 0 else ASPECT_NEGATIVE_DESCRIPTORS
+            for word in descriptors.get(aspect, ()):
+                if word in sentence_lower:
+                    aspect_data[aspect]['descriptive_words'].add(word.capitalize())
+    return aspect_data
+
+
+def score_aspects(sentence_scores):
+    """
+    {aspect: (mention_count, avg_compound, classification, descriptor)} for every aspect mentioned in
+    a non-neutral sentence of the (sentence.lower(), compound) pairs, in order of first mention.
+    descriptor is the strongest collected word matching the classification, or "" if there is none.
+    """
+    scores = {}
+    for aspect, data in collect_aspect_data(sentence_scores).items():
         avg_compound = sum(data['compound_scores']) / len(data['compound_scores'])
-        
-        classified_sentiment = classify_sentiment(avg_compound, threshold=0.06) 
+        classified_sentiment = classify_sentiment(avg_compound, threshold=0.06)
 
         desc = ""
         # --- Improved description selection: Prioritize by strength/order in lists ---
+        words = {"Positive": POSITIVE_WORDS, "Negative": NEGATIVE_WORDS}.get(classified_sentiment, [])
+        for word in words: # Iterate in order of strength
+            if word.capitalize() in data['descriptive_words']:
+                desc = word.capitalize()
+                break # Found the strongest/most specific word
+        scores[aspect] = (len(data['compound_scores']), avg_compound, classified_sentiment, desc)
+    return scores
+
+
+def summarize_aspect_sentiment(sentence_scores):
+    """
+    (top 5 pros, top 5 cons) for the (sentence.lower(), compound) pairs of analyze_reviews_batch.
+    """
+    return summarize_aspect_scores(score_aspects(sentence_scores))
+
+
+def summarize_aspect_scores(aspect_scores):
+    """
+    (top 5 pros, top 5 cons) display entries for score_aspects() output.
+    """
+    final_pros = []
+    final_cons = []
+
+    for aspect, (_, _, classified_sentiment, desc) in aspect_scores.items():
         if classified_sentiment == "Positive":
-            for pw in POSITIVE_WORDS: # Iterate in order of strength
-                if pw.capitalize() in data['descriptive_words']:
-                    desc = pw.capitalize()
-                    break # Found the strongest/most specific word
-            if not desc: desc = "Good" # Fallback
-            final_pros.append({"aspect": aspect.replace('_', ' ').title(), "description": desc, "sentiment": "Positive"})
+            final_pros.append({"aspect": aspect.replace('_', ' ').title(), "description": desc or "Good", "sentiment": "Positive"})
         elif classified_sentiment == "Negative":
-            for nw in NEGATIVE_WORDS: # Iterate in order of strength
-                if nw.capitalize() in data['descriptive_words']:
-                    desc = nw.capitalize()
-                    break # Found the strongest/most specific word
-            if not desc: desc = "Poor" # Fallback
-            final_cons.append({"aspect": aspect.replace('_', ' ').title(), "description": desc, "sentiment": "Negative"})
-        
-    return final_pros[:5], final_cons[:5] # Limit to top 5 for display
\ No newline at end of file
+            final_cons.append({"aspect": aspect.replace('_', ' ').title(), "description": desc or "Poor", "sentiment": "Negative"})
+
+    return final_pros[:5], final_cons[:5] # Limit to top 5 for display
+
+
+def perform_aspect_sentiment_analysis(reviews_list):
+    sentence_scores = [pair for _, sentences in analyze_reviews_batch(reviews_list) for pair in sentences]
+    return summarize_aspect_sentiment(sentence_scores)
@@ -0,0 +1,299 @@
+# AutoAggregator/cars/pagination.py
+
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder without its millisecond truncation: cursor values must round-trip exactly,
+    or rows sharing the boundary millisecond are skipped (descending) or repeated (ascending).
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") cursor pagination over the queryset's full ordering.
+
+    Unlike DRF's CursorPagination, which only seeks on the first ordering column and
+    falls back to OFFSET for ties, the cursor here stores the value of *every* ordering
+    column plus the primary key. Each page is a `WHERE (a, b, pk) > (...)` style
+    predicate + LIMIT, so page N costs the same as page 1 and rows inserted between
+    requests never shift or duplicate results.
+
+    The ordering is taken from the queryset itself (OrderingFilter, FullTextSearchFilter
+    ranking, or Model.Meta.ordering), so views need no extra configuration.
+    NULLs always sort last in the forward direction, consistently across databases.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset, cursor = self.get_page_queryset(queryset, request)
+        return self.finish_page(list(page_queryset), cursor)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset for async views: the page query runs through the async ORM.
+        """
+        page_queryset, cursor = self.get_page_queryset(queryset, request)
+        return self.finish_page([row async for row in page_queryset], cursor)
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Returns (queryset of at most page_size + 1 rows, decoded cursor). Doesn't hit the database.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+
+        if cursor:
+            position = self.seek_filter(cursor['values'], reverse)
+            queryset = queryset.filter(position) if position is not None else queryset.none()
+
+        queryset = queryset.order_by(*self.order_by_expressions(reverse))
+        return queryset[:self.page_size + 1], cursor
+
+    def finish_page(self, results, cursor):
+        reverse = bool(cursor and cursor['reverse'])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.first_values = self.row_values(results[0]) if results else None
+        self.last_values = self.row_values(results[-1]) if results else None
+        if not results and cursor:
+            # Paged past either end: link back to where the cursor pointed.
+            self.first_values = self.last_values = cursor['values']
+        return results
+
+    # --- Configuration ---
+
+    def get_page_size(self, request):
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if requested <= 0:
+            return self.page_size
+        return min(requested, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """
+        Returns [(field_name, descending, nullable), ...] ending with a primary-key tie-breaker.
+        """
+        query = queryset.query
+        terms = list(query.order_by) or (list(query.get_meta().ordering) if query.default_ordering else [])
+        model = queryset.model
+
+        ordering = []
+        for term in terms:
+            if not isinstance(term, str):
+                raise TypeError(f'{type(self).__name__} only supports field-name ordering, got {term!r}.')
+            name = term.lstrip('-')
+            if name == '?':
+                raise TypeError(f'{type(self).__name__} cannot paginate a randomly ordered queryset.')
+            ordering.append((name, term.startswith('-'), self.is_nullable(model, name)))
+
+        if not any(name in ('pk', model._meta.pk.name) for name, _, _ in ordering):
+            last_descending = ordering[-1][1] if ordering else False
+            ordering.append(('pk', last_descending, False))
+        return ordering
+
+    @staticmethod
+    def resolve_field(model, name):
+        """
+        Follows a `a__b__c` path to the model field it names (None for annotations).
+        """
+        if name == 'pk':
+            return model._meta.pk
+        field = None
+        for part in name.split('__'):
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                return None
+            if field.is_relation and field.related_model is not None:
+                model = field.related_model
+        return field
+
+    def is_nullable(self, model, name):
+        field = self.resolve_field(model, name)
+        if field is None:
+            return False # Annotations (e.g. search_rank) are never NULL for matched rows
+        if '__' in name:
+            return True # A NULL anywhere along the join path yields NULL
+        return field.null
+
+    # --- SQL building ---
+
+    def order_by_expressions(self, reverse=False):
+        expressions = []
+        for name, descending, nullable in self.ordering:
+            if reverse:
+                descending = not descending
+            if not nullable:
+                expressions.append(f'-{name}' if descending else name)
+                continue
+            nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+            expressions.append(F(name).desc(**nulls) if descending else F(name).asc(**nulls))
+        return expressions
+
+    def seek_filter(self, values, reverse):
+        """
+        Builds the predicate selecting rows strictly after (or before, if reverse) the cursor:
+        (a > va) OR (a = va AND ((b > vb) OR (b = vb AND pk > vpk))), with NULL-aware branches.
+        Returns None when no row can satisfy it.
+        """
+        condition = None
+        for (name, descending, nullable), value in reversed(list(zip(self.ordering, values))):
+            beyond = self._beyond(name, descending, nullable, value, reverse)
+            if condition is not None:
+                equal = Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+                tail = equal & condition
+                beyond = tail if beyond is None else beyond | tail
+            condition = beyond
+        return condition
+
+    @staticmethod
+    def _beyond(name, descending, nullable, value, reverse):
+        # Forward order is: non-NULL values (asc or desc), then NULLs.
+        if not reverse:
+            if value is None:
+                return None # Nothing sorts after NULL except ties, handled by the caller
+            strictly = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+            return strictly | Q(**{f'{name}__isnull': True}) if nullable else strictly
+        if value is None:
+            return Q(**{f'{name}__isnull': False}) # Every non-NULL value precedes NULL
+        return Q(**{f'{name}__gt' if descending else f'{name}__lt': value})
+
+    # --- Cursor encoding ---
+
+    def row_values(self, row):
+        values = []
+        for name, _, _ in self.ordering:
+            if isinstance(row, dict): # .values() querysets
+                values.append(row[name] if name != 'pk' or 'pk' in row else row['id'])
+                continue
+            field = self.resolve_field(self.model, name)
+            if '__' not in name and field is not None and field.is_relation:
+                values.append(getattr(row, field.attname)) # FK id, without loading the related row
+                continue
+            target = row
+            for part in name.split('__'):
+                if target is None:
+                    break
+                target = getattr(target, part)
+            values.append(target)
+        return values
+
+    def encode_cursor(self, values, reverse):
+        payload = {
+            'o': [('-' if descending else '') + name for name, descending, _ in self.ordering],
+            'v': values,
+            'r': 1 if reverse else 0,
+        }
+        raw = json.dumps(payload, cls=CursorJSONEncoder, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            expected = [('-' if descending else '') + name for name, descending, _ in self.ordering]
+            if payload['o'] != expected or len(payload['v']) != len(self.ordering):
+                raise ValueError('Cursor does not match the current ordering.')
+            values = [
+                self.to_python(self.resolve_field(self.model, name), value)
+                for (name, _, _), value in zip(self.ordering, payload['v'])
+            ]
+            return {'values': values, 'reverse': bool(payload['r'])}
+        except (TypeError, ValueError, KeyError, ValidationError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def to_python(field, value):
+        if value is None or field is None:
+            return value
+        if field.is_relation:
+            field = field.target_field
+        return field.to_python(value)
+
+    # --- Response ---
+
+    def get_next_link(self):
+        if not self.has_next or self.last_values is None:
+            return None
+        return self.encode_cursor(self.last_values, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_values is None:
+            return None
+        return self.encode_cursor(self.first_values, reverse=True)
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param, 'required': False, 'in': 'query',
+                'description': 'The pagination cursor value.', 'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param, 'required': False, 'in': 'query',
+                'description': f'Number of results to return per page (max {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
@@ -0,0 +1,106 @@
+# AutoAggregator/cars/profiling_utils.py
+
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+from collections import Counter
+
+# Seconds between stack samples (~200 Hz)
+SAMPLE_INTERVAL = 0.005
+# Functions listed in the text report
+STATS_LIMIT = 40
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a background thread and
+    aggregates the samples as collapsed stacks ("outer;inner;leaf count" per line), the input
+    format of flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.counts.most_common())
+
+
+class Profiler:
+    """
+    cProfile (deterministic, per-function totals) around a block, plus an optional StackSampler
+    for flamegraphs. Usage:
+
+        with Profiler(sample_stacks=True) as profiler:
+            work()
+        profiler.dump('work.prof'); profiler.collapsed_stacks()
+    """
+
+    def __init__(self, sample_stacks=False):
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler() if sample_stacks else None
+
+    def start(self):
+        self.profile.enable() # Raises ValueError if another profiler is already active in this thread
+        if self.sampler:
+            self.sampler.start()
+
+    def stop(self):
+        self.profile.disable()
+        if self.sampler:
+            self.sampler.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def stats_text(self, limit=STATS_LIMIT, sort='cumulative'):
+        stream = io.StringIO()
+        pstats.Stats(self.profile, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def pstats_bytes(self):
+        """
+        The same bytes `dump()` writes; load with pstats.Stats(path) / snakeviz after saving to a file.
+        """
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+    def collapsed_stacks(self):
+        return self.sampler.collapsed() if self.sampler else ''
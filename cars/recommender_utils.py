@@ -1,45 +1,46 @@
 # AutoAggregator/cars/recommender_utils.py
 
+import heapq
+from collections import Counter
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
 from django.db.models import Count
-from cars.models import Car, CarView, CarSave, SearchQuery # Import user interaction models
+from cars.interaction_weight_utils import aget_user_car_weights, get_user_car_weights
+from cars.models import Car, CarSave, CarView, CarViewDaily # Import user interaction models
 
 User = get_user_model() # Get the User model
 
+NEIGHBORHOOD_SIZE = 50 # Most similar users whose interactions are scored
+CANDIDATE_LIMIT = 1000 # Users sharing the most cars with the target whose similarity is computed
+
 def get_user_car_interactions(user):
     """
-    Gathers a user's explicit (saves) and implicit (views, search terms) interactions with cars.
-    Returns a dictionary where keys are Car objects and values are a 'score' based on interaction type.
+    Gathers a user's explicit (saves) and implicit (views) interactions with cars.
+    Returns a dictionary where keys are car ids and values are a recency-decayed 'score' based on
+    interaction type (see interaction_weight_utils), computed by a single SQL aggregation.
     """
-    interactions = {}
-
-    # 1. Saved Cars (Strong explicit signal)
-    saved_cars = CarSave.objects.filter(user=user).select_related('car')
-    for save in saved_cars:
-        interactions[save.car] = interactions.get(save.car, 0) + 5 # High score for saving
-
-    # 2. Viewed Cars (Implicit signal) - More recent views might be weighted higher
-    viewed_cars = CarView.objects.filter(user=user).select_related('car').order_by('-view_date')[:50] # Limit to recent views
-    for view in viewed_cars:
-        interactions[view.car] = interactions.get(view.car, 0) + 1 # Lower score for viewing
-
-    # 3. Search Queries (Implicit signal) - Analyze search terms for car characteristics
-    search_terms = SearchQuery.objects.filter(user=user).order_by('-timestamp').values_list('query_text', flat=True)[:20] # Limit recent searches
+    # Search queries (SearchQuery.query_text) are not used yet: in a more advanced system you'd
+    # use NLP on them to find similar cars.
+    return dict(get_user_car_weights(user))
 
-    # This part is a very simplified integration of search queries into collaborative filtering.
-    # In a more advanced system, you'd use NLP on query_text to find similar cars.
-    # For now, let's just use it as a general signal for broad preferences.
-
-    return interactions
+async def aget_user_car_interactions(user):
+    """
+    Async version of get_user_car_interactions; same scores.
+    """
+    return dict(await aget_user_car_weights(user))
 
 def calculate_user_similarity(user1, user2):
     """
     Calculates a simple similarity score between two users based on their shared car interactions.
     Returns a score between 0 and 1.
     """
-    user1_interactions = get_user_car_interactions(user1)
-    user2_interactions = get_user_car_interactions(user2)
+    return interaction_similarity(get_user_car_interactions(user1), get_user_car_interactions(user2))
 
+def interaction_similarity(user1_interactions, user2_interactions):
+    """
+    Similarity of two users' interaction dicts (see calculate_user_similarity).
+    """
     if not user1_interactions or not user2_interactions:
         return 0 # Cannot compare if no interactions
 
@@ -57,39 +58,103 @@ def calculate_user_similarity(user1, user2):
 
 def get_personalized_recommendations(target_user, num_recommendations=5):
     """
-    Generates personalized car recommendations for the target_user using a simplified
-    user-based collaborative filtering approach.
+    Generates personalized car recommendations for the target_user. When an ALS model has been
+    trained (`train_recommender`) it ranks cars by predicted preference, with content-based
+    recommendations for users it doesn't know yet. Otherwise a simplified user-based collaborative
+    filtering approach is used (see rank_neighborhood_cars), reading other users' interactions
+    from the memory-mapped interaction snapshot when one has been built (`snapshot_interactions`),
+    else the database.
     """
-    other_users = User.objects.exclude(id=target_user.id).prefetch_related('car_views', 'saved_cars')
-
-    user_similarities = []
-    for other_user in other_users:
-        similarity = calculate_user_similarity(target_user, other_user)
-        if similarity > 0:
-            user_similarities.append({'user': other_user, 'similarity': similarity})
-
-    # Sort by similarity (most similar first)
-    user_similarities.sort(key=lambda x: x['similarity'], reverse=True)
-
-    recommended_cars = {} # Stores {Car: score}
-
-    # For the most similar users, find cars they interacted with that target_user hasn't
-    target_user_interacted_cars = set(get_user_car_interactions(target_user).keys())
-
-    for similar_user_data in user_similarities:
-        similar_user = similar_user_data['user']
-        similar_user_interactions = get_user_car_interactions(similar_user)
+    target_scores = get_user_car_interactions(target_user)
+
+    from cars.als_utils import load_als_model # Import here to avoid circular dependency
+    model = load_als_model()
+    from cars.interaction_snapshot_utils import collect_interaction_scores, load_interaction_snapshot # Import here to avoid circular dependency
+    snapshot = load_interaction_snapshot()
+    if model is not None:
+        if model.user_row(target_user.id) is None: # Joined (or first interacted) after training
+            return get_cold_start_recommendations(target_scores, num_recommendations)
+        car_ids = model.recommend(target_user.id, set(target_scores), num_recommendations)
+    elif snapshot is not None:
+        car_ids = snapshot.recommend(target_user.id, set(target_scores), num_recommendations)
+    elif target_scores:
+        candidates = select_neighbor_candidates(neighbor_candidate_rows(target_user, target_scores))
+        neighbor_scores = collect_interaction_scores(user_ids=candidates) if candidates else {}
+        car_ids = rank_neighborhood_cars(target_scores, neighbor_scores, num_recommendations)
+    else:
+        return []
+
+    cars = Car.objects.in_bulk(car_ids)
+    return [cars[car_id] for car_id in car_ids if car_id in cars] # Skips cars deleted since the model/snapshot was built
+
+async def aget_personalized_recommendations(target_user, num_recommendations=5):
+    """
+    Async (async ORM) version of get_personalized_recommendations with the same results.
+    """
+    target_scores = await aget_user_car_interactions(target_user)
+
+    from cars.als_utils import load_als_model # Import here to avoid circular dependency
+    model = load_als_model()
+    from cars.interaction_snapshot_utils import acollect_interaction_scores, load_interaction_snapshot # Import here to avoid circular dependency
+    snapshot = load_interaction_snapshot()
+    if model is not None:
+        if model.user_row(target_user.id) is None:
+            return await aget_cold_start_recommendations(target_scores, num_recommendations)
+        car_ids = model.recommend(target_user.id, set(target_scores), num_recommendations)
+    elif snapshot is not None:
+        car_ids = snapshot.recommend(target_user.id, set(target_scores), num_recommendations)
+    elif target_scores:
+        rows = [row async for row in neighbor_candidate_rows(target_user, target_scores)]
+        candidates = select_neighbor_candidates(rows)
+        neighbor_scores = await acollect_interaction_scores(user_ids=candidates) if candidates else {}
+        car_ids = rank_neighborhood_cars(target_scores, neighbor_scores, num_recommendations)
+    else:
+        return []
+
+    cars = await Car.objects.ain_bulk(car_ids)
+    return [cars[car_id] for car_id in car_ids if car_id in cars]
+
+def neighbor_candidate_rows(target_user, car_ids):
+    """
+    Inverted index lookup (the car_id foreign-key indexes): distinct (user_id, car_id) pairs of the
+    other users who saved or viewed any of `car_ids`, as one UNION query. Only these users can be
+    similar to the target.
+    """
+    querysets = [
+        model.objects.filter(car_id__in=car_ids, user__isnull=False).exclude(user=target_user)
+        .order_by().values_list('user_id', 'car_id') # Clear Meta.ordering: not allowed inside a UNION
+        for model in (CarSave, CarViewDaily, CarView)
+    ]
+    return querysets[0].union(*querysets[1:])
+
+def select_neighbor_candidates(rows, limit=CANDIDATE_LIMIT):
+    """
+    The `limit` user ids sharing the most cars with the target (ties to the lower id), from
+    neighbor_candidate_rows() pairs, so a popular car can't make the scoring step unbounded.
+    """
+    shared_cars = Counter(user_id for user_id, _ in rows)
+    return [user_id for user_id, _ in heapq.nlargest(limit, shared_cars.items(), key=lambda item: (item[1], -item[0]))]
 
-        for car, score in similar_user_interactions.items():
-            if car not in target_user_interacted_cars: # Only recommend new cars
-                # Score recommendation by similarity * interaction score
-                recommended_cars[car] = recommended_cars.get(car, 0) + (score * similar_user_data['similarity'])
+def rank_neighborhood_cars(target_scores, neighbor_scores, num_recommendations, neighborhood_size=NEIGHBORHOOD_SIZE):
+    """
+    Car ids for the target ({car_id: score}) from other users' {user_id: {car_id: score}}: the
+    `neighborhood_size` most similar users (Jaccard, kept in a heap) contribute
+    similarity * interaction score to each car the target hasn't interacted with, and the top
+    `num_recommendations` are picked with another heap instead of sorting every candidate car.
+    Ties go to the lower user/car id.
+    """
+    similarities = ((interaction_similarity(target_scores, scores), user_id) for user_id, scores in neighbor_scores.items())
+    neighbors = heapq.nlargest(neighborhood_size, ((similarity, user_id) for similarity, user_id in similarities if similarity > 0),
+                               key=lambda item: (item[0], -item[1]))
 
-    # Sort recommended cars by their score
-    sorted_recommendations = sorted(recommended_cars.items(), key=lambda item: item[1], reverse=True)
+    recommended_cars = {} # Stores {car_id: score}
+    for similarity, user_id in neighbors:
+        for car_id, score in neighbor_scores[user_id].items():
+            if car_id not in target_scores: # Only recommend new cars
+                recommended_cars[car_id] = recommended_cars.get(car_id, 0) + score * similarity
 
-    # Return only the Car objects, limited by num_recommendations
-    return [car for car, score in sorted_recommendations[:num_recommendations]]
+    ranked = heapq.nlargest(num_recommendations, recommended_cars.items(), key=lambda item: (item[1], -item[0]))
+    return [car_id for car_id, score in ranked if score > 0]
 
 # --- For debugging and testing without full user interactions ---
 def get_simple_content_based_recommendations(target_car=None, num_recommendations=5):
@@ -101,11 +166,45 @@ def get_simple_content_based_recommendations(target_car=None, num_recommendation
         # If no target car, recommend top overall cars (fallback)
         return Car.objects.filter(overall_rating__isnull=False).order_by('-overall_rating')[:num_recommendations]
 
+    return list(similar_cars_queryset(target_car, num_recommendations))
+
+def similar_cars_queryset(target_car, num_recommendations):
     # Find cars with similar body_type and within similar price range
-    similar_cars = Car.objects.filter(
+    return Car.objects.filter(
         body_type=target_car.body_type,
-        msrp_starting__gte=target_car.msrp_starting * 0.8, # within 20% price range
-        msrp_starting__lte=target_car.msrp_starting * 1.2
+        msrp_starting__gte=target_car.msrp_starting * Decimal('0.8'), # within 20% price range
+        msrp_starting__lte=target_car.msrp_starting * Decimal('1.2')
     ).exclude(id=target_car.id).order_by('-overall_rating')[:num_recommendations]
 
-    return list(similar_cars)
\ No newline at end of file
+def cold_start_candidates(interactions):
+    """
+    The priced cars among a user's {car_id: score} interactions, to seed content-based recommendations.
+    """
+    return Car.objects.filter(id__in=list(interactions), msrp_starting__isnull=False)
+
+def cold_start_target_car(interactions, priced_cars):
+    """
+    The priced car the user interacted with most (lowest id on ties), or None.
+    """
+    return min(priced_cars, key=lambda car: (-interactions[car.id], car.id), default=None)
+
+def get_cold_start_recommendations(interactions, num_recommendations=5):
+    """
+    Content-based recommendations for a user the ALS model wasn't trained on, given their live
+    {car_id: score} interactions: cars similar to the one they interacted with most, else the
+    top-rated cars.
+    """
+    priced_cars = list(cold_start_candidates(interactions)) if interactions else []
+    return list(get_simple_content_based_recommendations(cold_start_target_car(interactions, priced_cars), num_recommendations))
+
+async def aget_cold_start_recommendations(interactions, num_recommendations=5):
+    """
+    Async (async ORM) version of get_cold_start_recommendations.
+    """
+    priced_cars = [car async for car in cold_start_candidates(interactions)] if interactions else []
+    target_car = cold_start_target_car(interactions, priced_cars)
+    if target_car is None:
+        queryset = Car.objects.filter(overall_rating__isnull=False).order_by('-overall_rating')[:num_recommendations]
+    else:
+        queryset = similar_cars_queryset(target_car, num_recommendations)
+    return [car async for car in queryset]
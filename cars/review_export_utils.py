@@ -0,0 +1,204 @@
+# AutoAggregator/cars/review_export_utils.py
+
+import glob
+import os
+import shutil
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from cars.columnar_utils import StringColumn, open_columns, write_columns
+from cars.models import JobWatermark, Review
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Optional: without pyarrow the export uses the memory-mappable .npy layout
+    pa = pq = None
+
+REVIEW_EXPORT_WATERMARK = 'review_export'
+# Reviews retrieved more recently than this are left for the next run, so rows from transactions
+# that commit out of retrieval_date order are never skipped by the watermark.
+EXPORT_SAFETY_LAG = timedelta(minutes=2)
+DEFAULT_EXPORT_DIR = os.path.join(settings.BASE_DIR, 'exports', 'reviews')
+PARQUET = 'parquet'
+NPY = 'npy'
+
+# (column, values() lookup) in export order; `content` is added with with_content=True
+EXPORT_COLUMNS = [
+    ('review_id', 'id'),
+    ('car_id', 'car_id'),
+    ('make', 'car__make'),
+    ('model', 'car__model'),
+    ('car_year', 'car__year'),
+    ('source_name', 'source_name'),
+    ('review_date', 'review_date'),
+    ('retrieval_date', 'retrieval_date'),
+    ('source_upvotes', 'source_upvotes'),
+    ('sentiment_compound_score', 'sentiment_compound_score'),
+    ('sentiment_classification', 'sentiment_classification'),
+]
+CONTENT_COLUMN = ('content', 'content')
+STRING_COLUMNS = {'make', 'model', 'source_name', 'sentiment_classification', 'content'}
+# Part names embed the run's cutoff, e.g. part-20250106T120000000000-00003
+RUN_FORMAT = '%Y%m%dT%H%M%S%f'
+
+
+def get_export_dir():
+    return getattr(settings, 'REVIEW_EXPORT_DIR', DEFAULT_EXPORT_DIR)
+
+
+def default_format():
+    return PARQUET if pa is not None else NPY
+
+
+def get_export_watermark():
+    return JobWatermark.objects.filter(name=REVIEW_EXPORT_WATERMARK).values_list('last_timestamp', flat=True).first()
+
+
+def set_export_watermark(cutoff):
+    JobWatermark.objects.update_or_create(name=REVIEW_EXPORT_WATERMARK, defaults={'last_timestamp': cutoff})
+
+
+def export_columns(with_content=False):
+    return EXPORT_COLUMNS + [CONTENT_COLUMN] if with_content else EXPORT_COLUMNS
+
+
+def export_queryset(since, cutoff, with_content=False):
+    """
+    values_list() rows of the reviews retrieved in (since, cutoff], oldest first. Iterate it with
+    .iterator() so PostgreSQL streams it through a server-side cursor.
+    """
+    queryset = Review.objects.filter(retrieval_date__lte=cutoff)
+    if since is not None:
+        queryset = queryset.filter(retrieval_date__gt=since)
+    return queryset.order_by('retrieval_date', 'id').values_list(*[lookup for _, lookup in export_columns(with_content)])
+
+
+def partition_key(row):
+    """
+    (car_id, year) for a row from export_queryset; the year is the review's, or the retrieval year when unknown.
+    """
+    review_date, retrieval_date = row[6], row[7]
+    return row[1], (review_date or retrieval_date).year
+
+
+def to_columns(rows, with_content=False):
+    """
+    {column: numpy array | list of str} for a list of export_queryset rows. Missing numbers are NaN,
+    missing dates NaT and timestamps are naive UTC microseconds.
+    """
+    names = [name for name, _ in export_columns(with_content)]
+    values = dict(zip(names, zip(*rows))) if rows else {name: () for name in names}
+    columns = {}
+    for name in names:
+        column = values[name]
+        if name in STRING_COLUMNS:
+            columns[name] = list(column)
+        elif name in ('review_id', 'car_id'):
+            columns[name] = np.array(column, dtype=np.int64)
+        elif name == 'car_year':
+            columns[name] = np.array(column, dtype=np.int32)
+        elif name == 'review_date':
+            columns[name] = np.array(column, dtype='datetime64[D]')
+        elif name == 'retrieval_date':
+            columns[name] = np.array([timezone.make_naive(value, dt_timezone.utc) for value in column], dtype='datetime64[us]')
+        else:
+            columns[name] = np.array([np.nan if value is None else float(value) for value in column], dtype=np.float64)
+    return columns
+
+
+def partition_dir(root, car_id, year):
+    return os.path.join(root, f'car_id={car_id}', f'year={year}') # Hive-style, so pyarrow.dataset picks up the keys
+
+
+def write_part(root, car_id, year, part_name, columns, fmt):
+    """
+    Writes one part file (Parquet) or directory (.npy columns) into the (car_id, year) partition,
+    atomically: a reader either sees the whole part or none of it. Returns its path.
+    """
+    directory = partition_dir(root, car_id, year)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, part_name)
+    if fmt == PARQUET:
+        path += '.parquet'
+        table = pa.table({name: pa.array(values, from_pandas=True) for name, values in columns.items()})
+        pq.write_table(table, path + '.tmp', compression='zstd')
+        os.replace(path + '.tmp', path)
+    else:
+        write_columns(path, columns, meta={'car_id': car_id, 'year': year})
+    return path
+
+
+def part_run(path):
+    return datetime.strptime(os.path.basename(path).split('-')[1].split('.')[0], RUN_FORMAT).replace(tzinfo=dt_timezone.utc)
+
+
+def run_part_name(cutoff, batch_number):
+    return f'part-{cutoff.astimezone(dt_timezone.utc).strftime(RUN_FORMAT)}-{batch_number:05d}'
+
+
+def list_parts(root=None, car_id=None, year=None):
+    pattern = os.path.join(root or get_export_dir(), f'car_id={car_id or "*"}', f'year={year or "*"}', 'part-*')
+    return sorted(path for path in glob.glob(pattern) if not path.endswith('.tmp'))
+
+
+def remove_parts_after(root, watermark):
+    """
+    Deletes parts (and leftover .tmp files) written by runs newer than `watermark`, i.e. runs that
+    were interrupted before advancing it, so re-exporting their reviews doesn't duplicate them.
+    With watermark=None every part is deleted (full re-export). Returns how many were removed.
+    """
+    removed = 0
+    for path in glob.glob(os.path.join(root, 'car_id=*', 'year=*', 'part-*')):
+        if path.endswith('.tmp') or watermark is None or part_run(path) > watermark:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            removed += 1
+    return removed
+
+
+def read_part(path, columns=None):
+    """
+    {column: array} for one part. .npy parts are memory-mapped, so numeric columns are zero-copy
+    views of the page cache and string columns (StringColumn) decode only the values accessed.
+    Parquet parts are memory-mapped too but decompressed into Arrow buffers.
+    """
+    if path.endswith('.parquet'):
+        table = pq.read_table(path, columns=columns, memory_map=True)
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+    return open_columns(path, names=columns)[0]
+
+
+def iter_review_parts(root=None, car_id=None, year=None, columns=None):
+    """
+    Yields (car_id, year, {column: array}) for every exported part, optionally limited to one
+    car and/or year; see read_part for what the arrays are.
+    """
+    for path in list_parts(root, car_id, year):
+        partition = os.path.basename(os.path.dirname(os.path.dirname(path))), os.path.basename(os.path.dirname(path))
+        part_car_id, part_year = (int(name.split('=', 1)[1]) for name in partition)
+        yield part_car_id, part_year, read_part(path, columns)
+
+
+def load_reviews(root=None, car_id=None, year=None, columns=None):
+    """
+    Every matching part concatenated into one {column: numpy array} (string columns become object
+    arrays). Convenient for notebooks (pandas.DataFrame(load_reviews())); it copies, so batch jobs
+    scanning a large export should prefer iter_review_parts. `content` is only loaded when listed in
+    `columns`, since parts written without --with-content don't have it.
+    """
+    columns = columns or [name for name, _ in EXPORT_COLUMNS]
+    chunks = {}
+    for _, _, part in iter_review_parts(root, car_id, year, columns):
+        for name, values in part.items():
+            chunks.setdefault(name, []).append(
+                np.array(values.tolist(), dtype=object) if isinstance(values, StringColumn) else values
+            )
+    return {name: np.concatenate(parts) for name, parts in chunks.items()}
+
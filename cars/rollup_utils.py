@@ -0,0 +1,151 @@
+# AutoAggregator/cars/rollup_utils.py
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from cars.models import CarView, CarViewDaily, JobWatermark
+
+CAR_VIEW_WATERMARK = 'car_view_rollup'
+DEFAULT_CAR_VIEW_RETENTION_DAYS = 30
+# Views younger than this are left for the next run, so rows from transactions that commit
+# out of primary-key order are never skipped by the watermark.
+COMPACTION_SAFETY_LAG = timedelta(minutes=2)
+# Users per query when loading the existing rollups of a batch (bounds the IN lists)
+ROLLUP_LOOKUP_CHUNK = 500
+
+
+def get_watermark(name):
+    return JobWatermark.objects.filter(name=name).values_list('last_id', flat=True).first() or 0
+
+
+def get_retention_days():
+    return getattr(settings, 'CAR_VIEW_RETENTION_DAYS', DEFAULT_CAR_VIEW_RETENTION_DAYS)
+
+
+def compact_car_views_batch(batch_size=5000, now=None):
+    """
+    Folds the next batch of raw CarView rows (in id order, after the watermark) into
+    CarViewDaily. Counts and the watermark move in one transaction, so every view is
+    counted exactly once even if a run is interrupted. Returns the number of views rolled up.
+    """
+    cutoff = (now or timezone.now()) - COMPACTION_SAFETY_LAG
+    with transaction.atomic():
+        watermark, _ = JobWatermark.objects.select_for_update().get_or_create(name=CAR_VIEW_WATERMARK)
+        rows = list(
+            CarView.objects.filter(pk__gt=watermark.last_id).order_by('pk')
+            .values_list('pk', 'user_id', 'car_id', 'view_date')[:batch_size]
+        )
+        # Stop at the first view that is still inside the safety lag.
+        for position, (_, _, _, view_date) in enumerate(rows):
+            if view_date >= cutoff:
+                rows = rows[:position]
+                break
+        if not rows:
+            return 0
+
+        counts = defaultdict(int)
+        latest = {}
+        for _, user_id, car_id, view_date in rows:
+            key = (user_id, car_id, timezone.localdate(view_date))
+            counts[key] += 1
+            latest[key] = max(latest.get(key, view_date), view_date)
+
+        existing = load_existing_rollups(counts)
+
+        to_update, to_create = [], []
+        for key, count in counts.items():
+            rollup = existing.get(key)
+            if rollup is None:
+                user_id, car_id, day = key
+                to_create.append(CarViewDaily(
+                    user_id=user_id, car_id=car_id, day=day, view_count=count, last_view_date=latest[key],
+                ))
+            else:
+                rollup.view_count += count
+                rollup.last_view_date = max(rollup.last_view_date, latest[key])
+                to_update.append(rollup)
+        CarViewDaily.objects.bulk_create(to_create)
+        CarViewDaily.objects.bulk_update(to_update, ['view_count', 'last_view_date'])
+
+        watermark.last_id = rows[-1][0]
+        watermark.save(update_fields=['last_id', 'updated_at'])
+    return len(rows)
+
+
+def load_existing_rollups(keys):
+    """
+    {(user_id, car_id, day): CarViewDaily} for the keys that already have a rollup, locked for update.
+    Each query narrows by a chunk of users plus the batch's cars and day range (indexable IN/BETWEEN
+    predicates rather than one OR term per key, which overflows SQLite's expression depth and plans
+    badly on PostgreSQL); the exact keys are matched in Python.
+    """
+    by_user = defaultdict(set)
+    for key in keys:
+        by_user[key[0]].add(key)
+    user_ids = sorted(by_user)
+    existing = {}
+    for start in range(0, len(user_ids), ROLLUP_LOOKUP_CHUNK):
+        chunk = [key for user_id in user_ids[start:start + ROLLUP_LOOKUP_CHUNK] for key in by_user[user_id]]
+        days = [day for _, _, day in chunk]
+        rollups = CarViewDaily.objects.select_for_update().filter(
+            user_id__in={user_id for user_id, _, _ in chunk}, car_id__in={car_id for _, car_id, _ in chunk},
+            day__range=(min(days), max(days)),
+        )
+        chunk = set(chunk)
+        for rollup in rollups:
+            key = (rollup.user_id, rollup.car_id, rollup.day)
+            if key in chunk:
+                existing[key] = rollup
+    return existing
+
+
+def prune_car_views_batch(batch_size=5000, now=None):
+    """
+    Deletes one batch of raw CarView rows that are both rolled up (id <= watermark) and
+    older than the retention window. Returns the number of rows deleted.
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=get_retention_days())
+    ids = list(
+        CarView.objects.filter(pk__lte=get_watermark(CAR_VIEW_WATERMARK), view_date__lt=cutoff)
+        .order_by('pk').values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+    return CarView.objects.filter(pk__in=ids).delete()[0]
+
+
+def get_uncompacted_views(user):
+    """
+    Raw views not yet folded into CarViewDaily (the tail after the watermark).
+    """
+    return CarView.objects.filter(user=user, pk__gt=get_watermark(CAR_VIEW_WATERMARK))
+
+
+def get_recent_view_days(user, limit=20, car_fields=None):
+    """
+    The user's most recent viewing days as CarViewDaily rows (newest first, at most `limit`),
+    with the uncompacted tail merged in as unsaved rows. `car_fields` narrows the joined Car columns.
+    Three queries regardless of history size.
+    """
+    related = ['car'] + [f'car__{field}' for field in car_fields] if car_fields else None
+    rollups = CarViewDaily.objects.filter(user=user).select_related('car')
+    tail = get_uncompacted_views(user).select_related('car').order_by('-view_date')
+    if related:
+        rollups = rollups.only('user', 'day', 'view_count', 'last_view_date', *related)
+        tail = tail.only('user', 'view_date', *related)
+
+    days = {(rollup.car_id, rollup.day): rollup for rollup in rollups.order_by('-day', '-last_view_date')[:limit]}
+    for view in tail[:limit * 10]: # Repeat clicks collapse per day; bound the scan regardless
+        key = (view.car_id, timezone.localdate(view.view_date))
+        day = days.get(key)
+        if day is None:
+            day = days[key] = CarViewDaily(
+                user=user, car=view.car, day=key[1], view_count=0, last_view_date=view.view_date,
+            )
+        day.view_count += 1
+        day.last_view_date = max(day.last_view_date, view.view_date)
+    return sorted(days.values(), key=lambda day: (day.day, day.last_view_date), reverse=True)[:limit]
@@ -0,0 +1,61 @@
+# AutoAggregator/cars/search_utils.py
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import connections
+
+from cars.models import Car, Review
+
+# Columns that feed each model's search document, with their rank weights.
+# 'A' matches count the most (make/model), 'D' the least (long free text).
+SEARCH_DOCUMENTS = {
+    Car: [
+        (('make', 'model'), 'A'),
+        (('trim',), 'B'),
+        (('body_type', 'engine_type'), 'C'),
+        (('ai_insight_summary',), 'D'),
+    ],
+    Review: [
+        (('content',), 'A'),
+        (('reviewer_name',), 'B'),
+    ],
+}
+
+
+def get_search_config():
+    return getattr(settings, 'SEARCH_CONFIG', 'english')
+
+
+def build_search_vector(model):
+    """
+    Builds the weighted SearchVector expression used to (re)compute `search_vector` for a model.
+    """
+    config = get_search_config()
+    vector = None
+    for columns, weight in SEARCH_DOCUMENTS[model]:
+        part = SearchVector(*columns, weight=weight, config=config)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def get_search_columns(model):
+    """
+    Returns the set of column names that make up a model's search document.
+    """
+    return {column for columns, _ in SEARCH_DOCUMENTS[model] for column in columns}
+
+
+def update_search_vectors(model, pks=None):
+    """
+    Recomputes `search_vector` in the database for the given primary keys (or every row).
+    Runs as a single UPDATE so the text never round-trips through Python.
+    Returns the number of rows updated (0 on non-PostgreSQL backends, where FTS isn't available).
+    """
+    queryset = model.objects.all()
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+
+    if connections[queryset.db].vendor != 'postgresql':
+        return 0
+
+    return queryset.update(search_vector=build_search_vector(model))
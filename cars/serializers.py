@@ -1,20 +1,70 @@
 # AutoAggregator/cars/serializers.py
 
 from rest_framework import serializers
-from .models import Car, Review, CarView, CarSave, SearchQuery
+from .models import Car, Review, CarView, CarViewDaily, CarSave, SearchQuery
 from django.contrib.auth import get_user_model # <--- Import get_user_model
 
 User = get_user_model() # <--- Define User model
 
-class CarSerializer(serializers.ModelSerializer):
+# Fields a car card needs (see renderCarCard in main.js); used for list-style responses
+CAR_LIST_FIELDS = (
+    'id', 'make', 'model', 'year', 'trim', 'body_type', 'msrp_starting', 'overall_rating',
+    'main_image_url', 'ai_insight_summary', 'top_pros', 'top_cons',
+)
+
+def parse_sparse_fields(request):
+    """
+    Reads the sparse-fieldset query params: ?fields=a,b (whitelist) and ?omit=c,d (blacklist).
+    Returns (fields, omit) as sets; `fields` is None when not given.
+    """
+    if request is None:
+        return None, set()
+    params = request.query_params
+    fields = {name.strip() for name in params.get('fields', '').split(',') if name.strip()} or None
+    omit = {name.strip() for name in params.get('omit', '').split(',') if name.strip()}
+    return fields, omit
+
+def trim_sparse_fields(request, data):
+    """
+    Applies ?fields= / ?omit= to an already-serialized dict (for responses built without a serializer).
+    """
+    fields, omit = parse_sparse_fields(request)
+    if fields is None and not omit:
+        return data
+    return {key: value for key, value in data.items() if (fields is None or key in fields) and key not in omit}
+
+class SparseFieldsetsMixin:
+    """
+    Lets read requests trim a serializer's output with ?fields= / ?omit=.
+    Unknown names are ignored; write requests always get the full field set.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return
+        fields, omit = parse_sparse_fields(request)
+        for name in list(self.fields):
+            if (fields is not None and name not in fields) or name in omit:
+                self.fields.pop(name)
+
+class CarSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = Car
-        fields = '__all__'
+        exclude = ('search_vector',) # Internal full-text search column
 
-class ReviewSerializer(serializers.ModelSerializer):
+class CarListSerializer(CarSerializer):
+    """
+    Compact car representation for list-style responses; detail views use CarSerializer.
+    """
+    class Meta:
+        model = Car
+        fields = CAR_LIST_FIELDS
+
+class ReviewSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = Review
-        fields = '__all__'
+        exclude = ('search_vector',) # Internal full-text search column
 
 # New: Serializer for Django's built-in User model
 class UserSerializer(serializers.ModelSerializer):
@@ -22,24 +72,67 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email'] # Only expose necessary fields
 
-class CarViewSerializer(serializers.ModelSerializer):
+class CarViewSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = CarView
         fields = '__all__'
         read_only_fields = ('user', 'view_date',)
 
-class CarSaveSerializer(serializers.ModelSerializer):
+# Columns a car summary needs; views use them to narrow select_related joins
+CAR_SUMMARY_FIELDS = ('id', 'make', 'model', 'year', 'trim', 'main_image_url')
+
+class CarSummarySerializer(serializers.ModelSerializer):
+    """Just enough to name and picture a car in history lists."""
+    class Meta:
+        model = Car
+        fields = CAR_SUMMARY_FIELDS
+
+class CarViewDailySerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    car = CarSummarySerializer(read_only=True)
+
+    class Meta:
+        model = CarViewDaily
+        fields = ('id', 'car', 'day', 'view_count', 'last_view_date')
+
+class CarSaveSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = CarSave
         fields = '__all__'
         read_only_fields = ('user', 'save_date',)
 
-class SearchQuerySerializer(serializers.ModelSerializer):
+class SavedCarSerializer(serializers.ModelSerializer):
+    car = CarSummarySerializer(read_only=True)
+
+    class Meta:
+        model = CarSave
+        fields = ('id', 'car', 'save_date')
+
+class SearchQuerySerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = SearchQuery
         fields = '__all__'
         read_only_fields = ('user', 'timestamp',)
 
+class InteractionEventSerializer(serializers.Serializer):
+    """
+    One entry of a POST /api/events/ batch:
+    {"type": "view", "car": 12} or {"type": "search", "query_text": "...", "make_filter": "...", ...}
+    """
+    type = serializers.ChoiceField(choices=['view', 'search'])
+    car = serializers.IntegerField(required=False, min_value=1)
+    query_text = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    make_filter = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    model_filter = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    year_filter = serializers.IntegerField(required=False, allow_null=True)
+    body_type_filter = serializers.CharField(max_length=50, required=False, allow_blank=True, allow_null=True)
+
+    def validate(self, attrs):
+        if attrs['type'] == 'view' and 'car' not in attrs:
+            raise serializers.ValidationError({'car': 'View events require a car id.'})
+        if attrs['type'] == 'search' and 'query_text' not in attrs:
+            raise serializers.ValidationError({'query_text': 'Search events require query_text.'})
+        return attrs
+
 # New: User serializer for registration (handles password hashing)
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True) # Password is write-only
@@ -0,0 +1,34 @@
+# AutoAggregator/cars/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from cars.cache_utils import invalidate_catalog_version
+from cars.facet_utils import invalidate_catalog_index
+from cars.models import Car, Review
+from cars.search_utils import get_search_columns, update_search_vectors
+
+
+@receiver(post_save, sender=Car)
+@receiver(post_save, sender=Review)
+def refresh_search_vector(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """
+    Keeps `search_vector` in step with the indexed text columns on every write.
+    Saves that only touch non-text columns (e.g. sentiment scores) skip the extra UPDATE.
+    """
+    if raw:  # Loading fixtures
+        return
+    if update_fields is not None and not (set(update_fields) & get_search_columns(sender)):
+        return
+    update_search_vectors(sender, [instance.pk])
+
+
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+def refresh_catalog_index(sender, **kwargs):
+    """
+    Any Car change makes this process rebuild its in-memory catalog index on next use
+    and drops the cached catalog version, so ETags and cached responses move on immediately.
+    """
+    invalidate_catalog_index()
+    invalidate_catalog_version()
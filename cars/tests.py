@@ -1,3 +1,1024 @@
-from django.test import TestCase
+import json
+import os
+import pstats
+import re
+import tempfile
+import time
+import warnings
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import nltk
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import Count, F, Q
+from django.db.models.functions import Lower
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.db_routers import ReadReplicaRouter, use_read_replica
+from core.middleware import RequestProfilingMiddleware
+
+from .als_utils import load_als_model
+from .benchmark_utils import compare_results, generate_cars
+from .event_utils import EventBuffer
+from .fast_serializers import render_json
+from .facet_utils import MAX_PAGE_SIZE, invalidate_catalog_index
+from .filters import AspectScoreFilter
+from .interaction_snapshot_utils import collect_interaction_scores, load_interaction_snapshot
+from .interaction_weight_utils import get_user_car_weights
+from .models import Car, CarAspectScore, CarSave, CarTrendBucket, CarView, CarViewDaily, JobWatermark, RequestProfile, Review, SearchQuery
+from .nlp_utils import ASPECT_KEYWORDS, analyze_reviews_batch, analyzer, score_vader_tokens, summarize_aspect_sentiment, vader_tokens
+from .review_export_utils import iter_review_parts, load_reviews
+from .recommender_utils import get_personalized_recommendations, rank_neighborhood_cars
+from .rollup_utils import CAR_VIEW_WATERMARK, compact_car_views_batch, get_recent_view_days, get_watermark, prune_car_views_batch
+from .serializers import CAR_SUMMARY_FIELDS
+from .trending_utils import (
+    REVIEW_SIGNAL, TRENDING_WINDOW_HOURS, VIEW_SIGNAL, record_trending_event, record_trending_events, trending_index,
+)
+from .weekly_pick_utils import body_type_scope, refresh_weekly_picks, weekly_picks
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        prices = [None, 20000, 25000, 30000]
+        for i in range(23):
+            Car.objects.create(
+                make=['Toyota', 'Honda', 'Ford'][i % 3], model=f'Model {i % 5}', year=2022 + i % 3,
+                trim=f'T{i}', msrp_starting=prices[i % 4],
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            data = self.client.get(url).json()
+            ids += [car['id'] for car in data['results']]
+            last_page = data
+            url = data['next']
+            pages += 1
+        return ids, pages, last_page
+
+    def test_pages_cover_every_row_once_in_order(self):
+        ids, pages, _ = self.walk('/api/cars/?page_size=5&ordering=-msrp_starting,make')
+        expected = sorted(
+            Car.objects.all(),
+            key=lambda car: (car.msrp_starting is None, -(car.msrp_starting or 0), car.make, car.pk),
+        )
+        self.assertEqual(ids, [car.pk for car in expected])
+        self.assertEqual(pages, 5)
+
+    def test_previous_links_walk_back_to_the_start(self):
+        forward, _, last_page = self.walk('/api/cars/?page_size=4&ordering=msrp_starting')
+        backward = [car['id'] for car in last_page['results']]
+        url = last_page['previous']
+        while url:
+            data = self.client.get(url).json()
+            backward = [car['id'] for car in data['results']] + backward
+            url = data['previous']
+        self.assertEqual(backward, forward)
+
+    def test_page_size_is_capped(self):
+        data = self.client.get('/api/cars/?page_size=100000&ordering=make').json()
+        self.assertEqual(len(data['results']), 23) # Fewer rows than API_MAX_PAGE_SIZE: single page
+        self.assertIsNone(data['next'])
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get('/api/cars/?cursor=not-a-cursor').status_code, 404)
+
+    def test_datetime_cursor_keeps_sub_millisecond_ties(self):
+        car = Car.objects.first()
+        base = timezone.now().replace(microsecond=0)
+        for i in range(6): # Same millisecond, different microseconds
+            review = Review.objects.create(car=car, content=f'Review {i}', source_name='Test')
+            Review.objects.filter(pk=review.pk).update(retrieval_date=base + timedelta(microseconds=100 * i))
+
+        ids, pages, _ = self.walk('/api/reviews/?page_size=2')
+        self.assertEqual(ids, list(Review.objects.order_by('-retrieval_date', '-id').values_list('id', flat=True)))
+        self.assertEqual(pages, 3)
+
+
+class SearchVectorTests(TestCase):
+    def test_signal_skips_saves_that_touch_no_search_columns(self):
+        car = Car.objects.create(make='Subaru', model='Outback', year=2024, trim='Onyx')
+        with mock.patch('cars.signals.update_search_vectors') as update:
+            review = Review.objects.create(car=car, content='Great wagon.', source_name='Reddit')
+            update.assert_called_once_with(Review, [review.pk])
+            update.reset_mock()
+
+            review.sentiment_compound_score = '0.6249'
+            review.save(update_fields=['sentiment_compound_score', 'sentiment_classification']) # What analyze_reviews does
+            car.save(update_fields=['overall_rating'])
+            update.assert_not_called()
+
+            review.save(update_fields=['content'])
+            car.save()
+            self.assertEqual(update.call_args_list, [mock.call(Review, [review.pk]), mock.call(Car, [car.pk])])
+
+    def test_search_falls_back_to_icontains_without_postgres(self):
+        Car.objects.create(make='Subaru', model='Outback', year=2024, trim='Onyx')
+        Car.objects.create(make='Subaru', model='Forester', year=2024, trim='Sport')
+        self.assertEqual(connection.vendor, 'sqlite')
+        results = self.client.get('/api/cars/?search=outb').json()['results'] # Prefix match: icontains, not tsquery
+        self.assertEqual([car['model'] for car in results], ['Outback'])
+        self.assertNotIn('search_rank', results[0])
+
+
+class FastReadPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from .benchmark_utils import generate_cars, generate_reviews
+        cars = generate_cars(12, seed=1)
+        cars[0].msrp_starting = None
+        cars[0].top_pros = ['Quiet cabin', 'Ünïcode']
+        cars[0].save()
+        cars[1].top_cons = [1e-05, 1e16, {'noise_db': 71.5}] # JSON floats: orjson formats these differently
+        cars[1].save()
+        generate_reviews(cars, 2, seed=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSameOutput(self, url):
+        with self.settings(FAST_READ_PATH=False):
+            expected = self.client.get(url)
+        cache.clear() # Don't let the catalog response cache answer the second request
+        with self.settings(FAST_READ_PATH=True):
+            actual = self.client.get(url)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+
+    def test_list_and_detail_are_byte_identical(self):
+        car, float_car = Car.objects.order_by('pk')[:2]
+        for url in [
+            '/api/cars/?page_size=5', '/api/cars/?page_size=5&ordering=-msrp_starting',
+            '/api/cars/?fields=id,msrp_starting,mpg_city', f'/api/cars/{car.pk}/', f'/api/cars/{float_car.pk}/',
+            '/api/reviews/?page_size=7', f'/api/reviews/{car.reviews.first().pk}/',
+        ]:
+            with self.subTest(url=url):
+                self.assertSameOutput(url)
+
+    def test_render_json_matches_json_renderer(self):
+        payloads = [
+            {'top_pros': ['Quiet\u2028cabin', 'Ünïcode'], 'id': 1, 'rating': None, 'ok': True},
+            {'top_pros': [1e-05, 1e16, 0.1, -0.0, 3.0], 'nested': {'score': 12.5}},
+            [{'id': 2 ** 70}, {'id': -(2 ** 63)}, {'id': 2 ** 64 - 1}],
+        ]
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                self.assertEqual(render_json(payload), JSONRenderer().render(payload))
+        for payload in ({'top_pros': [float('nan')]}, [float('inf')]):
+            with self.subTest(payload=payload):
+                with self.assertRaises(ValueError): # allow_nan=False, like JSONRenderer
+                    render_json(payload)
+
+    def test_cursor_pages_match(self):
+        next_url = self.client.get('/api/reviews/?page_size=5').json()['next']
+        self.assertSameOutput(next_url)
+
+    def test_missing_object_is_404(self):
+        self.assertEqual(self.client.get('/api/cars/999999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/cars/not-a-number/').status_code, 404)
+
+
+@override_settings(FAST_READ_PATH=False) # The ORM path, where SparseQuerysetMixin narrows with .only()
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = Car.objects.create(
+            make='Mazda', model='CX-5', year=2024, trim='Turbo', body_type='SUV', msrp_starting=30000,
+            ai_insight_summary='Sharp handling.', top_pros=['Interior'], top_cons=['Cargo space'],
+        )
+        Review.objects.create(car=cls.car, content='Fun to drive.', source_name='Reddit')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_with_columns(self, url, table):
+        """Returns (response JSON, columns selected from `table` by the query that reads it)."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        selects = [query['sql'] for query in queries if f'FROM "{table}"' in query['sql'] and 'COUNT(' not in query['sql']]
+        self.assertEqual(len(selects), 1, selects)
+        select_list = selects[0].split(' FROM ')[0]
+        return response.json(), {column for column in re.findall(rf'"{table}"\."(\w+)"', select_list)}
+
+    def test_fields_narrows_output_and_selected_columns(self):
+        data, columns = self.get_with_columns('/api/cars/?fields=id,make,msrp_starting', 'cars_car')
+        self.assertEqual(set(data['results'][0]), {'id', 'make', 'msrp_starting'})
+        # Plus the columns Car.Meta.ordering needs for pagination
+        self.assertEqual(columns, {'id', 'make', 'msrp_starting', 'year', 'model'})
+
+    def test_omit_drops_output_and_columns(self):
+        data, columns = self.get_with_columns(f'/api/cars/{self.car.pk}/?omit=ai_insight_summary,top_pros,top_cons', 'cars_car')
+        self.assertNotIn('ai_insight_summary', data)
+        self.assertIn('torque', data)
+        self.assertFalse(columns & {'ai_insight_summary', 'top_pros', 'top_cons', 'search_vector'})
+        self.assertIn('torque', columns)
+
+    def test_foreign_keys_select_their_id_column(self):
+        data, columns = self.get_with_columns('/api/reviews/?fields=id,car', 'cars_review')
+        self.assertEqual(data['results'][0], {'id': Review.objects.get().pk, 'car': self.car.pk})
+        self.assertIn('car_id', columns)
+        self.assertNotIn('content', columns)
+
+    def test_unknown_and_nested_names_are_ignored(self):
+        data, _ = self.get_with_columns('/api/cars/?fields=id,bogus,car.make,make__icontains', 'cars_car')
+        self.assertEqual(data['results'][0], {'id': self.car.pk})
+        data, _ = self.get_with_columns('/api/cars/?omit=bogus', 'cars_car')
+        self.assertIn('ai_insight_summary', data['results'][0])
+
+        user = User.objects.create_user('sparse', 'sparse@example.com', 'pw')
+        CarViewDaily.objects.create(user=user, car=self.car, day=timezone.localdate(), view_count=2, last_view_date=timezone.now())
+        self.client.force_login(user)
+        # Names apply to the top level only; a kept nested object stays whole
+        entry = self.client.get('/api/car-views/history/?fields=car,view_count,car.make').json()['results'][0]
+        self.assertEqual(set(entry), {'car', 'view_count'})
+        self.assertEqual(set(entry['car']), set(CAR_SUMMARY_FIELDS))
+
+    def test_writes_return_every_field(self):
+        user = User.objects.create_user('writer', 'writer@example.com', 'pw')
+        self.client.force_login(user)
+        response = self.client.post('/api/car-saves/?fields=id', {'car': self.car.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('save_date', response.json())
+
+
+class CatalogHTTPCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.car = Car.objects.create(make='Mazda', model='CX-5', year=2024, trim='Touring', overall_rating='4.50')
+        refresh_weekly_picks()
+
+    def test_conditional_get_returns_304(self):
+        for url in ['/api/cars/', f'/api/cars/{self.car.pk}/', '/api/cars/weekly_recommendation/']:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('ETag', response)
+                self.assertIn('Last-Modified', response)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+                self.assertEqual(
+                    self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+                )
+
+    def test_repeat_request_is_served_from_cache(self):
+        first = self.client.get('/api/cars/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/cars/')
+        self.assertEqual(first.content, second.content)
+
+    def test_car_save_changes_etag_and_content(self):
+        before = self.client.get(f'/api/cars/{self.car.pk}/')
+        self.car.trim = 'Signature'
+        self.car.save()
+        after = self.client.get(f'/api/cars/{self.car.pk}/', HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        self.assertEqual(after.json()['trim'], 'Signature')
+
+
+    def test_body_from_lagging_replica_is_not_cached_or_validated(self):
+        for url in ['/api/cars/', '/api/async/cars/']:
+            with self.subTest(url=url), \
+                    mock.patch('cars.cache_utils.read_version_matches', return_value=False), \
+                    mock.patch('cars.cache_utils.aread_version_matches', return_value=False):
+                self.assertNotIn('ETag', self.client.get(url))
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('ETag', response)
+                self.assertTrue(queries.captured_queries) # Rendered again, not served from the cache
+
+
+class CatalogSearchTests(TestCase):
+    def setUp(self):
+        generate_cars(60, seed=3) # bulk_create: no signals, so invalidate by hand
+        self.unpriced = Car.objects.create(make='Kia', model='Soul', year=2019, trim='Base', drivetrain='FWD')
+        invalidate_catalog_index()
+
+    def search(self, **params):
+        response = self.client.get('/api/cars/search/', {'limit': MAX_PAGE_SIZE, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_results_and_counts_match_the_orm(self):
+        cases = [
+            ({}, Car.objects.all()),
+            ({'make__icontains': 'o'}, Car.objects.filter(make__icontains='o')),
+            ({'body_type': 'suv,Sedan', 'year__gte': 2020}, Car.objects.filter(body_type__in=['SUV', 'Sedan'], year__gte=2020)),
+            ({'drivetrain': 'awd', 'msrp_starting__lte': 40000}, Car.objects.filter(drivetrain__iexact='awd', msrp_starting__lte=40000)),
+            ({'price_bucket': '20k_30k,100k_plus'}, Car.objects.filter(
+                Q(msrp_starting__gte=20000, msrp_starting__lt=30000) | Q(msrp_starting__gte=100000)
+            )),
+        ]
+        for params, queryset in cases:
+            with self.subTest(params=params):
+                result = self.search(**params)
+                self.assertEqual(result['count'], queryset.count())
+                # The index sorts text case-insensitively ('Camry' before 'CR-V')
+                expected = list(queryset.order_by('-year', Lower('make'), Lower('model'), 'id').values_list('id', flat=True))
+                self.assertTrue(expected)
+                self.assertEqual([car['id'] for car in result['results']], expected)
+
+    def test_facet_counts_are_disjunctive(self):
+        result = self.search(make='Toyota', year__gte=2020)
+        in_years = Car.objects.filter(year__gte=2020)
+        facets = result['facets']
+
+        # A field's own filter is left out of its counts; every other filter applies.
+        self.assertGreater(len(facets['make']), 1)
+        self.assertEqual(facets['make'], dict(in_years.values_list('make').annotate(n=Count('id'))))
+        toyotas = in_years.filter(make='Toyota')
+        self.assertEqual(facets['body_type'], dict(toyotas.values_list('body_type').annotate(n=Count('id'))))
+        self.assertEqual(facets['year'], {
+            str(year): n for year, n in Car.objects.filter(make='Toyota').values_list('year').annotate(n=Count('id'))
+        })
+        self.assertEqual(sum(facets['price_bucket'].values()), toyotas.exclude(msrp_starting=None).count())
+        self.assertEqual(facets['price_bucket'].get('20k_30k', 0), toyotas.filter(msrp_starting__gte=20000, msrp_starting__lt=30000).count())
+
+    def test_nulls_sort_last_in_both_directions(self):
+        for ordering, expression in (('msrp_starting', F('msrp_starting').asc(nulls_last=True)), ('-msrp_starting', F('msrp_starting').desc(nulls_last=True))):
+            with self.subTest(ordering=ordering):
+                ids = [car['id'] for car in self.search(ordering=ordering)['results']]
+                self.assertEqual(ids[-1], self.unpriced.pk)
+                self.assertEqual(ids, list(Car.objects.order_by(expression, 'id').values_list('id', flat=True)))
+
+    def test_malformed_parameters_are_rejected(self):
+        for params in ({'ordering': 'trim'}, {'year': 'abc'}, {'msrp_starting__lte': 'cheap'}, {'price_bucket': 'cheap'}, {'limit': 'x'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/cars/search/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.json())
+
+    def test_index_follows_catalog_fingerprint(self):
+        self.assertEqual(self.search(make='Lada')['count'], 0)
+        # A queryset update skips the save signals, as a write from another process would
+        Car.objects.filter(pk=self.unpriced.pk).update(make='Lada', last_updated=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(self.search(make='Lada')['count'], 0) # Not re-checked yet
+        with mock.patch('cars.facet_utils.CATALOG_INDEX_CHECK_SECONDS', 0):
+            self.assertEqual(self.search(make='Lada')['count'], 1)
+
+        self.unpriced.make = 'Moskvitch'
+        self.unpriced.save() # Local saves invalidate immediately
+        self.assertEqual(self.search(make='Moskvitch')['count'], 1)
+        self.assertEqual(self.search(make='Lada')['count'], 0)
+
+
+class WeeklyPickTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        weekly_picks.invalidate()
+        Car.objects.create(make='Kia', model='Telluride', year=2025, trim='SX', body_type='SUV', overall_rating='4.60')
+        Car.objects.create(make='Honda', model='Accord', year=2025, trim='EX', body_type='Sedan', overall_rating='4.40')
+        Car.objects.create(make='Toyota', model='Camry', year=2024, trim='LE', body_type='Sedan', overall_rating='4.90')
+
+    def test_missing_pick_is_404(self):
+        self.assertEqual(self.client.get('/api/cars/weekly_recommendation/').status_code, 404)
+
+    def test_pick_is_served_without_catalog_queries(self):
+        picks = refresh_weekly_picks()
+        self.assertEqual(picks['overall'].model, 'Telluride') # Latest rated year wins over higher older ratings
+        self.assertEqual(picks['body_type:sedan'].model, 'Accord')
+
+        self.client.get('/api/cars/weekly_recommendation/?body_type=sedan') # Fills the pick cache
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/cars/weekly_recommendation/?body_type=sedan')
+        self.assertEqual(response.json()['model'], 'Accord')
+        self.assertIn('Last-Modified', response)
+
+    def test_refresh_from_another_process_is_picked_up_after_the_check_interval(self):
+        self.assertEqual(self.client.get('/api/cars/weekly_recommendation/').status_code, 404)
+        with mock.patch('cars.weekly_pick_utils.WeeklyPickStore.invalidate'): # As if run by another process
+            refresh_weekly_picks()
+        self.assertEqual(self.client.get('/api/cars/weekly_recommendation/').status_code, 404) # Until the next check
+        for path in ['/api/cars/weekly_recommendation/?body_type=unknown-{}'.format(i) for i in range(3)]:
+            self.assertEqual(self.client.get(path).status_code, 404)
+
+        with override_settings(WEEKLY_PICK_CHECK_SECONDS=0):
+            self.assertEqual(self.client.get('/api/cars/weekly_recommendation/').json()['model'], 'Telluride')
+            Car.objects.filter(model='Accord').update(overall_rating='4.95', year=2026)
+            with mock.patch('cars.weekly_pick_utils.WeeklyPickStore.invalidate'):
+                refresh_weekly_picks()
+            self.assertEqual(self.client.get('/api/cars/weekly_recommendation/').json()['model'], 'Accord')
+        self.assertEqual(set(weekly_picks.picks), {'overall', 'body_type:sedan', 'body_type:suv'}) # No per-string entries
+
+
+@override_settings(EVENT_BUFFER_SECONDS=0) # Flush within the request so rows are visible to the test
+class InteractionEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('driver', 'driver@example.com', 'pw')
+        self.car = Car.objects.create(make='Subaru', model='Outback', year=2024, trim='Premium')
+
+    def test_batch_is_written_in_bulk(self):
+        self.client.force_login(self.user)
+        events = [
+            {'type': 'view', 'car': self.car.pk},
+            {'type': 'view', 'car': 999999}, # Unknown car: dropped
+            {'type': 'search', 'query_text': 'subaru', 'make_filter': 'subaru'},
+        ]
+        response = self.client.post('/api/events/', events, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['accepted'], 2)
+        self.assertEqual(CarView.objects.filter(user=self.user, car=self.car).count(), 1)
+        self.assertEqual(SearchQuery.objects.get().make_filter, 'subaru')
+
+    def test_beacon_form_payload_and_anonymous_views(self):
+        events = json.dumps([{'type': 'view', 'car': self.car.pk}, {'type': 'search', 'query_text': 'wagon'}])
+        response = self.client.post('/api/events/', {'events': events})
+        self.assertEqual(response.json()['accepted'], 1) # Views need a user; the search is kept
+        self.assertFalse(CarView.objects.exists())
+        self.assertIsNone(SearchQuery.objects.get().user)
+
+    def test_invalid_events_are_rejected(self):
+        response = self.client.post('/api/events/', [{'type': 'view'}], content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        for body in ['5', '"abc"', 'null', 'true']: # Neither an array nor {"events": [...]}
+            with self.subTest(body=body):
+                self.assertEqual(self.client.post('/api/events/', body, content_type='application/json').status_code, 400)
+
+    def test_buffer_flushes_at_size_threshold(self):
+        buffer = EventBuffer(max_size=3, max_age=60)
+        buffer.add([SearchQuery(query_text='a'), SearchQuery(query_text='b')])
+        self.assertFalse(SearchQuery.objects.exists())
+        buffer.add([SearchQuery(query_text='c')])
+        self.assertEqual(SearchQuery.objects.count(), 3)
+        self.assertIsNone(buffer.timer)
+
+
+class CarViewRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('viewer', 'viewer@example.com', 'pw')
+        self.car = Car.objects.create(make='Volvo', model='XC60', year=2024, trim='B5')
+        self.now = timezone.now()
+        old = self.now - timedelta(days=40)
+        for view_date in [old, old + timedelta(minutes=1), self.now - timedelta(hours=1)]:
+            view = CarView.objects.create(user=self.user, car=self.car)
+            CarView.objects.filter(pk=view.pk).update(view_date=view_date) # view_date is auto_now_add
+
+    def test_compaction_counts_each_view_once_and_prunes_old_rows(self):
+        self.assertEqual(compact_car_views_batch(batch_size=1, now=self.now), 1)
+        while compact_car_views_batch(batch_size=1, now=self.now):
+            pass
+        self.assertEqual(sorted(CarViewDaily.objects.values_list('view_count', flat=True)), [1, 2])
+
+        self.assertEqual(prune_car_views_batch(now=self.now), 2) # Only the rolled-up rows past retention
+        self.assertEqual(CarView.objects.count(), 1)
+        self.assertEqual(sum(day.view_count for day in get_recent_view_days(self.user)), 3)
+
+    def test_compaction_of_many_distinct_keys(self):
+        compact_car_views_batch(now=self.now) # Existing rollups for self.car
+        cars = Car.objects.bulk_create(Car(make='Kia', model='EV6', year=2024, trim=f'T{i}') for i in range(2000))
+        CarView.objects.bulk_create(CarView(user=self.user, car=car) for car in cars + [self.car])
+        CarView.objects.filter(pk__gt=get_watermark(CAR_VIEW_WATERMARK)).update(view_date=self.now - timedelta(minutes=30))
+
+        self.assertEqual(compact_car_views_batch(now=self.now), 2001)
+        self.assertEqual(CarViewDaily.objects.filter(car__in=cars, view_count=1).count(), 2000)
+        self.assertEqual(sum(CarViewDaily.objects.filter(car=self.car).values_list('view_count', flat=True)), 4) # Merged into existing rollups
+
+    def test_uncompacted_tail_counts_toward_recent_views(self):
+        compact_car_views_batch(now=self.now)
+        CarView.objects.create(user=self.user, car=self.car)
+        self.assertEqual([day.view_count for day in get_recent_view_days(self.user)], [2, 2]) # Today's rollup + tail merged
+
+    def test_history_endpoint_reads_rollups(self):
+        compact_car_views_batch(now=self.now)
+        self.client.force_login(self.user)
+        results = self.client.get('/api/car-views/history/').json()['results']
+        self.assertEqual([row['view_count'] for row in results], [1, 2])
+        self.assertEqual(results[0]['car']['model'], 'XC60')
+
+
+class UserDashboardTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        cars = [Car.objects.create(make='Audi', model=f'A{i}', year=2024, trim='Premium') for i in range(30)]
+        for car in cars:
+            CarView.objects.create(user=self.user, car=car)
+            CarSave.objects.create(user=self.user, car=car)
+            SearchQuery.objects.create(user=self.user, query_text=f'audi {car.model}')
+        compact_car_views_batch(now=timezone.now() + timedelta(hours=1))
+        CarView.objects.create(user=self.user, car=cars[-1]) # Uncompacted tail, merged into its day
+        self.client.force_login(self.user)
+
+    def test_dashboard_is_bounded_and_query_count_is_fixed(self):
+        # 2 for session + user, 5 for the dashboard itself
+        with self.assertNumQueries(7):
+            data = self.client.get('/api/me/dashboard/').json()
+        self.assertEqual(data['user']['username'], 'owner')
+        for key in ('recent_views', 'saved_cars', 'searches'):
+            self.assertEqual(len(data[key]), 20)
+        self.assertEqual(set(data['saved_cars'][0]['car']), {'id', 'make', 'model', 'year', 'trim', 'main_image_url'})
+        self.assertEqual(sum(view['view_count'] for view in data['recent_views'] if view['car']['model'] == 'A29'), 2)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/me/dashboard/').status_code, 403)
+
+
+@override_settings(CATALOG_HTTP_CACHE=False, REQUEST_PROFILE_SAMPLE_RATE=0) # A sampled profile would add its INSERT/prune queries
+class QueryCountTests(TestCase):
+    """
+    Every list endpoint and admin changelist must issue the same number of queries
+    whether it shows 1 row or many (no per-row lookups).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.users = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pw') for i in range(3)]
+
+    def add_rows(self, count):
+        start = Car.objects.count()
+        for i in range(start, start + count):
+            car = Car.objects.create(make='Mini', model=f'Cooper {i}', year=2024, trim='S')
+            Review.objects.create(car=car, content='Fun to drive.', source_name='Reddit', reviewer_id=str(i))
+            for user in [self.admin] + self.users:
+                CarView.objects.create(user=user, car=car)
+                CarSave.objects.create(user=user, car=car)
+                SearchQuery.objects.create(user=user, query_text=f'cooper {i}')
+        compact_car_views_batch(now=timezone.now() + timedelta(hours=1))
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, urls):
+        self.client.force_login(self.admin)
+        self.add_rows(1)
+        small = {url: self.count_queries(url) for url in urls}
+        self.add_rows(8)
+        large = {url: self.count_queries(url) for url in urls}
+        self.assertEqual(small, large)
+
+    def test_api_endpoints(self):
+        self.assertConstantQueries([
+            '/api/cars/', '/api/reviews/', '/api/users/', '/api/car-views/', '/api/car-views/history/',
+            '/api/car-saves/', '/api/search-queries/', '/api/me/dashboard/',
+        ])
+
+    def test_admin_changelists(self):
+        self.assertConstantQueries([
+            '/admin/cars/car/', '/admin/cars/review/', '/admin/cars/carview/', '/admin/cars/carviewdaily/',
+            '/admin/cars/carsave/', '/admin/cars/searchquery/', '/admin/cars/carview/?username=user1',
+        ])
+
+
+class RequestMetricsTests(TestCase):
+    def test_server_timing_header_and_metrics_endpoint(self):
+        Car.objects.create(make='Lexus', model='RX', year=2024, trim='350')
+        response = self.client.get('/api/cars/')
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+, total;dur=[\d.]+')
+
+        metrics = self.client.get('/metrics').content.decode()
+        self.assertIn('http_requests_total{route="car-list",method="GET",status="200"}', metrics)
+        self.assertIn('http_request_db_queries_bucket{route="car-list",le="+Inf"}', metrics)
+        self.assertIn('http_response_size_bytes_count{route="car-list"}', metrics)
+
+    def test_fast_read_path_reports_its_render_time(self):
+        car = Car.objects.create(make='Lexus', model='GX', year=2024, trim='550')
+        real_render_json = render_json
+
+        def slow_render_json(data):
+            time.sleep(0.02)
+            return real_render_json(data)
+
+        for url in ['/api/cars/', f'/api/cars/{car.pk}/']:
+            with self.subTest(url=url), mock.patch('cars.fast_serializers.render_json', side_effect=slow_render_json):
+                cache.clear()
+                render = re.search(r'render;dur=([\d.]+)', self.client.get(url)['Server-Timing'])
+                self.assertGreaterEqual(float(render.group(1)), 20)
+
+    async def test_async_requests_count_the_queries_run_in_orm_threads(self):
+        await sync_to_async(Car.objects.create)(make='Lexus', model='NX', year=2024, trim='350h')
+        await sync_to_async(self.client.get)('/api/cars/') # The test thread's connection predates the middleware
+        for url in ['/api/async/cars/', '/api/cars/']: # An async view, and a sync view under ASGI
+            with self.subTest(url=url):
+                cache.clear()
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_endpoint_is_restricted(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+
+class CommandProgressTests(TestCase):
+    def test_import_cars_reports_progress_instead_of_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            summary_path = os.path.join(tmp, 'summary.json')
+            out = StringIO()
+            call_command('import_cars', summary_json=summary_path, stdout=out)
+            with open(summary_path) as summary_file:
+                summary = json.load(summary_file)
+
+        self.assertNotIn('Processing car from API', out.getvalue())
+        self.assertIn('[import_cars] 6 cars in', out.getvalue())
+        self.assertEqual(summary['processed'], 6)
+        self.assertEqual(summary['counters']['imported'], 6)
+        self.assertEqual(set(summary['stages']), {'fetch', 'db_write'})
+
+        out = StringIO()
+        call_command('import_cars', verbosity=2, stdout=out)
+        self.assertIn('Processing car from API: Toyota Camry', out.getvalue())
+
+    def test_connections_are_recycled_only_by_commands_without_open_cursors(self):
+        car = Car.objects.create(make='Volvo', model='XC60', year=2024, trim='B5')
+        for i in range(3):
+            Review.objects.create(car=car, content='Fine.', source_name='Reddit', reviewer_id=str(i))
+        Review.objects.update(retrieval_date=timezone.now() - timedelta(hours=1))
+
+        with mock.patch('cars.command_utils.recycle_connections') as recycle, tempfile.TemporaryDirectory() as tmp:
+            # export_reviews advances while its queryset.iterator() cursor is still open
+            call_command('export_reviews', output_dir=tmp, format='npy', batch_size=1, progress_interval=1e-9, stdout=StringIO())
+            recycle.assert_not_called()
+            call_command('import_cars', progress_interval=1e-9, stdout=StringIO())
+            recycle.assert_called()
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_smoke_run_writes_results_and_rolls_back(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'results.json')
+            call_command('run_benchmarks', scales='smoke', repeat=1, only='api.', output=output, stdout=StringIO())
+            with open(output) as output_file:
+                results = json.load(output_file)
+
+        self.assertEqual(results['meta']['scales'], {'smoke': {'cars': 5, 'reviews_per_car': 2, 'users': 4}})
+        self.assertIn('median', results['results']['smoke']['api.personalized_recommendations'])
+        self.assertFalse(Car.objects.exists())
+
+    @override_settings(DEBUG=False, ALLOWED_HOSTS=['autoaggregator.example.com'])
+    def test_api_benchmark_requests_are_served(self):
+        statuses = []
+
+        def measure(client, url, duration):
+            response = client.get(url)
+            statuses.append(response.status_code)
+            return 1.0, response.content
+
+        with mock.patch('cars.management.commands.benchmark_api.measure_requests', side_effect=measure):
+            call_command('benchmark_api', cars=3, reviews_per_car=1, duration=0, stdout=StringIO())
+        self.assertEqual(statuses, [200] * 8) # 4 endpoints x fast path off/on, none DisallowedHost
+
+    def test_compare_results_flags_regressions(self):
+        baseline = {'results': {'small': {'a': {'median': 1.0}, 'b': {'median': 1.0}, 'c': {'median': 1.0}}}}
+        current = {'results': {'small': {'a': {'median': 1.3}, 'b': {'median': 0.5}, 'c': {'median': 1.05}, 'd': {'median': 1.0}}}}
+        statuses = {row['case']: row['status'] for row in compare_results(baseline, current, threshold=0.15)}
+        self.assertEqual(statuses, {'a': 'regression', 'b': 'improved', 'c': 'ok', 'd': 'new'})
+
+
+class ProfilingTests(TestCase):
+    def test_command_profile_flags_write_pstats_and_stacks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            prof_path, stacks_path = os.path.join(tmp, 'run.prof'), os.path.join(tmp, 'run.folded')
+            call_command('refresh_weekly_picks', profile=prof_path, profile_stacks=stacks_path, stdout=StringIO())
+            stats = pstats.Stats(prof_path)
+            self.assertTrue(any(name == 'refresh_weekly_picks' for _, _, name in stats.stats))
+            self.assertTrue(os.path.exists(stacks_path))
+
+    @override_settings(REQUEST_PROFILE_SAMPLE_RATE=1, REQUEST_PROFILE_ROUTES=['car-list'])
+    def test_sampled_requests_are_stored_and_listed_in_admin(self):
+        Car.objects.create(make='Lexus', model='RX', year=2024, trim='350')
+        response = self.client.get('/api/cars/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Profiled'], 'sample')
+        profile = RequestProfile.objects.get() # Written once the response was sent
+        self.assertEqual((profile.route, profile.trigger, profile.status_code), ('car-list', 'sample', 200))
+        self.assertIn('function calls', profile.stats_text)
+
+        self.assertNotIn('X-Profiled', self.client.get('/api/reviews/')) # Route not listed
+
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin_user)
+        self.assertContains(self.client.get('/admin/cars/requestprofile/'), '/api/cars/')
+        self.assertContains(self.client.get(f'/admin/cars/requestprofile/{profile.pk}/change/'), 'function calls')
+        self.assertEqual(self.client.get(f'/admin/cars/requestprofile/{profile.pk}/pstats/').status_code, 200)
+
+    def test_staff_header_forces_a_profile(self):
+        self.assertNotIn('X-Profiled', self.client.get('/api/cars/', HTTP_X_PROFILE='1'))
+        self.client.force_login(User.objects.create_user('staff', password='pw', is_staff=True))
+        self.assertEqual(self.client.get('/api/cars/', HTTP_X_PROFILE='1')['X-Profiled'], 'header')
+
+    @override_settings(REQUEST_PROFILE_SAMPLE_RATE=1, REQUEST_PROFILE_ROUTES=[])
+    def test_profile_is_written_after_the_response_and_never_fails_it(self):
+        request = RequestFactory().get('/api/cars/')
+        request.user = AnonymousUser()
+        request.resolver_match = resolve('/api/cars/')
+        middleware = RequestProfilingMiddleware(lambda request: None)
+        response = middleware.process_view(request, lambda request: HttpResponse('ok'), (), {})
+        self.assertFalse(RequestProfile.objects.exists()) # Nothing written inside the request
+        response.close() # What the server does once the body is sent (sends request_finished)
+        self.assertEqual(RequestProfile.objects.get().route, 'car-list')
+
+        with mock.patch.object(RequestProfile, 'save', side_effect=DatabaseError('read-only')), \
+                self.assertLogs('core.middleware', 'ERROR'):
+            response = self.client.get('/api/cars/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cars = generate_cars(8, seed=2)
+        cls.car = cars[0]
+        cls.user = User.objects.create_user('driver', password='pw')
+        other = User.objects.create_user('other', password='pw')
+        for car in cars[:3]:
+            CarView.objects.create(user=cls.user, car=car)
+        for car in cars[:6]:
+            CarView.objects.create(user=other, car=car)
+        CarSave.objects.create(user=cls.user, car=cars[1])
+        compact_car_views_batch(now=timezone.now() + timedelta(hours=1))
+        refresh_weekly_picks()
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_async_views_match_sync_views(self):
+        await sync_to_async(self.client.force_login)(self.user)
+        await self.async_client.aforce_login(self.user)
+        for path in [
+            'cars/?page_size=3', f'cars/?make={self.car.make}&ordering=-overall_rating', 'cars/?fields=id,model',
+            f'cars/{self.car.pk}/', 'cars/999999/', 'cars/weekly_recommendation/?fields=id,make',
+            'cars/personalized_recommendations/', 'car-views/history/',
+        ]:
+            with self.subTest(path=path):
+                expected = await sync_to_async(self.client.get)(f'/api/{path}')
+                actual = await self.async_client.get(f'/api/async/{path}')
+                self.assertEqual(actual.status_code, expected.status_code)
+                self.assertEqual(actual.content.replace(b'/api/async/', b'/api/'), expected.content)
+
+    async def test_anonymous_requests_are_rejected_like_the_sync_views(self):
+        for path in ['cars/personalized_recommendations/', 'car-views/history/']:
+            with self.subTest(path=path):
+                expected = await sync_to_async(self.client.get)(f'/api/{path}')
+                actual = await self.async_client.get(f'/api/async/{path}')
+                self.assertEqual((actual.status_code, actual.json()), (expected.status_code, expected.json()))
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+    def test_catalog_reads_use_the_replica_only_inside_the_block(self):
+        router = ReadReplicaRouter()
+        with use_read_replica():
+            self.assertIsNone(router.db_for_read(Car)) # No replica configured
+
+        with warnings.catch_warnings(): # Overriding DATABASES warns; the router only reads the aliases
+            warnings.simplefilter('ignore')
+            with self.settings(DATABASES={**settings.DATABASES, 'replica': settings.DATABASES['default']}):
+                self.assertIsNone(router.db_for_read(Car))
+                with use_read_replica():
+                    self.assertEqual(router.db_for_read(Car), 'replica')
+                    self.assertEqual(router.db_for_read(Review), 'replica')
+                    self.assertIsNone(router.db_for_read(CarView)) # Interaction rows stay on the primary
+                    self.assertEqual(router.db_for_write(Car), 'default')
+                self.assertFalse(router.allow_migrate('replica', 'cars'))
+
+
+class BatchSentimentTests(SimpleTestCase):
+    def test_token_scoring_matches_vader(self):
+        texts = [
+            'The engine is GREAT, but the screen is not good!!', 'It is kind of slow... at least the seats are nice?',
+            "Never so happy; this isn't bad at all :)", '"Terrible" brakes!!!! VERY VERY loud cabin???',
+            'yeah right, the bomb.', 'good good GOOD bad', '', '!! ?? .',
+        ]
+        for text in texts:
+            with self.subTest(text=text):
+                self.assertEqual(score_vader_tokens(vader_tokens(text), text), analyzer.polarity_scores(text))
+
+    def test_batch_matches_polarity_scores(self):
+        texts = [
+            'The engine is GREAT, but the screen is not good!! Never so happy with a purchase though.',
+            "It is kind of slow... at least the seats are nice? The ride isn't bad at all :)",
+            'Brakes are "terrible"!!!! VERY VERY loud cabin??? Dealer was the bomb, yeah right.',
+            'Mr. Smith sold it to us. Fuel economy is sort of disappointing.\n\nStill, I LOVE it.',
+            'Cut me some slack, the infotainment is buggy. The least bit of rain and the wipers squeal.',
+        ]
+        for mirrors_vader in (True, False): # False: the fallback for unverified nltk releases
+            with self.subTest(mirrors_vader=mirrors_vader), mock.patch('cars.nlp_utils.MIRRORS_VADER', mirrors_vader):
+                for text, (scores, sentences) in zip(texts, analyze_reviews_batch(texts)):
+                    self.assertEqual(scores, analyzer.polarity_scores(text))
+                    self.assertEqual(sentences, [
+                        (sentence.lower(), analyzer.polarity_scores(sentence)['compound']) for sentence in nltk.sent_tokenize(text)
+                    ])
+
+    def test_aspect_summary_from_sentence_scores(self):
+        pros, cons = summarize_aspect_sentiment([
+            ('the engine is powerful and smooth.', 0.7), ('the screen is buggy.', -0.4),
+            ('the engine feels weak.', -0.2), ('we bought it in may.', 0.0),
+        ])
+        self.assertEqual(pros, [{'aspect': 'Engine', 'description': 'Powerful', 'sentiment': 'Positive'}])
+        self.assertEqual(cons, [{'aspect': 'Infotainment', 'description': 'Buggy', 'sentiment': 'Negative'}])
+
+
+class ReviewExportTests(TestCase):
+    def test_incremental_export_reads_back_memory_mapped(self):
+        car = Car.objects.create(make='Volvo', model='XC60', year=2024, trim='B5')
+        Review.objects.create(car=car, content='Comfortable seats.', source_name='Reddit', reviewer_id='a',
+                              sentiment_compound_score='0.6000', review_date=timezone.localdate())
+        Review.objects.filter(car=car).update(retrieval_date=timezone.now() - timedelta(days=1))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            two_hours_ago = timezone.now() - timedelta(hours=2)
+            with mock.patch('django.utils.timezone.now', return_value=two_hours_ago):
+                call_command('export_reviews', output_dir=tmp, format='npy', with_content=True, stdout=StringIO())
+            Review.objects.create(car=car, content='Noisy tires.', source_name='Reddit', reviewer_id='b')
+            Review.objects.filter(reviewer_id='b').update(retrieval_date=timezone.now() - timedelta(hours=1))
+            call_command('export_reviews', output_dir=tmp, format='npy', stdout=StringIO())
+            call_command('export_reviews', output_dir=tmp, format='npy', stdout=StringIO()) # Nothing new
+
+            reviews = load_reviews(tmp)
+            self.assertEqual(sorted(reviews['review_id']), sorted(Review.objects.values_list('id', flat=True)))
+            self.assertEqual(set(reviews['make']), {'Volvo'})
+            self.assertEqual(sorted(reviews['sentiment_compound_score'].tolist())[0], 0.6)
+
+            car_id, year, part = next(iter_review_parts(tmp, columns=['review_id', 'content']))
+            self.assertEqual((car_id, year), (car.pk, timezone.localdate().year))
+            self.assertIsInstance(part['review_id'], np.memmap)
+            self.assertEqual(part['content'][0], 'Comfortable seats.')
+
+
+class AspectScoreFilterTests(TestCase):
+    def test_filters_and_orders_by_aspect_scores(self):
+        scores = {'A3': {'infotainment': 0.8, 'reliability': 0.1}, 'A4': {'infotainment': 0.4, 'reliability': 0.6},
+                  'A5': {'infotainment': -0.5, 'reliability': 0.9}, 'A6': {'price': 0.7}}
+        for model, aspects in scores.items():
+            car = Car.objects.create(make='Audi', model=model, year=2024, trim='Base')
+            CarAspectScore.objects.bulk_create(CarAspectScore(car=car, aspect=aspect, mention_count=3, avg_compound=score)
+                                               for aspect, score in aspects.items())
+
+        def models(query):
+            response = self.client.get(f'/api/cars/?fields=model&{query}')
+            self.assertEqual(response.status_code, 200)
+            return [car['model'] for car in response.json()['results']]
+
+        self.assertEqual(models('aspect=infotainment&aspect_min=0.3&ordering=-aspect_score'), ['A3', 'A4'])
+        self.assertEqual(models('aspect=infotainment,reliability&aspect_min=0.05&ordering=-aspect_score'), ['A4', 'A3'])
+        self.assertEqual(models('aspect=reliability&ordering=aspect_score&page_size=2'), ['A3', 'A4'])
+        next_page = self.client.get('/api/cars/?aspect=reliability&ordering=aspect_score&page_size=2').json()['next']
+        self.assertEqual([car['model'] for car in self.client.get(next_page).json()['results']], ['A5'])
+        self.assertCountEqual(models('ordering=-aspect_score'), ['A3', 'A4', 'A5', 'A6']) # Ignored without ?aspect=
+        self.assertEqual(self.client.get('/api/cars/?aspect=price&aspect_min=high').status_code, 400)
+        self.assertEqual(AspectScoreFilter.max_aspects, len(ASPECT_KEYWORDS))
+        self.assertEqual(models(f'aspect={",".join(ASPECT_KEYWORDS)}'), [])
+        too_many = ','.join(f'a{i}' for i in range(300))
+        self.assertEqual(self.client.get(f'/api/cars/?aspect={too_many}').status_code, 400)
+
+
+class TrendingTests(TestCase):
+    def test_recorded_events_rank_cars_overall_and_per_body_type_from_memory(self):
+        sedan, suv, quiet = (Car.objects.create(make='Audi', model=model, year=2024, trim='Base', body_type=body_type)
+                             for model, body_type in [('A4', 'Sedan'), ('Q5', 'SUV'), ('A8', 'Sedan')])
+        user = User.objects.create_user('viewer', password='pw')
+        self.client.force_login(user)
+        now = timezone.now()
+        record_trending_events({(sedan.id, VIEW_SIGNAL): 4}, when=now - timedelta(hours=48)) # Two half-lives ago: 4 -> ~1
+        record_trending_events({(quiet.id, VIEW_SIGNAL): 9}, when=now - timedelta(hours=TRENDING_WINDOW_HOURS))
+        record_trending_events({(sedan.id, VIEW_SIGNAL): 1, (quiet.id, VIEW_SIGNAL): 1}) # Reuses (resets) quiet's week-old slot
+        self.assertEqual(self.client.post('/api/car-saves/', {'car': suv.id}).status_code, 201) # One save (weight 5)
+        record_trending_event(sedan.id, REVIEW_SIGNAL, 2) # What ingest_reviews records (weight 3 each)
+        self.assertEqual(list(CarTrendBucket.objects.filter(car=quiet).values_list('views', flat=True)), [1])
+
+        trending_index.invalidate()
+        response = self.client.get('/api/cars/trending/')
+        self.assertEqual([car['model'] for car in response.json()['results']], ['A4', 'Q5', 'A8'])
+        self.assertAlmostEqual(response.json()['results'][0]['trending_score'], 8.0, delta=0.35) # Counted from the hour's start
+        with self.assertNumQueries(0): # Served from the in-memory rankings
+            suvs, _ = trending_index.get(body_type_scope('suv'))
+        self.assertEqual([car['model'] for car in suvs], ['Q5'])
+        self.assertEqual(self.client.get('/api/cars/trending/?body_type=sedan&limit=1&fields=model').json()['results'], [{'model': 'A4'}])
+
+
+class InteractionWeightTests(TestCase):
+    def test_weights_decay_with_age_in_one_query(self):
+        now = timezone.now()
+        user = User.objects.create_user('viewer', password='pw')
+        saved, rolled_up, viewed = (Car.objects.create(make='Audi', model=f'A{i}', year=2024, trim='Base') for i in range(3))
+        CarSave.objects.create(user=user, car=saved)
+        CarSave.objects.filter(user=user).update(save_date=now - timedelta(days=60)) # Two half-lives: 5 -> 1.25
+        CarViewDaily.objects.create(user=user, car=rolled_up, day=(now - timedelta(days=30)).date(),
+                                    view_count=3, last_view_date=now - timedelta(days=30)) # 3 -> 1.5
+        compacted = CarView.objects.create(user=user, car=rolled_up) # Already counted by the rollup
+        JobWatermark.objects.create(name=CAR_VIEW_WATERMARK, last_id=compacted.pk)
+        CarView.objects.create(user=user, car=viewed)
+
+        with self.assertNumQueries(1):
+            weights = get_user_car_weights(user, now=now)
+        self.assertEqual([car_id for car_id, _ in weights], [rolled_up.id, saved.id, viewed.id])
+        for (_, weight), expected in zip(weights, [1.5, 1.25, 1.0]):
+            self.assertAlmostEqual(weight, expected, places=3)
+
+        with self.settings(RECOMMENDER_HALF_LIFE_DAYS=0, RECOMMENDER_SAVE_WEIGHT=2):
+            self.assertEqual(dict(get_user_car_weights(user, now=now)), {saved.id: 2.0, rolled_up.id: 3.0, viewed.id: 1.0})
+
+    def test_saves_past_the_decay_horizon_still_count_as_seen(self):
+        now = timezone.now()
+        user, other = (User.objects.create_user(name, password='pw') for name in ('old-saver', 'other'))
+        old_save, fresh = (Car.objects.create(make='Audi', model=f'Q{i}', year=2024, trim='Base') for i in range(2))
+        CarSave.objects.create(user=user, car=old_save)
+        CarSave.objects.filter(user=user).update(save_date=now - timedelta(days=365)) # Past 8 half-lives
+        for car in (old_save, fresh):
+            CarSave.objects.create(user=other, car=car)
+
+        self.assertEqual([car_id for car_id, _ in get_user_car_weights(user, now=now)], [old_save.id])
+        self.assertEqual(get_personalized_recommendations(user), [fresh])
+
+class InteractionSnapshotTests(TestCase):
+    def test_snapshot_recommendations_match_the_database_path(self):
+        cars = [Car.objects.create(make='Audi', model=f'A{i}', year=2024, trim='Base') for i in range(5)]
+        target, first, second = (User.objects.create_user(name, password='pw') for name in ('target', 'first', 'second'))
+        for user, viewed in [(target, [0, 1]), (first, [0]), (second, [1, 3, 3, 3, 4])]:
+            for index in viewed:
+                CarView.objects.create(user=user, car=cars[index])
+        CarSave.objects.create(user=target, car=cars[0])
+        CarSave.objects.create(user=first, car=cars[2])
+
+        with tempfile.TemporaryDirectory() as tmp, self.settings(INTERACTION_SNAPSHOT_DIR=tmp):
+            from_database = get_personalized_recommendations(target)
+            call_command('snapshot_interactions', stdout=StringIO())
+            snapshot = load_interaction_snapshot()
+            self.assertIsInstance(snapshot.indices, np.memmap)
+            with self.assertNumQueries(2): # The target's own interaction weights, then the cars; none per other user
+                from_snapshot = get_personalized_recommendations(target)
+            self.assertEqual([car.model for car in from_snapshot], [car.model for car in from_database])
+            self.assertEqual([car.model for car in from_snapshot], ['A2', 'A3', 'A4'])
+            self.assertIn('recommender_interaction_snapshot_age_seconds ', self.client.get('/metrics').content.decode())
+
+    def test_neighborhood_is_capped_and_database_queries_do_not_grow_with_users(self):
+        cars = [Car.objects.create(make='Audi', model=f'A{i}', year=2024, trim='Base') for i in range(12)]
+        target = User.objects.create_user('target', password='pw')
+        CarSave.objects.create(user=target, car=cars[0])
+        CarSave.objects.create(user=target, car=cars[1])
+        for i in range(10): # Everyone shares the popular cars[0]; user i also has cars[i + 2] (viewed i + 1 times)
+            user = User.objects.create_user(f'user{i}', password='pw')
+            CarSave.objects.create(user=user, car=cars[0])
+            if i < 2:
+                CarSave.objects.create(user=user, car=cars[1]) # The two most similar users
+            for _ in range(i + 1):
+                CarView.objects.create(user=user, car=cars[i + 2])
+
+        # The target's interaction weights, the UNION candidate lookup, the candidates' interaction
+        # weights, then the cars in one in_bulk - for any number of users
+        with self.assertNumQueries(4):
+            recommendations = get_personalized_recommendations(target, num_recommendations=3)
+        self.assertEqual([car.model for car in recommendations], ['A11', 'A10', 'A9']) # Many views outweigh similarity
+
+        # Capped to the two most similar users (2/3 vs 1/3), only their cars are candidates
+        target_scores = {cars[0].id: 5.0, cars[1].id: 5.0}
+        neighbor_scores = collect_interaction_scores(user_ids=User.objects.exclude(id=target.id).values_list('id', flat=True))
+        self.assertEqual(rank_neighborhood_cars(target_scores, neighbor_scores, 3, neighborhood_size=2), [cars[3].id, cars[2].id])
+        with tempfile.TemporaryDirectory() as tmp, self.settings(INTERACTION_SNAPSHOT_DIR=tmp):
+            call_command('snapshot_interactions', stdout=StringIO())
+            snapshot = load_interaction_snapshot()
+            self.assertEqual(snapshot.recommend(target.id, set(target_scores), 3, neighborhood_size=2), [cars[3].id, cars[2].id])
+            self.assertEqual(snapshot.recommend(target.id, set(target_scores), 3), [car.id for car in recommendations])
+
+
+
+class ALSRecommenderTests(TestCase):
+    def test_trained_model_serves_known_users_and_cold_starts_new_ones(self):
+        sedans = [Car.objects.create(make='Audi', model=f'A{i}', year=2024, trim='Base', body_type='Sedan', msrp_starting=40000 + i * 1000) for i in range(3)]
+        suvs = [Car.objects.create(make='Audi', model=f'Q{i}', year=2024, trim='Base', body_type='SUV', msrp_starting=60000 + i * 1000) for i in range(3)]
+        for group, cars in [('sedan', sedans), ('suv', suvs)]:
+            for i in range(4):
+                user = User.objects.create_user(f'{group}{i}', password='pw')
+                for car in cars:
+                    CarView.objects.create(user=user, car=car)
+        target = User.objects.create_user('target', password='pw')
+        CarSave.objects.create(user=target, car=sedans[0])
+        CarView.objects.create(user=target, car=sedans[1])
+
+        with tempfile.TemporaryDirectory() as tmp, self.settings(ALS_MODEL_DIR=tmp):
+            out = StringIO()
+            call_command('train_recommender', '--factors', '4', '--iterations', '10', '--evaluate', stdout=out)
+            self.assertIn('precision@5 on 9 users', out.getvalue())
+            self.assertIsInstance(load_als_model().item_factors, np.memmap)
+
+            recommendations = get_personalized_recommendations(target)
+            self.assertEqual(recommendations[0], sedans[2]) # Seen cars are masked out
+            self.assertNotIn(sedans[0], recommendations)
+
+            newcomer = User.objects.create_user('newcomer', password='pw') # Not in the model
+            CarView.objects.create(user=newcomer, car=suvs[0])
+            self.assertCountEqual(get_personalized_recommendations(newcomer), suvs[1:]) # Content-based: similar SUVs
+            self.assertIn('recommender_als_model_age_seconds ', self.client.get('/metrics').content.decode())
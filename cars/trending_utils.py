@@ -0,0 +1,152 @@
+# AutoAggregator/cars/trending_utils.py
+
+import heapq
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.utils import timezone
+
+from cars.interaction_weight_utils import decayed
+from cars.models import Car, CarTrendBucket
+from cars.weekly_pick_utils import OVERALL_SCOPE, body_type_scope
+
+logger = logging.getLogger(__name__)
+
+# Per-car hourly counters over a sliding week, kept as a ring buffer in CarTrendBucket
+TRENDING_WINDOW_HOURS = 7 * 24
+VIEW_SIGNAL = 'views'
+SAVE_SIGNAL = 'saves'
+REVIEW_SIGNAL = 'reviews'
+# Velocity score: sum over the window of weight * count, halved every TRENDING_HALF_LIFE_HOURS
+SIGNAL_WEIGHTS = {VIEW_SIGNAL: 1.0, SAVE_SIGNAL: 5.0, REVIEW_SIGNAL: 3.0}
+DEFAULT_HALF_LIFE_HOURS = 24.0
+# Each process recomputes its in-memory rankings at most this often
+DEFAULT_REFRESH_SECONDS = 60.0
+# Cars kept per scope (overall and each body type); ?limit= can't ask for more
+MAX_TRENDING_RESULTS = 50
+
+
+def get_half_life_hours():
+    return float(getattr(settings, 'TRENDING_HALF_LIFE_HOURS', DEFAULT_HALF_LIFE_HOURS))
+
+
+def bucket_hour(when):
+    """
+    (start of the hour, ring buffer slot) for a datetime.
+    """
+    hour = when.replace(minute=0, second=0, microsecond=0)
+    return hour, int(hour.timestamp() // 3600) % TRENDING_WINDOW_HOURS
+
+
+def record_trending_events(events, when=None):
+    """
+    Adds {(car_id, signal): count} to the cars' counters for the current hour, one UPDATE per car
+    that either increments the slot or, if it still holds an older hour, resets it. Trending is
+    analytics: a failed write is logged and dropped, never raised into the caller.
+    """
+    hour, slot = bucket_hour(when or timezone.now())
+    per_car = defaultdict(Counter)
+    for (car_id, signal), count in events.items():
+        per_car[car_id][signal] += count
+
+    for car_id, counts in per_car.items():
+        same_hour = {signal: Case(When(hour=hour, then=F(signal) + counts[signal]), default=Value(counts[signal]))
+                     for signal in (VIEW_SIGNAL, SAVE_SIGNAL, REVIEW_SIGNAL)}
+        try:
+            with transaction.atomic(): # Savepoint, so a failure can't break the caller's transaction
+                if not CarTrendBucket.objects.filter(car_id=car_id, slot=slot).update(hour=hour, **same_hour):
+                    try:
+                        with transaction.atomic():
+                            CarTrendBucket.objects.create(car_id=car_id, slot=slot, hour=hour, **{signal: counts[signal] for signal in counts})
+                    except IntegrityError: # Another process created the slot first
+                        CarTrendBucket.objects.filter(car_id=car_id, slot=slot).update(hour=hour, **same_hour)
+        except DatabaseError:
+            logger.exception("Dropped trending counters for car #%s", car_id)
+
+
+def record_trending_event(car_id, signal, count=1, when=None):
+    record_trending_events({(car_id, signal): count}, when)
+
+
+def compute_trending_scores(now=None):
+    """
+    [(car_id, body_type, score)] for every car with activity in the window, from one SQL
+    aggregation over the ring buffer.
+    """
+    now = now or timezone.now()
+    activity = sum((F(signal) * weight for signal, weight in SIGNAL_WEIGHTS.items()), Value(0.0))
+    rows = (CarTrendBucket.objects.filter(hour__gt=now - timedelta(hours=TRENDING_WINDOW_HOURS))
+            .values('car_id', 'car__body_type')
+            .annotate(score=Sum(decayed(activity, 'hour', now, get_half_life_hours() / 24)))
+            .order_by())
+    return [(row['car_id'], row['car__body_type'], row['score']) for row in rows if row['score'] > 0]
+
+
+def rank_trending(scores, limit=MAX_TRENDING_RESULTS):
+    """
+    {scope: [(car_id, score)]} best first, for the overall ranking and each body type
+    (weekly_pick_utils scopes). Ties go to the lower car id.
+    """
+    by_scope = defaultdict(list)
+    for car_id, body_type, score in scores:
+        by_scope[OVERALL_SCOPE].append((car_id, score))
+        if body_type and body_type.strip():
+            by_scope[body_type_scope(body_type)].append((car_id, score))
+    return {scope: heapq.nlargest(limit, entries, key=lambda entry: (entry[1], -entry[0]))
+            for scope, entries in by_scope.items()}
+
+
+class TrendingIndex:
+    """
+    Process-local trending rankings with the cars already serialized, recomputed at most every
+    `refresh_seconds` (one aggregate query plus one in_bulk); requests in between are served
+    from memory without touching the database.
+    """
+
+    def __init__(self, refresh_seconds=None):
+        self.refresh_seconds = refresh_seconds
+        self.rankings = {}
+        self.computed_at = None
+        self.loaded_at = None # time.monotonic() of the last refresh
+        self.lock = threading.Lock()
+
+    def get_refresh_seconds(self):
+        if self.refresh_seconds is not None:
+            return self.refresh_seconds
+        return float(getattr(settings, 'TRENDING_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS))
+
+    def refresh(self):
+        from cars.serializers import CarListSerializer # Serializers import models; keep this module import-light
+
+        now = timezone.now()
+        rankings = rank_trending(compute_trending_scores(now))
+        cars = Car.objects.in_bulk({car_id for entries in rankings.values() for car_id, _ in entries})
+        payloads = {car_id: CarListSerializer(car).data for car_id, car in cars.items()}
+        self.rankings = {
+            scope: [{**payloads[car_id], 'trending_score': round(score, 4)} for car_id, score in entries if car_id in payloads]
+            for scope, entries in rankings.items()
+        }
+        self.computed_at = now
+        self.loaded_at = time.monotonic()
+
+    def get(self, scope=OVERALL_SCOPE, limit=10):
+        """
+        ([car payload with trending_score], computed_at) for a scope, best first.
+        """
+        if self.loaded_at is None or time.monotonic() - self.loaded_at >= self.get_refresh_seconds():
+            with self.lock:
+                if self.loaded_at is None or time.monotonic() - self.loaded_at >= self.get_refresh_seconds():
+                    self.refresh()
+        return self.rankings.get(scope, [])[:limit], self.computed_at
+
+    def invalidate(self):
+        self.loaded_at = None
+
+
+trending_index = TrendingIndex()
@@ -1,29 +1,95 @@
 # AutoAggregator/cars/views.py
 
+import hashlib
+import json
+import logging
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django.contrib.auth import authenticate, login, logout
-from django.db.models import Max
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
+
+from core.db_routers import use_read_replica
 
-from .models import Car, Review, CarView, CarSave, SearchQuery
+from .cache_utils import catalog_cached, not_modified_response, set_validators
+from .event_utils import build_event_rows, event_buffer
+from .facet_utils import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, FacetQueryError, get_catalog_index
+from .fast_serializers import FastReadMixin
+from .filters import AspectOrderingFilter, AspectScoreFilter, FullTextSearchFilter
+from .models import Car, Review, CarView, CarViewDaily, CarSave, SearchQuery
+from .rollup_utils import get_recent_view_days
 from .serializers import (
-    CarSerializer, ReviewSerializer,
-    CarViewSerializer, CarSaveSerializer, SearchQuerySerializer,
-    UserSerializer,
+    CarSerializer, CarListSerializer, ReviewSerializer, trim_sparse_fields,
+    CarViewSerializer, CarViewDailySerializer, CarSaveSerializer, SearchQuerySerializer,
+    UserSerializer, InteractionEventSerializer, SavedCarSerializer, CAR_SUMMARY_FIELDS,
     UserRegistrationSerializer
 )
+from .trending_utils import (
+    MAX_TRENDING_RESULTS, SAVE_SIGNAL, TRENDING_WINDOW_HOURS, VIEW_SIGNAL, record_trending_event, trending_index,
+)
+from .weekly_pick_utils import OVERALL_SCOPE, body_type_scope, get_weekly_pick
 
 User = get_user_model()
-
-class CarViewSet(viewsets.ModelViewSet):
+logger = logging.getLogger(__name__)
+
+NO_WEEKLY_PICK_MESSAGE = "No suitable recommendation found at this time."
+
+def body_type_param_scope(request):
+    # ?body_type= as a weekly pick / trending scope
+    body_type = request.query_params.get('body_type', '').strip()
+    return body_type_scope(body_type) if body_type else OVERALL_SCOPE
+
+def weekly_pick_etag(request, pick):
+    return hashlib.sha1(f"{request.get_full_path()}|{pick['generated_at'].isoformat()}".encode('utf-8')).hexdigest()
+
+class SparseQuerysetMixin:
+    """
+    Narrows read querysets with .only() to the model columns the serializer will actually
+    output (after ?fields= / ?omit=), plus the ordering columns pagination needs, so
+    unrequested columns are never fetched from the database.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in ('GET', 'HEAD') or self.action not in self.sparse_actions:
+            return queryset
+        return queryset.only(*self.get_selected_columns(queryset))
+
+    def get_selected_columns(self, queryset):
+        model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        columns = set()
+        for field in self.get_serializer().fields.values():
+            source = field.source.split('.')[0]
+            if source in model_fields:
+                columns.add(source)
+        for term in queryset.query.order_by or queryset.model._meta.ordering:
+            if isinstance(term, str) and term.lstrip('-') in model_fields:
+                columns.add(term.lstrip('-'))
+        return columns
+
+class ReplicaReadMixin:
+    """
+    Serves the catalog queries (core.db_routers.REPLICA_MODELS) of GET/HEAD requests from the
+    read replica when one is configured; writes and everything else stay on the primary.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        with use_read_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+class CarViewSet(ReplicaReadMixin, FastReadMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Car.objects.all()
     serializer_class = CarSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    list_serializer_actions = ('list', 'personalized_recommendations') # Compact representation
+    filter_backends = [DjangoFilterBackend, AspectScoreFilter, FullTextSearchFilter, AspectOrderingFilter]
 
     filterset_fields = {
         'make': ['exact', 'icontains'],
@@ -35,33 +101,90 @@ class CarViewSet(viewsets.ModelViewSet):
         'release_date': ['gte', 'lte']
     }
 
-    search_fields = ['make', 'model', 'trim', 'engine_type', 'body_type', 'ai_insight_summary']
-    ordering_fields = ['make', 'model', 'year', 'msrp_starting', 'overall_rating', 'release_date']
+    search_fields = ['make', 'model', 'trim', 'engine_type', 'body_type', 'ai_insight_summary'] # Non-PostgreSQL fallback
+    search_vector_field = 'search_vector' # Used by FullTextSearchFilter (ranked, GIN-indexed)
+    ordering_fields = ['make', 'model', 'year', 'msrp_starting', 'overall_rating', 'release_date', 'aspect_score'] # aspect_score needs ?aspect=
+
+    def get_serializer_class(self):
+        if self.action in self.list_serializer_actions:
+            return CarListSerializer
+        return super().get_serializer_class()
+
+    @catalog_cached
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @catalog_cached
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(detail=False, methods=['get'])
     def weekly_recommendation(self, request):
         """
-        Returns a single car as the AI's weekly recommendation.
-        MVP Logic: Pick the highest-rated car from the most recent year with available data.
+        Returns the AI's weekly recommendation, precomputed by `refresh_weekly_picks`
+        (see cars/weekly_pick_utils.py). ?body_type= returns that body type's pick instead.
+        Served from the cache / WeeklyPick table without touching the Car catalog.
         """
-        recommended_car = None
+        pick = get_weekly_pick(body_type_param_scope(request))
+        if pick is None:
+            return Response({"detail": NO_WEEKLY_PICK_MESSAGE}, status=404)
 
-        latest_year_with_ratings = Car.objects.filter(overall_rating__isnull=False).aggregate(Max('year'))['year__max']
+        etag = weekly_pick_etag(request, pick)
+        not_modified = not_modified_response(request, etag, pick['generated_at'])
+        if not_modified is not None:
+            return not_modified
+        return set_validators(Response(trim_sparse_fields(request, pick['payload'])), etag, pick['generated_at'])
 
-        if latest_year_with_ratings:
-            candidate_cars = Car.objects.filter(
-                year=latest_year_with_ratings,
-                overall_rating__isnull=False
-            ).order_by('-overall_rating', '-release_date')
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """
+        Cars trending this week, best first: views, saves and new reviews per hour, with recent
+        hours weighing more (see cars/trending_utils.py). ?body_type= ranks one body type;
+        ?limit= defaults to 10 (at most MAX_TRENDING_RESULTS). Served from the process's
+        in-memory rankings, refreshed every TRENDING_REFRESH_SECONDS.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), MAX_TRENDING_RESULTS)
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        results, computed_at = trending_index.get(body_type_param_scope(request), limit)
+        return Response({
+            "window_hours": TRENDING_WINDOW_HOURS,
+            "computed_at": computed_at,
+            "results": [trim_sparse_fields(request, car) for car in results],
+        })
 
-            if candidate_cars.exists():
-                recommended_car = candidate_cars.first()
+    @action(detail=False, methods=['get'], url_path='search')
+    def faceted_search(self, request):
+        """
+        Filter + facet counts + sort over the in-memory catalog index (no per-request SQL).
+        Accepts the same filter names as the list endpoint (e.g. make__icontains, year, msrp_starting__lte)
+        plus drivetrain and price_bucket; comma-separated values are OR-ed.
+        Paged with ?offset=&limit=; facet counts cover make, body_type, drivetrain, year and price_bucket.
+        """
+        params = request.query_params
+        try:
+            offset = max(int(params.get('offset', 0)), 0)
+            limit = min(max(int(params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({"detail": "offset and limit must be integers."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if recommended_car:
-            serializer = self.get_serializer(recommended_car)
-            return Response(serializer.data)
-        else:
-            return Response({"detail": "No suitable recommendation found at this time."}, status=404)
+        ordering = [term.strip() for term in params.get('ordering', '').split(',') if term.strip()]
+
+        try:
+            result = get_catalog_index().query(params, ordering=ordering, offset=offset, limit=limit)
+        except FacetQueryError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        def page_url(page_offset):
+            url = replace_query_param(request.build_absolute_uri(), 'limit', limit)
+            return replace_query_param(url, 'offset', page_offset)
+
+        result['results'] = [trim_sparse_fields(request, car) for car in result['results']]
+
+        result['next'] = page_url(offset + limit) if offset + limit < result['count'] else None
+        result['previous'] = page_url(max(offset - limit, 0)) if offset > 0 else None
+        return Response(result)
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def personalized_recommendations(self, request):
@@ -74,33 +197,34 @@ class CarViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Authentication required for personalized recommendations."}, status=401)
 
         recommendations = []
-        if user.car_views.exists() or user.saved_cars.exists() or user.search_queries.exists():
+        if user.car_view_days.exists() or user.car_views.exists() or user.saved_cars.exists() or user.search_queries.exists():
             from cars.recommender_utils import get_personalized_recommendations # Import here to avoid circular dependency
             recommendations = get_personalized_recommendations(user, num_recommendations=5)
-            print(f"DEBUG: Collaborative filtering recommendations for {user.username}: {[car.model for car in recommendations]}")
+            logger.debug("Collaborative filtering recommendations for %s: %s", user.username, [car.model for car in recommendations])
 
         if not recommendations:
             from cars.recommender_utils import get_simple_content_based_recommendations # Import here
-            print(f"DEBUG: Falling back to content-based recommendations for {user.username}")
+            logger.debug("Falling back to content-based recommendations for %s", user.username)
             recommendations = get_simple_content_based_recommendations(num_recommendations=5)
 
         serializer = self.get_serializer(recommendations, many=True)
         return Response(serializer.data)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ReplicaReadMixin, FastReadMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     filterset_fields = {
         'car': ['exact'],
         'source_name': ['exact', 'icontains'],
         'sentiment_classification': ['exact'],
         'review_date': ['exact', 'gte', 'lte'],
     }
-    ordering_fields = ['review_date', 'source_rating', 'sentiment_compound_score']
-    search_fields = ['content', 'reviewer_name']
+    ordering_fields = ['review_date', 'retrieval_date', 'source_upvotes', 'sentiment_compound_score']
+    search_fields = ['content', 'reviewer_name'] # Non-PostgreSQL fallback
+    search_vector_field = 'search_vector' # Used by FullTextSearchFilter (ranked, GIN-indexed)
 
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
@@ -108,7 +232,7 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
 
-class CarViewViewSet(viewsets.ModelViewSet):
+class CarViewViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = CarView.objects.all()
     serializer_class = CarViewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -120,10 +244,26 @@ class CarViewViewSet(viewsets.ModelViewSet):
         return CarView.objects.none() # Return empty queryset for anonymous users
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user if self.request.user.is_authenticated else None, view_date=timezone.now())
+        view = serializer.save(user=self.request.user if self.request.user.is_authenticated else None, view_date=timezone.now())
+        record_trending_event(view.car_id, VIEW_SIGNAL)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def history(self, request):
+        """
+        The user's viewing history as daily rollups (car, day, view_count), newest first.
+        Reads CarViewDaily, so its cost doesn't grow with raw clicks; views show up here
+        once `compact_car_views` has run.
+        """
+        car_columns = [f'car__{field}' for field in CAR_SUMMARY_FIELDS]
+        queryset = CarViewDaily.objects.filter(user=request.user).select_related('car').only(
+            'user', 'day', 'view_count', 'last_view_date', *car_columns
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = CarViewDailySerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
 
 
-class CarSaveViewSet(viewsets.ModelViewSet):
+class CarSaveViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = CarSave.objects.all()
     serializer_class = CarSaveSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -135,10 +275,11 @@ class CarSaveViewSet(viewsets.ModelViewSet):
         return CarSave.objects.none()
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user, save_date=timezone.now())
+        save = serializer.save(user=self.request.user, save_date=timezone.now())
+        record_trending_event(save.car_id, SAVE_SIGNAL)
 
 
-class SearchQueryViewSet(viewsets.ModelViewSet):
+class SearchQueryViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = SearchQuery.objects.all()
     serializer_class = SearchQuerySerializer
     permission_classes = [permissions.AllowAny]
@@ -152,6 +293,71 @@ class SearchQueryViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user if self.request.user.is_authenticated else None, timestamp=timezone.now())
 
+# Entries per list in GET /api/me/dashboard/
+DASHBOARD_LIST_LIMIT = 20
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def user_dashboard(request):
+    """
+    Everything the profile page shows, in one response: the user, recent viewing days,
+    saved cars and recent searches, each list capped at DASHBOARD_LIST_LIMIT entries and
+    with cars embedded as compact summaries. Five queries no matter the history size.
+    """
+    user = request.user
+    car_columns = [f'car__{field}' for field in CAR_SUMMARY_FIELDS]
+    context = {'request': request}
+
+    recent_views = get_recent_view_days(user, limit=DASHBOARD_LIST_LIMIT, car_fields=CAR_SUMMARY_FIELDS)
+    saves = CarSave.objects.filter(user=user).select_related('car').only('save_date', 'user', *car_columns)[:DASHBOARD_LIST_LIMIT]
+    searches = SearchQuery.objects.filter(user=user)[:DASHBOARD_LIST_LIMIT]
+
+    return Response({
+        "user": UserSerializer(user, context=context).data,
+        "recent_views": CarViewDailySerializer(recent_views, many=True, context=context).data,
+        "saved_cars": SavedCarSerializer(saves, many=True, context=context).data,
+        "searches": SearchQuerySerializer(searches, many=True, context=context).data,
+    })
+
+# Upper bound on events accepted in one POST /api/events/ call
+MAX_EVENTS_PER_BATCH = 100
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def record_events(request):
+    """
+    Batched interaction tracking (car views and searches) for the homepage.
+    Accepts a JSON array, {"events": [...]}, or a form field `events` holding the JSON
+    array (what navigator.sendBeacon sends). Rows go to the in-process event buffer and
+    are written in bulk, so the request never waits on per-event INSERTs.
+    """
+    events = request.data
+    if isinstance(events, dict): # JSON object or form QueryDict; any other JSON scalar is rejected below
+        events = events.get('events', [])
+        if isinstance(events, str):
+            try:
+                events = json.loads(events)
+            except ValueError:
+                return Response({"detail": "events must be a JSON array."}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(events, list) or len(events) > MAX_EVENTS_PER_BATCH:
+        return Response(
+            {"detail": f"events must be a JSON array of at most {MAX_EVENTS_PER_BATCH} items."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    serializer = InteractionEventSerializer(data=events, many=True)
+    serializer.is_valid(raise_exception=True)
+    valid_events = serializer.validated_data
+
+    # One query to drop views of cars that don't exist (a bad id would fail the whole bulk INSERT).
+    car_ids = {event['car'] for event in valid_events if event['type'] == 'view'}
+    known_ids = set(Car.objects.filter(pk__in=car_ids).values_list('pk', flat=True)) if car_ids else set()
+    valid_events = [event for event in valid_events if event['type'] != 'view' or event['car'] in known_ids]
+
+    rows = build_event_rows(valid_events, request.user)
+    event_buffer.add(rows)
+    return Response({"accepted": len(rows)}, status=status.HTTP_202_ACCEPTED)
+
 # New: User Registration API View
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
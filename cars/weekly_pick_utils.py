@@ -0,0 +1,134 @@
+# AutoAggregator/cars/weekly_pick_utils.py
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from cars.models import Car, WeeklyPick
+
+OVERALL_SCOPE = 'overall'
+# Each process keeps every pick in memory and checks WeeklyPick's latest generated_at at most this
+# often, so a refresh_weekly_picks run in another process shows up within that many seconds.
+DEFAULT_CHECK_SECONDS = 30.0
+
+
+def body_type_scope(body_type):
+    return f'body_type:{body_type.strip().lower()}'
+
+
+def select_top_rated(queryset):
+    """
+    The weekly pick rule: highest-rated car from the most recent model year that has
+    ratings, newest release date breaking ties.
+    """
+    rated = queryset.filter(overall_rating__isnull=False)
+    latest_year = rated.aggregate(Max('year'))['year__max']
+    if latest_year is None:
+        return None
+    return rated.filter(year=latest_year).order_by('-overall_rating', '-release_date').first()
+
+
+def get_pick_scopes():
+    """
+    Yields (scope, candidate queryset) for every pick to generate. New kinds of picks
+    (per make, per price bucket, ...) only need another scope here; serving them costs the same.
+    """
+    yield OVERALL_SCOPE, Car.objects.all()
+    body_types = Car.objects.exclude(body_type__isnull=True).exclude(body_type='').order_by().values_list('body_type', flat=True).distinct()
+    for body_type in sorted({value.strip().lower() for value in body_types}):
+        yield body_type_scope(body_type), Car.objects.filter(body_type__iexact=body_type)
+
+
+def refresh_weekly_picks(selector=select_top_rated):
+    """
+    Recomputes every scope's pick and replaces the stored set. Returns {scope: car}.
+    """
+    from cars.serializers import CarSerializer # Serializers import models; keep this module import-light
+
+    generated_at = timezone.now()
+    picks = {}
+    for scope, queryset in get_pick_scopes():
+        car = selector(queryset)
+        if car is not None:
+            picks[scope] = car
+
+    with transaction.atomic():
+        WeeklyPick.objects.exclude(scope__in=picks).delete()
+        for scope, car in picks.items():
+            WeeklyPick.objects.update_or_create(
+                scope=scope,
+                defaults={'car': car, 'payload': CarSerializer(car).data, 'generated_at': generated_at},
+            )
+    weekly_picks.invalidate() # Other processes notice the new generated_at on their next check
+    return picks
+
+
+class WeeklyPickStore:
+    """
+    Process-local copy of the WeeklyPick table. A request costs no query at all, or one
+    aggregate (count, latest generated_at) every `check_seconds`; the picks are reloaded only
+    when that changed. Unknown scopes (any ?body_type= string) are simply absent, so they add
+    no cache entries and a missing pick is only "cached" until the next check.
+    """
+
+    def __init__(self, check_seconds=None):
+        self.check_seconds = check_seconds
+        self.picks = {} # scope -> {"payload", "generated_at"}
+        self.version = None
+        self.checked_at = None # time.monotonic() of the last check
+        self.lock = threading.Lock()
+
+    def get_check_seconds(self):
+        if self.check_seconds is not None:
+            return self.check_seconds
+        return float(getattr(settings, 'WEEKLY_PICK_CHECK_SECONDS', DEFAULT_CHECK_SECONDS))
+
+    def is_stale(self):
+        return self.checked_at is None or time.monotonic() - self.checked_at >= self.get_check_seconds()
+
+    def update(self, version, rows):
+        if rows is not None:
+            self.picks = {row.pop('scope'): row for row in rows}
+            self.version = version
+        self.checked_at = time.monotonic()
+
+    def get(self, scope):
+        if self.is_stale():
+            with self.lock:
+                if self.is_stale():
+                    version = WeeklyPick.objects.aggregate(count=Count('id'), generated_at=Max('generated_at'))
+                    rows = list(WeeklyPick.objects.values('scope', 'payload', 'generated_at')) if version != self.version else None
+                    self.update(version, rows)
+        return self.picks.get(scope)
+
+    async def aget(self, scope):
+        if self.is_stale():
+            version = await WeeklyPick.objects.aaggregate(count=Count('id'), generated_at=Max('generated_at'))
+            rows = [row async for row in WeeklyPick.objects.values('scope', 'payload', 'generated_at')] if version != self.version else None
+            self.update(version, rows)
+        return self.picks.get(scope)
+
+    def invalidate(self):
+        self.checked_at = None
+
+
+weekly_picks = WeeklyPickStore()
+
+
+def get_weekly_pick(scope=OVERALL_SCOPE):
+    """
+    Returns {"payload", "generated_at"} for a scope, or None if no pick has been generated.
+    Served from the process's WeeklyPickStore; never queries the Car catalog.
+    """
+    return weekly_picks.get(scope)
+
+
+async def aget_weekly_pick(scope=OVERALL_SCOPE):
+    """
+    get_weekly_pick for async views (async ORM calls).
+    """
+    return await weekly_picks.aget(scope)
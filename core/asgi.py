@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Build the in-memory catalog search index before the first request hits /api/cars/search/.
+from cars.facet_utils import warm_catalog_index  # noqa: E402  (needs the app registry loaded above)
+warm_catalog_index()
@@ -0,0 +1,56 @@
+# AutoAggregator/core/db_routers.py
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_ALIAS = 'replica'
+# Catalog data. Cars and reviews are also writable through the API, so a GET right after a write
+# may not see it yet (no read-your-writes for these models); cars.cache_utils.catalog_cached never
+# caches or validates a body read from a replica that lags the catalog version. Sessions, users
+# and interaction rows always stay on the primary (read-your-writes).
+REPLICA_MODELS = {'cars.car', 'cars.review', 'cars.caraspectscore'}
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def use_read_replica():
+    """
+    Within the block, reads of REPLICA_MODELS go to the 'replica' alias when one is configured.
+    A ContextVar rather than a thread-local, so it also follows async views into the threads
+    the async ORM runs queries in.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReadReplicaRouter:
+    """
+    Sends catalog reads made inside use_read_replica() to the read replica and everything
+    else (including every write) to the primary. A no-op when DATABASES has no 'replica'.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and model._meta.label_lower in REPLICA_MODELS and REPLICA_ALIAS in settings.DATABASES:
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so saving an instance that was read from the replica still writes to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives schema changes through replication
+        return False if db == REPLICA_ALIAS else None
@@ -0,0 +1,208 @@
+# AutoAggregator/core/metrics.py
+
+import math
+import threading
+
+# Upper bounds (seconds) for latency histograms; roughly Prometheus client defaults.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values = {}
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        with self.lock:
+            values = dict(self.values)
+        return self.header() + [
+            f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+            for labels, value in sorted(values.items())
+        ]
+
+
+class Gauge(Metric):
+    """
+    Point-in-time value. Either `set()` it, or pass `callback` to compute it at scrape time.
+    """
+    kind = 'gauge'
+
+    def __init__(self, *args, callback=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values = {}
+        self.callback = callback
+
+    def set(self, value, labels=()):
+        with self.lock:
+            self.values[labels] = value
+
+    def render(self):
+        if self.callback is not None:
+            value = self.callback()
+            values = {} if value is None else {(): value}
+        else:
+            with self.lock:
+                values = dict(self.values)
+        return self.header() + [
+            f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+            for labels, value in sorted(values.items())
+        ]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.series = {} # labels -> [per-bucket counts, sum, count]
+
+    def observe(self, value, labels=()):
+        # Linear scan: ~10 buckets is cheaper than bisect's call overhead.
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self.lock:
+            snapshot = {labels: (list(counts), total, count) for labels, (counts, total, count) in self.series.items()}
+        lines = self.header()
+        for labels, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                label_text = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{label_text} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metric registry rendered in the Prometheus text exposition format.
+
+    State is per process: with several workers, scrape each worker (or aggregate in
+    Prometheus). Observations take one short lock, so it is cheap enough to leave on.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'Metric {metric.name} is already registered.')
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self.register(Gauge(name, documentation, labelnames, callback=callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets=buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# --- HTTP request metrics (recorded by core.middleware.RequestMetricsMiddleware) ---
+# `route` is the URL name (e.g. "car-list"), keeping label cardinality bounded.
+REQUESTS_TOTAL = registry.counter(
+    'http_requests_total', 'HTTP requests by route, method and status code.', ('route', 'method', 'status'),
+)
+REQUEST_LATENCY = registry.histogram(
+    'http_request_duration_seconds', 'Time from middleware entry to response.', ('route', 'method'),
+)
+DB_QUERIES = registry.histogram(
+    'http_request_db_queries', 'Database queries per request.', ('route',), buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME = registry.histogram(
+    'http_request_db_duration_seconds', 'Time spent executing database queries per request.', ('route',),
+)
+RENDER_TIME = registry.histogram(
+    'http_request_render_duration_seconds', 'Time spent rendering template/DRF responses per request.', ('route',),
+)
+RESPONSE_SIZE = registry.histogram(
+    'http_response_size_bytes', 'Response body size.', ('route',), buckets=SIZE_BUCKETS,
+)
+
+
+# --- Batch snapshots ---
+def _interaction_snapshot_age():
+    from cars.interaction_snapshot_utils import get_snapshot_age # Import here to keep core.metrics free of app imports
+    return get_snapshot_age()
+
+
+INTERACTION_SNAPSHOT_AGE = registry.gauge(
+    'recommender_interaction_snapshot_age_seconds',
+    'Seconds since the interaction snapshot the recommender reads was built (absent when there is none).',
+    callback=_interaction_snapshot_age,
+)
+
+
+def _als_model_age():
+    from cars.als_utils import get_model_age # Import here to keep core.metrics free of app imports
+    return get_model_age()
+
+
+ALS_MODEL_AGE = registry.gauge(
+    'recommender_als_model_age_seconds',
+    'Seconds since the ALS model the recommender serves was trained (absent when there is none).',
+    callback=_als_model_age,
+)
@@ -0,0 +1,261 @@
+# AutoAggregator/core/middleware.py
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+
+from cars.models import RequestProfile
+from cars.profiling_utils import Profiler
+from core.metrics import DB_QUERIES, DB_TIME, RENDER_TIME, REQUEST_LATENCY, REQUESTS_TOTAL, RESPONSE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class QueryTimer:
+    """
+    Counts queries and sums their execution time for one request (see time_query).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# The current request's QueryTimer. A ContextVar, so it follows async requests into the
+# sync_to_async threads the async ORM runs queries in.
+_query_timer = ContextVar('query_timer', default=None)
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    connection.execute_wrapper hook installed on every connection (install_query_timer); times the
+    query into the current request's QueryTimer, if any.
+    """
+    timer = _query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.duration += time.perf_counter() - started
+        timer.count += 1
+
+
+def install_query_timer(connection, **kwargs):
+    # Connections are per thread: wrappers installed in the event loop thread never see the
+    # queries of the thread the async ORM uses, so every connection gets the hook when it connects.
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+connection_created.connect(install_query_timer, dispatch_uid='core.middleware.install_query_timer')
+
+
+@contextmanager
+def timed_render(request):
+    """
+    Counts the block as render time for RequestMetricsMiddleware. For views that serialize and
+    render their response themselves (cars.fast_serializers.FastReadMixin) instead of leaving it
+    to DRF's post-view rendering. `request` may be a DRF Request.
+    """
+    request = getattr(request, '_request', request)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if hasattr(request, '_render_duration'):
+            request._render_duration += time.perf_counter() - started
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, DB query count/time, render time and response size per URL route
+    into core.metrics, and reports the same numbers to the client in a Server-Timing header.
+    Render time covers DRF/template rendering and blocks wrapped in timed_render; the async
+    views in cars/async_views.py render inside the view, so theirs counts as view time.
+
+    Keep it first in MIDDLEWARE so session/auth queries are included.
+    """
+
+    sync_capable = True
+    async_capable = True # Under ASGI, a sync-only middleware would push every request through one thread
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'SERVER_TIMING_HEADER', True)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        timer = QueryTimer()
+        request._render_duration = 0.0
+
+        for connection in connections.all(initialized_only=True): # Connected before the signal was hooked up
+            install_query_timer(connection)
+        token = _query_timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_timer.reset(token)
+        return self.record(request, response, timer, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        timer = QueryTimer()
+        request._render_duration = 0.0
+
+        token = _query_timer.set(timer) # Copied into the contexts sync_to_async runs queries in
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_timer.reset(token)
+        return self.record(request, response, timer, started)
+
+    def record(self, request, response, timer, started):
+        duration = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        route = (match.view_name or match.route) if match else 'unmatched'
+
+        REQUESTS_TOTAL.inc((route, request.method, str(response.status_code)))
+        REQUEST_LATENCY.observe(duration, (route, request.method))
+        DB_QUERIES.observe(timer.count, (route,))
+        DB_TIME.observe(timer.duration, (route,))
+        RENDER_TIME.observe(request._render_duration, (route,))
+        if not response.streaming:
+            RESPONSE_SIZE.observe(len(response.content), (route,))
+
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries"',
+                f'render;dur={request._render_duration * 1000:.1f}',
+                f'total;dur={duration * 1000:.1f}',
+            ])
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF Responses and TemplateResponses render after the view returns; time that step.
+        render_started = time.perf_counter()
+
+        def record_render(rendered_response):
+            request._render_duration += time.perf_counter() - render_started
+
+        response.add_post_render_callback(record_render)
+        return response
+
+
+# Captures taken by RequestProfilingMiddleware, as (unsaved RequestProfile, Profiler, rows to keep),
+# waiting for their response to be sent
+_pending_profiles = []
+_pending_profiles_lock = threading.Lock()
+
+
+def save_pending_profiles(**kwargs):
+    """
+    request_finished receiver: formats and stores the pending captures and prunes old ones, after
+    the profiled response has gone out. Profiling is a side effect, so a database error is logged
+    and the capture dropped; it never fails a request.
+    """
+    with _pending_profiles_lock:
+        pending = _pending_profiles[:]
+        del _pending_profiles[:]
+    for profile, profiler, keep in pending:
+        profile.stats_text = profiler.stats_text()
+        profile.collapsed_stacks = profiler.collapsed_stacks()
+        profile.pstats = profiler.pstats_bytes()
+        try:
+            profile.save()
+            # Keep only the newest `keep` captures
+            stale_ids = list(RequestProfile.objects.order_by('-created_at', '-id').values_list('id', flat=True)[keep:keep + 100])
+            if stale_ids:
+                RequestProfile.objects.filter(id__in=stale_ids).delete()
+        except DatabaseError:
+            logger.exception("Dropped request profile of %s %s", profile.method, profile.path)
+
+
+request_finished.connect(save_pending_profiles, dispatch_uid='core.middleware.save_pending_profiles')
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiles sampled requests and stores each capture (cProfile stats, collapsed stacks) as a
+    cars.RequestProfile once the response has been sent (save_pending_profiles); the admin lists
+    them slowest first. Profiled responses carry an `X-Profiled: <trigger>` header.
+
+    A request is profiled when
+    - its route is in REQUEST_PROFILE_ROUTES (an empty list means every route) and it wins the
+      1-in-REQUEST_PROFILE_SAMPLE_RATE draw (0 disables sampling), or
+    - it carries an `X-Profile` header and comes from a staff user (any user when DEBUG).
+
+    Keep it last in MIDDLEWARE: it calls the view itself from process_view, after the other
+    middleware (sessions, CSRF, auth) have run. Async views (cars/async_views.py) are never
+    profiled: cProfile follows a thread, not a coroutine.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_PROFILE_SAMPLE_RATE', 0)
+        self.routes = set(getattr(settings, 'REQUEST_PROFILE_ROUTES', ()))
+        self.keep = getattr(settings, 'REQUEST_PROFILE_KEEP', 200)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        return self.get_response(request) # A coroutine when running under ASGI
+
+    def get_trigger(self, request, route):
+        if 'X-Profile' in request.headers and (settings.DEBUG or getattr(request.user, 'is_staff', False)):
+            return 'header'
+        if self.sample_rate and (not self.routes or route in self.routes) and random.randrange(self.sample_rate) == 0:
+            return 'sample'
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if iscoroutinefunction(view_func):
+            return None
+        route = request.resolver_match.view_name
+        trigger = self.get_trigger(request, route)
+        if trigger is None:
+            return None
+
+        profiler = Profiler(sample_stacks=True)
+        try:
+            profiler.start()
+        except ValueError: # Another profiler is active in this thread (e.g. a command run with --profile)
+            return None
+        started = time.perf_counter()
+        try:
+            response = view_func(request, *view_args, **view_kwargs)
+            if callable(getattr(response, 'render', None)):
+                response = response.render() # DRF/template responses: include rendering in the profile
+        finally:
+            profiler.stop()
+        duration = time.perf_counter() - started
+
+        profile = RequestProfile(
+            route=route,
+            method=request.method,
+            path=request.get_full_path()[:500],
+            status_code=response.status_code,
+            duration_ms=round(duration * 1000, 3),
+            trigger=trigger,
+            user=request.user if request.user.is_authenticated else None,
+        )
+        with _pending_profiles_lock:
+            _pending_profiles.append((profile, profiler, self.keep))
+        response['X-Profiled'] = trigger
+        return response
@@ -16,6 +16,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'cars',
@@ -24,6 +25,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware', # First, so it sees every query and the full latency
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -32,6 +34,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.RequestProfilingMiddleware', # Last: it runs the view itself for profiled requests
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -53,16 +56,48 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
-DATABASES = {
-    'default': {
+# --- Database ---
+# Configured from the environment (DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT); the defaults
+# are the local development database.
+# - DB_CONN_MAX_AGE: seconds a connection is reused across requests/command batches (0 = reconnect
+#   every request). CONN_HEALTH_CHECKS pings a reused connection before handing it out, so a
+#   server restart or failover costs one reconnect instead of one failed request.
+# - DB_POOL_MAX_SIZE > 0: use a psycopg 3 connection pool per process instead (pip install
+#   "psycopg[pool]"); Django requires CONN_MAX_AGE = 0 with a pool.
+# - DB_REPLICA_HOST: adds a 'replica' alias; core.db_routers sends catalog reads there.
+# `python manage.py benchmark_connections` measures what each mode saves per request.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '0'))
+
+
+def database_settings(host, port):
+    config = {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'autoaggregator_db',
-        'USER': 'autoaggregator_user',
-        'PASSWORD': 'pRaN26-05',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': os.environ.get('DB_NAME', 'autoaggregator_db'),
+        'USER': os.environ.get('DB_USER', 'autoaggregator_user'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'pRaN26-05'),
+        'HOST': host,
+        'PORT': port,
+        'CONN_MAX_AGE': 0 if DB_POOL_MAX_SIZE else DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
     }
+    if DB_POOL_MAX_SIZE:
+        config['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')), # Seconds to wait for a free connection
+        }
+    return config
+
+
+DATABASES = {
+    'default': database_settings(os.environ.get('DB_HOST', 'localhost'), os.environ.get('DB_PORT', '5432')),
 }
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = database_settings(os.environ['DB_REPLICA_HOST'], os.environ.get('DB_REPLICA_PORT', '5432'))
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'} # Tests read the replica through the primary's connection
+DATABASE_ROUTERS = ['core.db_routers.ReadReplicaRouter']
 
 AUTH_PASSWORD_VALIDATORS = [
     { 'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator', },
@@ -95,4 +130,86 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny', # Default for new endpoints, will be overridden for protected ones
     ],
-}
\ No newline at end of file
+    # Keyset (cursor) pagination on every list endpoint; see cars/pagination.py
+    'DEFAULT_PAGINATION_CLASS': 'cars.pagination.KeysetPagination',
+    'PAGE_SIZE': 24,
+}
+
+# Catalog version + rendered catalog responses (cars/cache_utils.py). Use a shared backend
+# (Redis/Memcached) in production so every worker sees the same version.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'autoaggregator',
+    }
+}
+# ETag/Last-Modified + server-side response cache on the car catalog endpoints
+CATALOG_HTTP_CACHE = True
+
+# Interaction events posted to /api/events/ are buffered per process and bulk-inserted
+# when either threshold is hit (cars/event_utils.py). 0 seconds writes each batch immediately.
+EVENT_BUFFER_SIZE = 200
+EVENT_BUFFER_SECONDS = 5
+
+# GET /api/cars/trending/ (cars/trending_utils.py): hourly view/save/review counters decay with this
+# half-life, and each process recomputes its in-memory rankings at most every TRENDING_REFRESH_SECONDS.
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_REFRESH_SECONDS = 60
+
+# GET /api/cars/weekly_recommendation/ (cars/weekly_pick_utils.py): each process checks for a newer
+# refresh_weekly_picks run at most this often.
+WEEKLY_PICK_CHECK_SECONDS = 30
+
+# Raw CarView rows older than this are deleted by `compact_car_views` once rolled up into CarViewDaily
+CAR_VIEW_RETENTION_DAYS = 30
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # DJANGO_LOG_LEVEL=DEBUG shows recommender/search diagnostics
+        'cars': {'handlers': ['console'], 'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO')},
+    },
+}
+
+# Prometheus scrape endpoint (/metrics) is only served to these addresses; [] allows everyone
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+# Per-request db/render/total timings in a Server-Timing response header
+SERVER_TIMING_HEADER = True
+
+# Request profiling (core.middleware.RequestProfilingMiddleware): profile 1 in N requests to these
+# routes ([] = every route, 0 = no sampling). Staff can force a capture with an `X-Profile: 1` header.
+# Captures are listed slowest-first under Request profiles in the admin.
+REQUEST_PROFILE_SAMPLE_RATE = 1000
+REQUEST_PROFILE_ROUTES = ['car-personalized-recommendations', 'user_dashboard']
+REQUEST_PROFILE_KEEP = 200
+
+# Columnar review snapshots for offline analytics (`export_reviews`, cars/review_export_utils.py)
+REVIEW_EXPORT_DIR = os.environ.get('REVIEW_EXPORT_DIR', os.path.join(BASE_DIR, 'exports', 'reviews'))
+
+# Memory-mapped user-car interaction snapshot read by the recommender (`snapshot_interactions`,
+# cars/interaction_snapshot_utils.py); must be on local disk. Without a snapshot it reads the database.
+INTERACTION_SNAPSHOT_DIR = os.environ.get('INTERACTION_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'snapshots', 'interactions'))
+# Recommender interaction weights (cars/interaction_weight_utils.py): each save counts
+# RECOMMENDER_SAVE_WEIGHT and each view RECOMMENDER_VIEW_WEIGHT, halved every
+# RECOMMENDER_HALF_LIFE_DAYS days since it happened (0 disables the decay).
+RECOMMENDER_SAVE_WEIGHT = float(os.environ.get('RECOMMENDER_SAVE_WEIGHT', 5))
+RECOMMENDER_VIEW_WEIGHT = float(os.environ.get('RECOMMENDER_VIEW_WEIGHT', 1))
+RECOMMENDER_HALF_LIFE_DAYS = float(os.environ.get('RECOMMENDER_HALF_LIFE_DAYS', 30))
+# Implicit-feedback ALS recommender models (`train_recommender`, cars/als_utils.py); once one has been
+# trained, personalized recommendations are served from it. Must be on local disk.
+ALS_MODEL_DIR = os.environ.get('ALS_MODEL_DIR', os.path.join(BASE_DIR, 'snapshots', 'als'))
+
+# Upper bound for ?page_size= on paginated list endpoints
+API_MAX_PAGE_SIZE = 100
+
+# Car/Review list and detail responses skip DRF serializers and render values() rows directly
+# (cars/fast_serializers.py). Output is identical; set False to force the regular path.
+FAST_READ_PATH = True
+
+# --- Full-text search ---
+# PostgreSQL text search configuration used for Car/Review search vectors and queries.
+SEARCH_CONFIG = 'english'
@@ -0,0 +1,21 @@
+# AutoAggregator/core/settings_production.py
+
+# Production profile: DJANGO_SETTINGS_MODULE=core.settings_production. The database (persistent
+# connections, pooling, read replica) is configured from the environment in core/settings.py.
+
+import os
+
+from core.settings import * # noqa: F401,F403
+
+DEBUG = False
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host.strip()]
+
+# Every worker must see the same catalog version and response cache (cars/cache_utils.py)
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
@@ -3,16 +3,19 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from core.views import homepage_view, user_profile_view 
+from core.views import homepage_view, metrics_view, user_profile_view 
 from cars.views import (
     CarViewSet, ReviewViewSet,
     CarViewViewSet, CarSaveViewSet, SearchQueryViewSet,
     UserViewSet,
+    record_events,
+    user_dashboard,
     register_user, 
     user_login,    
     user_logout    
 )
 from core.views import homepage_view
+from cars import async_views
 
 router = DefaultRouter()
 router.register(r'cars', CarViewSet)
@@ -29,5 +32,15 @@ urlpatterns = [
     path('api/register/', register_user, name='register_user'), 
     path('api/login/', user_login, name='user_login'),         
     path('api/logout/', user_logout, name='user_logout'),
+    path('api/events/', record_events, name='record_events'),
+    path('api/me/dashboard/', user_dashboard, name='user_dashboard'),
     path('profile/', user_profile_view, name='user_profile'),
+    path('metrics', metrics_view, name='metrics'),
+    # Native async versions of the hot read endpoints (same responses; see cars/async_views.py)
+    path('api/async/cars/', async_views.car_list, name='async-car-list'),
+    path('api/async/cars/weekly_recommendation/', async_views.weekly_recommendation, name='async-car-weekly-recommendation'),
+    path('api/async/cars/personalized_recommendations/', async_views.personalized_recommendations,
+         name='async-car-personalized-recommendations'),
+    path('api/async/cars/<str:pk>/', async_views.car_detail, name='async-car-detail'),
+    path('api/async/car-views/history/', async_views.car_view_history, name='async-car-view-history'),
 ]
\ No newline at end of file
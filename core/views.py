@@ -1,11 +1,25 @@
 # AutoAggregator/core/views.py
 
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 
+from core.metrics import registry
+
 def homepage_view(request):
     return render(request, 'homepage.html')
 
 @login_required # <--- Decorator to ensure only logged-in users can access
 def user_profile_view(request): # <--- ADD THIS NEW VIEW FUNCTION
-    return render(request, 'profile.html', {'user': request.user})
\ No newline at end of file
+    return render(request, 'profile.html', {'user': request.user})
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of this process's metrics (see core/metrics.py).
+    Restricted to METRICS_ALLOWED_IPS (an empty list allows everyone).
+    """
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ())
+    if allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
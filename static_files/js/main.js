@@ -14,6 +14,10 @@ let carGrid, loadingDiv, searchMakeInput, searchModelInput, searchYearSelect,
 let personalizedRecSection, personalizedRecTitle, personalizedCarGrid,
   loadingPersonalizedCars;
 
+// Pagination: list endpoints return { next, previous, results }; we follow `next` links
+let loadMoreCarsBtn;
+let nextCarsPageUrl = null;
+
 // NEW DOM Elements for Real Authentication
 let authModalOverlay, closeAuthModalBtn, loginSection, registerSection,
   loginForm, loginUsernameInput, loginPasswordInput, loginSubmitBtn, loginAuthStatus,
@@ -40,6 +44,47 @@ function getCookie(name) {
   return cookieValue;
 }
 
+// --- Interaction tracking: queued client-side and sent in batches to /api/events/ ---
+const EVENT_BATCH_SIZE = 20;
+const EVENT_FLUSH_MS = 5000;
+let pendingEvents = [];
+let eventFlushTimer = null;
+
+function trackEvent(event) {
+  pendingEvents.push(event);
+  if (pendingEvents.length >= EVENT_BATCH_SIZE) {
+    flushEvents();
+  } else if (!eventFlushTimer) {
+    eventFlushTimer = setTimeout(flushEvents, EVENT_FLUSH_MS);
+  }
+}
+
+// sendBeacon can't set headers, so the CSRF token travels as a form field.
+function flushEvents() {
+  clearTimeout(eventFlushTimer);
+  eventFlushTimer = null;
+  if (pendingEvents.length === 0) return;
+
+  const body = new FormData();
+  body.append("events", JSON.stringify(pendingEvents.splice(0, pendingEvents.length)));
+  const csrfToken = getCookie("csrftoken");
+  if (csrfToken) body.append("csrfmiddlewaretoken", csrfToken);
+
+  const url = `${API_BASE_URL}/events/`;
+  if (!(navigator.sendBeacon && navigator.sendBeacon(url, body))) {
+    fetch(url, { method: "POST", body, credentials: "include", keepalive: true }).catch((error) => {
+      console.error("Failed to send interaction events:", error);
+    });
+  }
+}
+
+// Records a car view; a dedicated details view is not built yet.
+function viewCarDetails(carId) {
+  if (carId) {
+    trackEvent({ type: "view", car: parseInt(carId, 10) });
+  }
+}
+
 function renderCarCard(car) {
   const make = car.make || "N/A";
   const model = car.model || "N/A";
@@ -138,9 +183,13 @@ function renderCarCard(car) {
       `;
 }
 
-async function fetchAndDisplayCars(params = {}) {
-  loadingDiv.classList.add("show");
-  carGrid.style.display = "none";
+// pageUrl: a `next` link from a previous response; its cars are appended to the grid.
+async function fetchAndDisplayCars(params = {}, pageUrl = null) {
+  const appending = pageUrl !== null;
+  if (!appending) {
+    loadingDiv.classList.add("show");
+    carGrid.style.display = "none";
+  }
 
   let queryString = new URLSearchParams(params).toString();
   if (queryString) {
@@ -148,16 +197,18 @@ async function fetchAndDisplayCars(params = {}) {
   }
 
   try {
-    const response = await fetch(`${API_BASE_URL}/cars/${queryString}`);
+    // Served from the in-memory catalog index (filters + facet counts), not per-keystroke SQL
+    const response = await fetch(pageUrl || `${API_BASE_URL}/cars/search/${queryString}`);
     if (!response.ok) {
       throw new Error(`HTTP error! status: ${response.status}`);
     }
     const data = await response.json();
 
-    carGrid.innerHTML = "";
+    if (!appending) carGrid.innerHTML = "";
     const carsToDisplay = data.results || data;
+    nextCarsPageUrl = data.next || null;
 
-    if (carsToDisplay.length === 0) {
+    if (carsToDisplay.length === 0 && !appending) {
       carGrid.innerHTML =
         '<p style="text-align:center; padding: 2rem; color: var(--medium-gray-text);">No cars found matching your criteria. Try adjusting your search!</p>';
     } else {
@@ -167,13 +218,18 @@ async function fetchAndDisplayCars(params = {}) {
     }
   } catch (error) {
     console.error("Error fetching cars:", error);
+    nextCarsPageUrl = null;
     carGrid.innerHTML = `<p style="text-align:center; padding: 2rem; color: var(--accent-red);">Failed to load cars. Please ensure your Django server is running and accessible. (${error.message})</p>`;
   } finally {
     loadingDiv.classList.remove("show");
     carGrid.style.display = "grid";
+    if (loadMoreCarsBtn) {
+      loadMoreCarsBtn.style.display = nextCarsPageUrl ? "inline-block" : "none";
+    }
     document
-      .querySelectorAll("#carGrid .view-details-btn")
+      .querySelectorAll("#carGrid .view-details-btn:not([data-bound])")
       .forEach((button) => {
+        button.dataset.bound = "true"; // Avoid stacking listeners when pages are appended
         button.addEventListener("click", (event) => {
           viewCarDetails(event.target.dataset.carId);
         });
@@ -181,6 +237,12 @@ async function fetchAndDisplayCars(params = {}) {
   }
 }
 
+function loadMoreCars() {
+  if (nextCarsPageUrl) {
+    fetchAndDisplayCars({}, nextCarsPageUrl);
+  }
+}
+
 async function fetchAndDisplayWeeklyPick() {
   const aiPickCard = document.querySelector(".ai-pick-card");
   const aiPickImage = aiPickCard.querySelector(".ai-pick-image img");
@@ -316,172 +378,70 @@ async function fetchAndDisplayPersonalizedRecommendations() {
 
 // --- NEW: Profile Page Specific Functions ---
 
-// Function to fetch and display user's profile details
-async function fetchAndDisplayUserProfile() {
+// Loads the whole profile (user, viewed cars, saved cars, searches) from one dashboard request
+async function fetchAndDisplayDashboard() {
     const profileUsernameElement = document.getElementById('profileUsername');
     const profileEmailElement = document.getElementById('profileEmail');
+    const lists = {
+        viewed: document.getElementById('viewedCarsList'),
+        saved: document.getElementById('savedCarsList'),
+        searches: document.getElementById('searchHistoryList'),
+    };
 
     if (!currentLoggedInUserId) {
         if (profileUsernameElement) profileUsernameElement.textContent = "Please log in to view your profile.";
         if (profileEmailElement) profileEmailElement.textContent = "";
+        if (lists.viewed) lists.viewed.innerHTML = '<p>Log in to see your viewed cars.</p>';
+        if (lists.saved) lists.saved.innerHTML = '<p>Log in to see your saved cars.</p>';
+        if (lists.searches) lists.searches.innerHTML = '<p>Log in to see your search history.</p>';
         return;
     }
 
     try {
         const csrfToken = getCookie('csrftoken');
-        const response = await fetch(`${API_BASE_URL}/users/${currentLoggedInUserId}/`, {
+        const response = await fetch(`${API_BASE_URL}/me/dashboard/`, {
             method: 'GET',
             headers: {
                 'Accept': 'application/json',
                 'X-CSRFToken': csrfToken,
             },
         });
-
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
-        const userData = await response.json();
+        const dashboard = await response.json();
 
-        if (profileUsernameElement) profileUsernameElement.textContent = `Welcome, ${userData.username}!`;
-        if (profileEmailElement) profileEmailElement.textContent = `Email: ${userData.email}`;
+        if (profileUsernameElement) profileUsernameElement.textContent = `Welcome, ${dashboard.user.username}!`;
+        if (profileEmailElement) profileEmailElement.textContent = `Email: ${dashboard.user.email}`;
 
+        // Daily rollups: one entry per car per day, with the number of views
+        renderProfileList(lists.viewed, dashboard.recent_views, 'No viewed cars yet.', (view) => {
+            const times = view.view_count > 1 ? ` ${view.view_count} times` : '';
+            return `${view.car.year} ${view.car.make} ${view.car.model} (Viewed${times} on ${new Date(view.last_view_date).toLocaleDateString()})`;
+        });
+        renderProfileList(lists.saved, dashboard.saved_cars, 'No saved cars yet.', (save) =>
+            `${save.car.year} ${save.car.make} ${save.car.model} (Saved: ${new Date(save.save_date).toLocaleString()})`
+        );
+        renderProfileList(lists.searches, dashboard.searches, 'No search history yet.', (query) =>
+            `Searched for "${query.query_text}" on ${new Date(query.timestamp).toLocaleString()}`
+        );
     } catch (error) {
-        console.error("Error fetching user profile:", error);
+        console.error("Error fetching dashboard:", error);
         if (profileUsernameElement) profileUsernameElement.textContent = "Error loading profile.";
         if (profileEmailElement) profileEmailElement.textContent = `(${error.message})`;
-    }
-}
-
-// Function to fetch and display user's viewed cars
-async function fetchAndDisplayViewedCars() {
-    const viewedCarsList = document.getElementById('viewedCarsList');
-    if (!viewedCarsList) return; // Exit if element not found
-
-    if (!currentLoggedInUserId) {
-        viewedCarsList.innerHTML = '<p>Log in to see your viewed cars.</p>';
-        return;
-    }
-
-    viewedCarsList.innerHTML = '<div class="spinner"></div> Loading viewed cars...'; // Show spinner
-
-    try {
-        const csrfToken = getCookie('csrftoken');
-        const response = await fetch(`${API_BASE_URL}/car-views/?user=${currentLoggedInUserId}`, {
-            method: 'GET',
-            headers: {
-                'Accept': 'application/json',
-                'X-CSRFToken': csrfToken,
-            },
-        });
-
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        const data = await response.json();
-        const viewedCars = data.results || data; // Handle pagination
-
-        if (viewedCars.length === 0) {
-            viewedCarsList.innerHTML = '<p>No viewed cars yet.</p>';
-        } else {
-            let html = '<ul>';
-            viewedCars.forEach(view => {
-                html += `<li>${view.car.year} ${view.car.make} ${view.car.model} (Viewed: ${new Date(view.view_date).toLocaleString()})</li>`;
-            });
-            html += '</ul>';
-            viewedCarsList.innerHTML = html;
-        }
-    } catch (error) {
-        console.error("Error fetching viewed cars:", error);
-        viewedCarsList.innerHTML = `<p style="color: var(--accent-red);">Failed to load viewed cars. (${error.message})</p>`;
-    }
-}
-
-// Function to fetch and display user's saved cars
-async function fetchAndDisplaySavedCars() {
-    const savedCarsList = document.getElementById('savedCarsList');
-    if (!savedCarsList) return; // Exit if element not found
-
-    if (!currentLoggedInUserId) {
-        savedCarsList.innerHTML = '<p>Log in to see your saved cars.</p>';
-        return;
-    }
-
-    savedCarsList.innerHTML = '<div class="spinner"></div> Loading saved cars...'; // Show spinner
-
-    try {
-        const csrfToken = getCookie('csrftoken');
-        const response = await fetch(`${API_BASE_URL}/car-saves/?user=${currentLoggedInUserId}`, {
-            method: 'GET',
-            headers: {
-                'Accept': 'application/json',
-                'X-CSRFToken': csrfToken,
-            },
+        Object.values(lists).forEach((list) => {
+            if (list) list.innerHTML = `<p style="color: var(--accent-red);">Failed to load. (${error.message})</p>`;
         });
-
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        const data = await response.json();
-        const savedCars = data.results || data; // Handle pagination
-
-        if (savedCars.length === 0) {
-            savedCarsList.innerHTML = '<p>No saved cars yet.</p>';
-        } else {
-            let html = '<ul>';
-            savedCars.forEach(save => {
-                html += `<li>${save.car.year} ${save.car.make} ${save.car.model} (Saved: ${new Date(save.save_date).toLocaleString()})</li>`;
-            });
-            html += '</ul>';
-            savedCarsList.innerHTML = html;
-        }
-    } catch (error) {
-        console.error("Error fetching saved cars:", error);
-        savedCarsList.innerHTML = `<p style="color: var(--accent-red);">Failed to load saved cars. (${error.message})</p>`;
     }
 }
 
-// Function to fetch and display user's search history
-async function fetchAndDisplaySearchHistory() {
-    const searchHistoryList = document.getElementById('searchHistoryList');
-    if (!searchHistoryList) return; // Exit if element not found
-
-    if (!currentLoggedInUserId) {
-        searchHistoryList.innerHTML = '<p>Log in to see your search history.</p>';
+function renderProfileList(listElement, items, emptyMessage, describe) {
+    if (!listElement) return; // Element not on this page
+    if (items.length === 0) {
+        listElement.innerHTML = `<p>${emptyMessage}</p>`;
         return;
     }
-
-    searchHistoryList.innerHTML = '<div class="spinner"></div> Loading search history...'; // Show spinner
-
-    try {
-        const csrfToken = getCookie('csrftoken');
-        const response = await fetch(`${API_BASE_URL}/search-queries/?user=${currentLoggedInUserId}`, {
-            method: 'GET',
-            headers: {
-                'Accept': 'application/json',
-                'X-CSRFToken': csrfToken,
-            },
-        });
-
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        const data = await response.json();
-        const searchQueries = data.results || data; // Handle pagination
-
-        if (searchQueries.length === 0) {
-            searchHistoryList.innerHTML = '<p>No search history yet.</p>';
-        } else {
-            let html = '<ul>';
-            searchQueries.forEach(query => {
-                html += `<li>Searched for "${query.query_text}" on ${new Date(query.timestamp).toLocaleString()}</li>`;
-            });
-            html += '</ul>';
-            searchHistoryList.innerHTML = html;
-        }
-    } catch (error) {
-        console.error("Error fetching search history:", error);
-        searchHistoryList.innerHTML = `<p style="color: var(--accent-red);">Failed to load search history. (${error.message})</p>`;
-    }
+    listElement.innerHTML = `<ul>${items.map((item) => `<li>${describe(item)}</li>`).join('')}</ul>`;
 }
 
 // --- Event Handler Functions (Called by event listeners) ---
@@ -499,6 +459,17 @@ function performSearch() {
 
   quickFilterButtons.forEach((btn) => btn.classList.remove("active"));
   fetchAndDisplayCars(params);
+
+  const queryText = [makeTerm, modelTerm, yearTerm].filter(Boolean).join(" ");
+  if (queryText) {
+    trackEvent({
+      type: "search",
+      query_text: queryText,
+      make_filter: makeTerm || null,
+      model_filter: modelTerm || null,
+      year_filter: yearTerm ? parseInt(yearTerm, 10) : null,
+    });
+  }
 }
 
 function updatePriceRangeDisplay() {
@@ -792,6 +763,7 @@ document.addEventListener("DOMContentLoaded", () => {
   personalizedRecTitle = document.getElementById('personalizedRecTitle');
   personalizedCarGrid = document.getElementById('personalizedCarGrid');
   loadingPersonalizedCars = document.getElementById('loadingPersonalizedCars');
+  loadMoreCarsBtn = document.getElementById('loadMoreCarsBtn');
 
   // NEW AUTH DOM Element Retrievals
   authModalOverlay = document.getElementById('authModalOverlay');
@@ -823,10 +795,7 @@ document.addEventListener("DOMContentLoaded", () => {
   fetchAndDisplayWeeklyPick();
 
    if (document.body.id === 'user-profile-page') { // <--- NEW CHECK FOR PROFILE PAGE
-      fetchAndDisplayUserProfile();
-      fetchAndDisplayViewedCars();
-      fetchAndDisplaySavedCars();
-      fetchAndDisplaySearchHistory();
+      fetchAndDisplayDashboard();
   } else {
       // Existing homepage initialization
       updateAuthUI();
@@ -853,6 +822,7 @@ document.addEventListener("DOMContentLoaded", () => {
   });
 
   document.querySelector('.cta-btn').addEventListener("click", startSearch);
+  if (loadMoreCarsBtn) { loadMoreCarsBtn.addEventListener("click", loadMoreCars); }
 
   if (backToTopBtn) { backToTopBtn.addEventListener("click", handleBackToTop); }
   if (mobileMenuBtn) { mobileMenuBtn.addEventListener("click", toggleMobileMenu); }
@@ -919,5 +889,10 @@ document.addEventListener("DOMContentLoaded", () => {
 
   window.addEventListener("scroll", handleNavbarScroll);
   window.addEventListener("scroll", handleScrollSpy);
+  // Send any queued interaction events before the page goes away
+  window.addEventListener("pagehide", flushEvents);
+  document.addEventListener("visibilitychange", () => {
+    if (document.visibilityState === "hidden") flushEvents();
+  });
 
 }); // <--- END OF THE SINGLE DOMContentLoaded LISTENER ---
\ No newline at end of file